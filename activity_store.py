@@ -0,0 +1,222 @@
+import pandas as pd
+import numpy as np
+import hashlib
+import os
+import re
+from gear import resolve_gear
+
+# pyarrow is optioneel: zonder valt alles terug op de CSV
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+ACTIVITIES_CSV = 'activities.csv'
+ACTIVITIES_STORE = 'activities.parquet'
+
+COLUMN_MAP = {'Activiteits-ID':'ID', 'Datum van activiteit':'Datum', 'Naam activiteit':'Naam', 'Activiteitstype':'Activiteitstype', 'Beweegtijd':'Beweegtijd_sec', 'Afstand':'Afstand_km', 'Gemiddelde hartslag':'Hartslag', 'Gemiddelde snelheid':'Gem_Snelheid', 'Gemiddeld wattage':'Wattage', 'Uitrusting voor activiteit':'Gear', 'Calorieën':'Calorieën', 'Hoogteverschil':'Hoogtemeters', 'Elevatiewinst':'Hoogtemeters'}
+METRIC_COLS = ['Afstand_km', 'Beweegtijd_sec', 'Gem_Snelheid', 'Hartslag', 'Wattage', 'Calorieën', 'Hoogtemeters']
+CATEGORY_COLS = ['Activiteitstype', 'Gear', 'Categorie']
+
+# Vast schema van de opgeschoonde tabel: wat de dashboard generator direct kan gebruiken
+if pa is not None:
+    SCHEMA = pa.schema(
+        [('ID', pa.int64()), ('Datum', pa.timestamp('ms')), ('Naam', pa.string())]
+        + [(c, pa.dictionary(pa.int32(), pa.string())) for c in CATEGORY_COLS]
+        + [(c, pa.float32()) for c in METRIC_COLS]
+    )
+
+# --- DATUM FIX ---
+DUTCH_MONTHS = {'jan':1,'feb':2,'mrt':3,'apr':4,'mei':5,'jun':6,'jul':7,'aug':8,'sep':9,'okt':10,'nov':11,'dec':12}
+ISO_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+def parse_dates(dates):
+    # Geeft (datums, maskers van onleesbare rijen) terug; alles per kolom, geen Python per rij
+    s = dates.astype('string').str.strip()
+    filled = (s.notna() & s.ne('').fillna(False)).astype(bool)
+    out = pd.to_datetime(s, format=ISO_FORMAT, errors='coerce')
+
+    rest = out.isna() & filled
+    if rest.any():
+        # Strava NL export: "13 mrt 2026" / "13 mrt. 2026, 14:54:58" -> dag zelf, vast 12:00 uur
+        m = s[rest].str.lower().str.extract(r'^(\d{1,2})\s+([a-z]{3})[a-z]*\.?\s+(\d{4})')
+        parts = pd.DataFrame({'year': pd.to_numeric(m[2]), 'month': m[1].map(DUTCH_MONTHS), 'day': pd.to_numeric(m[0])})
+        ok = parts.notna().all(axis=1)
+        if ok.any():
+            out[ok[ok].index] = pd.to_datetime(parts[ok], errors='coerce') + pd.Timedelta(hours=12)
+
+    rest = out.isna() & filled
+    if rest.any():
+        # Laatste vangnet voor andere ISO varianten ("2026-03-13T14:54:58Z", zonder seconden, ...)
+        iso = s[rest].str.replace('T', ' ', regex=False).str.replace('Z', '', regex=False)
+        out[rest] = pd.to_datetime(iso, errors='coerce', format='mixed')
+
+    return out, (out.isna() & filled).astype(bool)
+
+# --- CATEGORIE LOGICA ---
+# (prioriteit, categorie, veld, trefwoorden): de laagste prioriteit die matcht wint
+CATEGORY_RULES = [
+    (1, 'Padel', 'type', ['train', 'padel', 'tennis', 'squash', 'work', 'fit']),
+    (1, 'Padel', 'naam', ['train']),
+    (2, 'Mountainbike', 'type', ['fiets', 'rit', 'mtb', 'mountainbike', 'ride', 'cycle', 'gravel', 'velomobiel', 'e-bike']),
+    (2, 'Mountainbike', 'naam', ['fiets', 'rit', 'mtb', 'mountainbike']),
+    (3, 'Wandelen', 'type', ['wandel', 'hike', 'walk']),
+]
+CATEGORIES = ['Mountainbike', 'Padel', 'Wandelen', 'Overig']
+DEFAULT_CATEGORY = 'Overig'
+
+def compile_rules(rules=CATEGORY_RULES):
+    # Eén gecombineerde regex per (categorie, veld), gesorteerd op prioriteit
+    compiled = {}
+    for prio, cat, field, words in sorted(rules, key=lambda r: r[0]):
+        key = (prio, cat)
+        compiled.setdefault(key, {}).setdefault(field, []).extend(words)
+    return [(cat, {f: '|'.join(re.escape(w) for w in ws) for f, ws in fields.items()}) for (_, cat), fields in compiled.items()]
+
+COMPILED_RULES = compile_rules()
+
+def categorize(types, names):
+    # Namen als "Namiddagrit" komen duizenden keren terug: alleen unieke (type, naam) paren evalueren
+    t = types.astype(str).str.lower().str.strip()
+    n = names.astype(str).str.lower().str.strip()
+    codes, uniq = pd.MultiIndex.from_arrays([t, n]).factorize()
+    fields = {'type': pd.Series(uniq.get_level_values(0)), 'naam': pd.Series(uniq.get_level_values(1))}
+
+    conds = []
+    for _, patterns in COMPILED_RULES:
+        hit = np.zeros(len(uniq), dtype=bool)
+        for field, pattern in patterns.items():
+            hit |= fields[field].str.contains(pattern, regex=True).to_numpy(dtype=bool)
+        conds.append(hit)
+    per_pair = np.select(conds, [cat for cat, _ in COMPILED_RULES], default=DEFAULT_CATEGORY)
+    return pd.Series(pd.Categorical(per_pair[codes], categories=CATEGORIES), index=types.index)
+
+# --- MATERIAAL REGELS ---
+# In volgorde toegepast, voor alle rijen tegelijk (zie gear.py voor de voorwaarden). Per atleet te vervangen (zie batch.py).
+GEAR_RULES = [
+    {'gear': 'merida', 'set': 'Trek E-MTB'},                                 # Wijzig merida naar Trek E-MTB
+    {'gear': 'proracer', 'set': ''},                                         # Proracer wissen, niet in de materiaal tabellen
+    {'categorie': 'Mountainbike', 'vanaf': '2022-09-01', 'set': 'Trek E-MTB'},
+]
+
+# --- OPSCHONEN ---
+def clean_activities(df, speed_ms=None):
+    df = df.rename(columns={k:v for k,v in COLUMN_MAP.items() if k in df.columns})
+    df['Datum_ruw'] = df['Datum']
+
+    if 'ID' not in df.columns: df['ID'] = np.nan
+    if 'Hoogtemeters' not in df.columns: df['Hoogtemeters'] = 0
+    if 'Gear' not in df.columns: df['Gear'] = ''
+
+    for c in ['Afstand_km', 'Beweegtijd_sec', 'Gem_Snelheid', 'Calorieën', 'Hoogtemeters']:
+        if c in df.columns: df[c] = pd.to_numeric(df[c].astype(str).str.replace(',', '.'), errors='coerce').fillna(0)
+    df['Hartslag'] = pd.to_numeric(df['Hartslag'], errors='coerce')
+    df['Wattage'] = pd.to_numeric(df['Wattage'], errors='coerce') if 'Wattage' in df.columns else np.nan
+
+    df['Datum'], bad = parse_dates(df['Datum'])
+    if bad.any():
+        onleesbaar = df.loc[bad, ['Naam', 'Datum_ruw']]
+        print(f"⚠️ {len(onleesbaar)} activiteit(en) met onleesbare datum overgeslagen: " + ', '.join(f"{n!r} ({d!r})" for n, d in onleesbaar.head(5).itertuples(index=False)))
+        df.attrs['onleesbare_datums'] = onleesbaar['Datum_ruw'].astype(str).tolist()
+    df = df.drop(columns=['Datum_ruw']).dropna(subset=['Datum'])
+    df['Categorie'] = categorize(df['Activiteitstype'], df['Naam'])
+    # Strava geeft m/s, de export km/u; bij een deel van de rijen (delta) beslist de aanroeper op basis van het geheel
+    if speed_ms is None: speed_ms = bool(df['Gem_Snelheid'].mean() < 10)
+    if speed_ms: df['Gem_Snelheid'] *= 3.6
+
+    # --- GEAR FIX: Trek E-MTB & Proracer logica ---
+    df['Gear'] = df['Gear'].astype(str).replace(['nan', 'None'], '').str.strip()
+    df['Gear'] = resolve_gear(df, GEAR_RULES).replace('', np.nan)
+    # -----------------------------------
+    out = apply_schema(df)
+    out.attrs.update(df.attrs, speed_ms=speed_ms)
+    return out
+
+def apply_schema(df):
+    # Zelfde dtypes, of de data nu uit de CSV of uit de Parquet store komt
+    out = pd.DataFrame({
+        'ID': pd.to_numeric(df['ID'], errors='coerce').astype('Int64'),
+        'Datum': pd.to_datetime(df['Datum']).astype('datetime64[ms]'),
+        'Naam': df['Naam'].astype(str),
+    }, index=df.index)
+    for c in CATEGORY_COLS: out[c] = df[c].astype('category')
+    for c in METRIC_COLS: out[c] = df[c].astype('float32')
+    # Index van de bron blijft staan (rijen met een onleesbare datum vallen eruit), zodat een delta terug te vinden is
+    return out
+
+# --- STORE ---
+def _file_hash(path):
+    with open(path, 'rb') as f: return hashlib.sha1(f.read()).hexdigest()
+
+def store_version():
+    # Categorie en Gear zijn afgeleid: andere regels (ook per atleet, zie batch.py), een ander schema of andere opschoon-code
+    # maakt de store ongeldig, ook als de CSV gelijk blijft
+    h = hashlib.sha1(repr((CATEGORY_RULES, GEAR_RULES, str(SCHEMA))).encode())
+    for f in (__file__, resolve_gear.__code__.co_filename):
+        with open(f, 'rb') as fh: h.update(fh.read())
+    return h.hexdigest()
+
+def write_store(df_raw, csv_path=ACTIVITIES_CSV, store_path=ACTIVITIES_STORE):
+    if pq is None:
+        print("ℹ️ pyarrow niet geïnstalleerd, alleen de CSV wordt bijgewerkt.")
+        return None
+    df = clean_activities(df_raw)
+    table = pa.Table.from_pandas(df, schema=SCHEMA, preserve_index=False)
+    # Hash van de bron-CSV: na een git checkout of een teruggezette cache zeggen mtimes niets, zo weten we of de store nog klopt
+    source = _file_hash(csv_path) if os.path.exists(csv_path) else ''
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), b'source_csv_sha1': source.encode(), b'store_version': store_version().encode()})
+    pq.write_table(table, store_path, compression='zstd')
+    return df
+
+def read_store(csv_path=ACTIVITIES_CSV, store_path=ACTIVITIES_STORE):
+    if pq is None or not os.path.exists(store_path): return None
+    try:
+        meta = pq.read_schema(store_path).metadata or {}
+        if os.path.exists(csv_path) and meta.get(b'source_csv_sha1', b'').decode() != _file_hash(csv_path):
+            print("ℹ️ activities.csv is nieuwer dan de Parquet store, we lezen de CSV.")
+            return None
+        if meta.get(b'store_version', b'').decode() != store_version():
+            print("ℹ️ Regels of schema gewijzigd sinds de Parquet store, we lezen de CSV.")
+            return None
+        return pq.read_table(store_path, memory_map=True).to_pandas()
+    except Exception as e:
+        print(f"⚠️ Parquet store onleesbaar ({e}), we lezen de CSV.")
+        return None
+
+def load_activities(csv_path=ACTIVITIES_CSV, store_path=ACTIVITIES_STORE):
+    df = read_store(csv_path, store_path)
+    if df is None: df = clean_activities(pd.read_csv(csv_path)).reset_index(drop=True)
+    return with_calendar(df)
+
+def with_calendar(df):
+    df['Jaar'] = df['Datum'].dt.year; df['Day'] = df['Datum'].dt.dayofyear
+    return df
+
+# --- DELTA (data blijft in het geheugen, zie serve_dashboard.py) ---
+def row_hashes(df_raw):
+    return pd.util.hash_pandas_object(df_raw, index=False).to_numpy()
+
+def load_activities_delta(prev=None, csv_path=ACTIVITIES_CSV):
+    # prev = (hashes, df) van de vorige keer: alleen CSV-rijen die er toen niet precies zo stonden gaan door clean_activities
+    raw = pd.read_csv(csv_path)
+    h = row_hashes(raw)
+    known = np.zeros(len(raw), dtype=bool)
+    if prev is not None and len(prev[1]):
+        prev_h, prev_df = prev
+        first = ~pd.Index(prev_h).duplicated()
+        pos = pd.Index(prev_h[first]).get_indexer(h)
+        known = pos >= 0
+    if not known.any():
+        df = clean_activities(raw)
+    else:
+        fresh = clean_activities(raw[~known], speed_ms=prev_df.attrs.get('speed_ms'))
+        old = prev_df[first].iloc[pos[known]].drop(columns=['Jaar', 'Day'])
+        old.index = np.flatnonzero(known)
+        # Schema opnieuw over het geheel: categorieën en volgorde zoals bij een volledige clean_activities
+        df = apply_schema(pd.concat([old, fresh]).sort_index(kind='stable'))
+    speed_ms = fresh.attrs.get('speed_ms') if known.any() else df.attrs.get('speed_ms')
+    kept = df.index.to_numpy()
+    df = with_calendar(df.reset_index(drop=True))
+    df.attrs['speed_ms'] = speed_ms
+    return (h[kept], df), int((~known).sum())
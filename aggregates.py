@@ -0,0 +1,74 @@
+import pandas as pd
+import numpy as np
+from periods import PrefixSums
+
+# --- AGGREGATIE KUBUS ---
+# Eén groupby over alle activiteiten; elke sectie van het dashboard leest hieruit in plaats van zelf te filteren
+KEYS = ['Jaar', 'Maand', 'Day', 'Categorie', 'Gear']
+SUMS = {'n': ('Datum', 'size'), 'km': ('Afstand_km', 'sum'), 'sec': ('Beweegtijd_sec', 'sum'), 'kcal': ('Calorieën', 'sum'), 'hm': ('Hoogtemeters', 'sum'),
+        'hr_sum': ('Hartslag', 'sum'), 'hr_n': ('Hartslag', 'count'), 'w_sum': ('Wattage', 'sum'), 'w_n': ('Wattage', 'count')}
+SUM_COLS = list(SUMS)
+TOP_K = 3
+TOP_COLS = ['Afstand_km', 'Beweegtijd_sec', 'Gem_Snelheid']
+
+def _with_means(t):
+    # Gemiddelden pas na het optellen, zodat ze over elke combinatie van cellen kloppen
+    t = t.copy()
+    t['hr'] = np.where(t['hr_n'] > 0, t['hr_sum'] / t['hr_n'].where(t['hr_n'] > 0, 1), np.nan)
+    t['w'] = np.where(t['w_n'] > 0, t['w_sum'] / t['w_n'].where(t['w_n'] > 0, 1), np.nan)
+    return t
+
+class AggregateCube:
+    def __init__(self, df):
+        d = df.assign(Maand=df['Datum'].dt.month, Gear=df['Gear'].astype(object).where(df['Gear'].notna(), ''))
+        for c in ['Afstand_km', 'Beweegtijd_sec', 'Calorieën', 'Hoogtemeters', 'Hartslag', 'Wattage', 'Gem_Snelheid']:
+            if c in d.columns: d[c] = d[c].astype('float64')
+        if 'Wattage' not in d.columns: d['Wattage'] = np.nan
+
+        self.cube = d.groupby(KEYS, observed=True, sort=True).agg(**SUMS).reset_index()
+        self.years = sorted(self.cube['Jaar'].unique(), reverse=True)
+        self._per_year = {yr: part for yr, part in self.cube.groupby('Jaar', sort=False)}
+        self.daily_km = self.cube.groupby(['Jaar', 'Day'])['km'].sum()
+        self.periods = PrefixSums(self.cube, SUM_COLS)
+        self.heat = d.groupby([d['Jaar'], d['Datum'].dt.dayofweek.rename('Weekdag'), d['Datum'].dt.hour.rename('Uur')]).size()
+
+        tops = []
+        for col in TOP_COLS:
+            t = d[d[col] > 0].sort_values(col, ascending=False, kind='stable').groupby(['Jaar', 'Categorie'], observed=True).head(TOP_K)
+            tops.append(pd.DataFrame({'Jaar': t['Jaar'], 'Categorie': t['Categorie'].astype(str), 'Metric': col, 'Waarde': t[col], 'Datum': t['Datum']}))
+        self.tops = pd.concat(tops, ignore_index=True)
+
+    def select(self, year=None, day_max=None, cat=None, gear=None):
+        c = self.cube if year is None else self._per_year.get(year, self.cube.iloc[0:0])
+        m = np.ones(len(c), dtype=bool)
+        if day_max is not None: m &= (c['Day'] <= day_max).to_numpy()
+        if cat is not None: m &= (c['Categorie'] == cat).to_numpy()
+        if gear is not None: m &= (c['Gear'] == gear).to_numpy()
+        return c[m]
+
+    def totals(self, **filters):
+        t = _with_means(self.select(**filters)[SUM_COLS].sum().to_frame().T)
+        return t.iloc[0]
+
+    def by(self, key, **filters):
+        sel = self.select(**filters)
+        return _with_means(sel.groupby(key, observed=True)[SUM_COLS].sum())
+
+    def period(self, window):
+        # Totalen over een willekeurige periode (periods.py), los van jaargrenzen
+        return _with_means(self.periods.totals(*window).to_frame().T).iloc[0]
+
+    def period_by_cat(self, window):
+        return _with_means(self.periods.by_cat(*window))
+
+    def monthly_counts(self, year, cat):
+        return self.select(year=year, cat=cat).groupby('Maand')['n'].sum().reindex(range(1, 13), fill_value=0)
+
+    def top(self, cat, metric, year=None, k=TOP_K):
+        t = self.tops[(self.tops['Categorie'] == cat) & (self.tops['Metric'] == metric)]
+        if year is not None: t = t[t['Jaar'] == year]
+        return t.sort_values('Waarde', ascending=False, kind='stable').head(k)
+
+    def heatmap(self, year):
+        if year not in self.heat.index.get_level_values(0): return pd.Series(dtype='int64')
+        return self.heat.loc[year]
@@ -0,0 +1,122 @@
+import argparse
+import copy
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from plotly.offline import get_plotlyjs, get_plotlyjs_version
+
+import activity_store
+import routes
+import maak_dashboard as md
+import update_activities as ua
+
+# --- BATCH (meerdere atleten) ---
+# Eén map per atleet met daarin dezelfde bestanden als de repo zelf (activities.csv, streams/, dashboard.html, ...).
+# Sync en build draaien per atleet in een eigen proces dat naar die map gaat; de Plotly bundle staat één keer in de root.
+SYNC_WORKERS = 4  # Strava limieten gelden per API app: niet te veel atleten tegelijk
+CREDENTIALS = ['STRAVA_CLIENT_ID', 'STRAVA_CLIENT_SECRET', 'STRAVA_REFRESH_TOKEN']
+# Wat per atleet in te stellen is, met de waarden van de repo als standaard
+DEFAULTS = {'hr_zones': copy.deepcopy(md.HR_ZONES), 'gear_rules': copy.deepcopy(activity_store.GEAR_RULES),
+            'sync_gear_rules': copy.deepcopy(ua.SYNC_GEAR_RULES), 'manual_gear_map': copy.deepcopy(ua.MANUAL_GEAR_MAP),
+            'route_privacy_zones': None}  # privacy zones nooit van een andere atleet erven: zonder eigen zones geen heatmap
+DEFAULT_PLOTLY_JS_URL = md.PLOTLY_JS_URL
+
+def load_roster(path):
+    with open(path, encoding='utf-8') as f: roster = json.load(f)
+    root = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(path)), roster.get('root', 'athletes')))
+    athletes = []
+    for a in roster['athletes']:
+        if not a.get('id'): raise ValueError("Elke atleet in de roster heeft een 'id' nodig")
+        athletes.append({**a, 'dir': os.path.join(root, a.get('dir', a['id']))})
+    return root, athletes
+
+def credentials(athlete):
+    # Nooit geheimen in de roster: per atleet de namen van env vars, standaard <ID>_STRAVA_CLIENT_ID enz.
+    env = athlete.get('env', {})
+    prefix = athlete['id'].upper().replace('-', '_') + '_'
+    return {k: os.environ.get(env.get(k, prefix + k)) for k in CREDENTIALS}
+
+def apply_config(athlete, plotly_src=None):
+    # Workers worden hergebruikt: eerst alles terug naar de standaard, dan de instellingen van deze atleet
+    cfg = {**DEFAULTS, **{k: v for k, v in athlete.items() if k in DEFAULTS}}
+    md.HR_ZONES = dict(cfg['hr_zones'])
+    activity_store.GEAR_RULES = list(cfg['gear_rules'])
+    ua.SYNC_GEAR_RULES = list(cfg['sync_gear_rules'])
+    ua.MANUAL_GEAR_MAP = dict(cfg['manual_gear_map'])
+    zones = cfg['route_privacy_zones']
+    routes.ROUTE_PRIVACY_ZONES = None if zones is None else [tuple(z) for z in zones]
+    md.PLOTLY_JS_URL = plotly_src or DEFAULT_PLOTLY_JS_URL
+
+def sync_athlete(athlete, full=False):
+    os.makedirs(athlete['dir'], exist_ok=True); os.chdir(athlete['dir'])
+    apply_config(athlete)
+    creds = credentials(athlete)
+    if not all(creds.values()): return {'id': athlete['id'], 'ok': False, 'error': "geen API keys"}
+    ua.CLIENT_ID, ua.CLIENT_SECRET, ua.REFRESH_TOKEN = creds['STRAVA_CLIENT_ID'], creds['STRAVA_CLIENT_SECRET'], creds['STRAVA_REFRESH_TOKEN']
+    t0 = time.perf_counter()
+    try:
+        ua.process_data(full=full)
+    except SystemExit as e:
+        # process_data stopt met exit(1) bij een mislukte token of lege historie
+        if e.code: return {'id': athlete['id'], 'ok': False, 'error': f"sync gestopt (exit {e.code})", 'sec': round(time.perf_counter() - t0, 1)}
+    return {'id': athlete['id'], 'ok': True, 'sec': round(time.perf_counter() - t0, 1)}
+
+def build_athlete(athlete, plotly_asset, incremental=False):
+    os.chdir(athlete['dir'])
+    # Relatief pad, zodat de mappen samen verplaatst of gepubliceerd kunnen worden
+    apply_config(athlete, plotly_asset and os.path.relpath(plotly_asset, athlete['dir']).replace(os.sep, '/'))
+    if not os.path.exists(activity_store.ACTIVITIES_CSV): return {'id': athlete['id'], 'ok': False, 'error': "geen activities.csv"}
+    report = md.genereer_dashboard(incremental=incremental)
+    return {'id': athlete['id'], 'ok': report.error is None, 'sec': round(report.total_sec, 1),
+            'error': report.error and report.error['message'], 'html_bytes': report.meta.get('html_bytes')}
+
+def write_plotly_asset(root):
+    # Eén gedeelde kopie van plotly.js naast de atleet-mappen; de browser cachet hem voor alle dashboards
+    path = os.path.join(root, f"plotly-{get_plotlyjs_version()}.min.js")
+    if not os.path.exists(path):
+        os.makedirs(root, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f: f.write(get_plotlyjs())
+    return path
+
+def run_pool(fn, tasks, workers, label):
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(fn, *args): args[0]['id'] for args in tasks}
+        for fut in as_completed(futures):
+            try:
+                res = fut.result()
+            except Exception as e:
+                res = {'id': futures[fut], 'ok': False, 'error': f"{type(e).__name__}: {e}"}
+            print(f"{'✅' if res['ok'] else '❌'} {label} {res['id']}" + (f" ({res['sec']}s)" if res.get('sec') is not None else '') + (f": {res['error']}" if res.get('error') else ''))
+            results.append(res)
+    return sorted(results, key=lambda r: r['id'])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync en dashboards voor meerdere atleten uit een roster")
+    parser.add_argument('roster', help="JSON met 'root' en een lijst 'athletes' (zie roster.example.json)")
+    parser.add_argument('--only', nargs='+', help="Alleen deze atleet-id's")
+    parser.add_argument('--skip-sync', action='store_true', help="Niet synchroniseren, alleen dashboards bouwen")
+    parser.add_argument('--skip-build', action='store_true', help="Alleen synchroniseren")
+    parser.add_argument('--full', action='store_true', help="Volledige resync per atleet")
+    parser.add_argument('--incremental', action='store_true', help="Dashboards met fragmenten per jaar")
+    parser.add_argument('--sync-workers', type=int, default=SYNC_WORKERS)
+    parser.add_argument('--build-workers', type=int, default=os.cpu_count())
+    parser.add_argument('--cdn', action='store_true', help="Plotly van de CDN laden in plaats van de gedeelde kopie")
+    args = parser.parse_args()
+
+    root, athletes = load_roster(args.roster)
+    if args.only: athletes = [a for a in athletes if a['id'] in args.only]
+    print(f"👥 {len(athletes)} atleten in {root}")
+    t0 = time.perf_counter()
+    results = {}
+    if not args.skip_sync:
+        results['sync'] = run_pool(sync_athlete, [(a, args.full) for a in athletes], args.sync_workers, "sync")
+    if not args.skip_build:
+        plotly_asset = None if args.cdn else write_plotly_asset(root)
+        results['build'] = run_pool(build_athlete, [(a, plotly_asset, args.incremental) for a in athletes], args.build_workers, "dashboard")
+    with open(os.path.join(root, 'batch_report.json'), 'w', encoding='utf-8') as f:
+        json.dump({'started': time.strftime('%Y-%m-%d %H:%M:%S'), 'sec': round(time.perf_counter() - t0, 1), **results}, f, indent=2, ensure_ascii=False)
+    failed = list(dict.fromkeys(r['id'] for stage in results.values() for r in stage if not r['ok']))
+    print(f"🏁 Klaar in {time.perf_counter() - t0:.1f}s" + (f"; mislukt: {', '.join(failed)}" if failed else ""))
+    if failed: exit(1)
@@ -0,0 +1,200 @@
+import pandas as pd
+import numpy as np
+import argparse
+import functools
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+# --- BENCHMARK ---
+# Synthetische historie van N activiteiten, dan de echte dashboard build met een timer rond elke stap.
+# Elke grootte draait in een eigen proces, zodat het piekgeheugen per grootte klopt.
+BENCH_SIZES = [1_000, 50_000, 1_000_000]
+BENCH_BASELINE = 'benchmark_baseline.json'
+REGRESSION_FACTOR = 1.25  # 25% trager dan de baseline telt als regressie
+MIN_STAGE_SEC = 0.25      # korte stappen zijn ruis
+
+CSV_COLUMNS = ['Activiteits-ID', 'Datum van activiteit', 'Naam activiteit', 'Activiteitstype', 'Afstand', 'Hoogtemeters', 'Beweegtijd', 'Gemiddelde snelheid', 'Gemiddelde hartslag', 'Gemiddeld wattage', 'Uitrusting voor activiteit', 'Calorieën']
+NL_MONTHS = ['jan', 'feb', 'mrt', 'apr', 'mei', 'jun', 'jul', 'aug', 'sep', 'okt', 'nov', 'dec']
+
+# (type, kans, namen, km (gem, spreiding), km/u, materiaal)
+PROFILES = [
+    ('Mountainbikerit', 0.30, ['Ochtendrit', 'Namiddagrit', 'Avondrit', 'MTB toer'], (35, 15), 18, ['Trek E-MTB', 'Merida One-Twenty', '']),
+    ('Fietsrit', 0.15, ['Ochtendrit', 'Lunchrit', 'Avondrit'], (55, 20), 26, ['Merida Scultura 5000', 'Proracer']),
+    ('Wandeling', 0.25, ['Ochtendwandeling', 'Namiddagwandeling', 'Avondwandeling'], (6, 3), 5, ['Hoka Speedgoat', '']),
+    ('Padel', 0.15, ['Avondtraining', 'Padel', 'Namiddagtraining'], (0, 0), 0, ['']),
+    ('Workout', 0.10, ['Training', 'Krachttraining'], (0, 0), 0, ['']),
+    ('Hike', 0.05, ['Bergwandeling', 'Hike'], (14, 6), 4, ['Hoka Speedgoat']),
+]
+
+def synthetic_activities(n, seed=0, years=12, dutch_share=0.3):
+    rng = np.random.default_rng(seed)
+    p = np.array([pr[1] for pr in PROFILES]); kind = rng.choice(len(PROFILES), n, p=p / p.sum())
+    end = pd.Timestamp.now().normalize()
+    start = end - pd.DateOffset(years=years)
+    days = rng.integers(0, (end - start).days, n)
+    secs = rng.normal(14, 3.5, n).clip(6, 22) * 3600
+    dates = (start + pd.to_timedelta(days, unit='D') + pd.to_timedelta(secs.astype(int), unit='s')).sort_values(ascending=False)
+
+    # Strava NL export en API door elkaar, zoals in een echte CSV die jaren meegaat
+    iso = dates.strftime('%Y-%m-%d %H:%M:%S')
+    dutch = dates.day.astype(str) + ' ' + np.array(NL_MONTHS)[dates.month - 1] + '. ' + dates.year.astype(str) + ', ' + dates.strftime('%H:%M:%S')
+    use_dutch = rng.random(n) < dutch_share
+
+    types, names, gears, km, speed = [], [], [], np.zeros(n), np.zeros(n)
+    for i, (typ, _, nms, (km_mu, km_sd), kmh, gear) in enumerate(PROFILES):
+        m = kind == i; k = int(m.sum())
+        types.append((m, typ))
+        names.append((m, rng.choice(nms, k)))
+        gears.append((m, rng.choice(gear, k)))
+        km[m] = rng.normal(km_mu, km_sd, k).clip(0) if km_mu else 0
+        speed[m] = rng.normal(kmh, kmh * 0.15, k).clip(0) if kmh else 0
+    typ_col, name_col, gear_col = (np.empty(n, dtype=object) for _ in range(3))
+    for (m, t), (_, nm), (_, g) in zip(types, names, gears):
+        typ_col[m] = t; name_col[m] = nm; gear_col[m] = g
+    # Een deel van de namen is uniek, zoals "Rit naar de kust"
+    uniek = rng.random(n) < 0.05
+    name_col[uniek] = [f"{nm} #{i}" for nm, i in zip(name_col[uniek], np.flatnonzero(uniek))]
+
+    moving = np.where(speed > 0, km / np.maximum(speed, 1) * 3600, rng.normal(5400, 1200, n).clip(900))
+    hr = rng.normal(135, 15, n).round()
+    watts = np.where(np.isin(typ_col, ['Mountainbikerit', 'Fietsrit']) & (rng.random(n) < 0.4), rng.normal(170, 35, n).round(), np.nan)
+    return pd.DataFrame({
+        'Activiteits-ID': np.arange(10**9, 10**9 + n)[::-1],
+        'Datum van activiteit': np.where(use_dutch, dutch, iso),
+        'Naam activiteit': name_col, 'Activiteitstype': typ_col,
+        'Afstand': km.round(2), 'Hoogtemeters': (km * rng.uniform(0, 15, n)).round(),
+        'Beweegtijd': moving.round(), 'Gemiddelde snelheid': speed.round(1),
+        'Gemiddelde hartslag': np.where(rng.random(n) < 0.2, np.nan, hr),
+        'Gemiddeld wattage': watts, 'Uitrusting voor activiteit': gear_col,
+        'Calorieën': (moving / 6).round(),
+    }, columns=CSV_COLUMNS)
+
+# --- METEN ---
+def peak_rss_mb():
+    # Linux geeft kB, macOS bytes
+    r = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(r / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def timed(stages, name, fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            st = stages.setdefault(name, {'calls': 0, 'sec': 0.0})
+            st['calls'] += 1; st['sec'] += time.perf_counter() - t0
+            st['peak_rss_mb'] = peak_rss_mb()
+    return wrapper
+
+def instrument(stages):
+    # Het laden valt buiten het build rapport van maak_dashboard: daar apart een timer omheen
+    import activity_store, maak_dashboard as md
+    for nm in ['read_store', 'clean_activities', 'parse_dates', 'categorize', 'apply_schema']:
+        setattr(activity_store, nm, timed(stages, nm, getattr(activity_store, nm)))
+    return md
+
+def run_one(rows, seed, out):
+    # Draait in een schone werkmap (zie run_size)
+    stages = {}
+    t0 = time.perf_counter()
+    synthetic_activities(rows, seed).to_csv('activities.csv', index=False)
+    gen_sec = time.perf_counter() - t0
+
+    md = instrument(stages)
+    t0 = time.perf_counter()
+    report = md.genereer_dashboard()
+    total = time.perf_counter() - t0
+    if report.error is not None: raise SystemExit(f"❌ Build mislukt bij {rows} rijen: {report.error['message']}")
+    # Secties en generator functies uit het build rapport; tijden zijn inclusief geneste stappen
+    for r in report.spans: stages[f"sectie {r['span']}"] = {'calls': 1, 'sec': r['sec']}
+    for nm, f in report.functions.items(): stages[nm] = {'calls': f['calls'], 'sec': f['sec']}
+
+    for st in stages.values():
+        st['sec'] = round(st['sec'], 4)
+        st['rows_per_sec'] = round(rows / st['sec']) if st['sec'] > 0 else None
+    result = {'rows': rows, 'seed': seed, 'generate_csv_sec': round(gen_sec, 3), 'total_sec': round(total, 3),
+              'rows_per_sec': round(rows / total), 'peak_rss_mb': peak_rss_mb(),
+              'csv_bytes': os.path.getsize('activities.csv'), 'html_bytes': os.path.getsize(md.DASHBOARD_HTML),
+              'stages': dict(sorted(stages.items(), key=lambda kv: -kv[1]['sec']))}
+    with open(out, 'w', encoding='utf-8') as f: json.dump(result, f, indent=2)
+
+def run_size(rows, seed, keep=False):
+    repo = os.path.dirname(os.path.abspath(__file__))
+    work = tempfile.mkdtemp(prefix=f'bench-{rows}-')
+    out = os.path.join(work, 'result.json')
+    env = {**os.environ, 'PYTHONPATH': repo + os.pathsep + os.environ.get('PYTHONPATH', '')}
+    try:
+        subprocess.run([sys.executable, os.path.join(repo, 'benchmark.py'), '--child', str(rows), '--seed', str(seed), '--out', out],
+                       cwd=work, env=env, check=True, stdout=subprocess.DEVNULL)
+        with open(out, encoding='utf-8') as f: return json.load(f)
+    finally:
+        if keep: print(f"📁 Werkmap bewaard: {work}")
+        else: shutil.rmtree(work, ignore_errors=True)
+
+def compare(report, baseline):
+    # Per grootte en per stap: trager dan REGRESSION_FACTOR x de baseline is een regressie
+    regressions = []
+    for size, res in report['sizes'].items():
+        base = baseline.get('sizes', {}).get(size)
+        if not base: continue
+        pairs = [('totaal', res['total_sec'], base['total_sec'])]
+        pairs += [(nm, st['sec'], base['stages'][nm]['sec']) for nm, st in res['stages'].items() if nm in base['stages']]
+        for nm, cur, old in pairs:
+            if max(cur, old) >= MIN_STAGE_SEC and cur > old * REGRESSION_FACTOR:
+                regressions.append(f"{size} rijen, {nm}: {old:.3f}s -> {cur:.3f}s ({cur / old:.1f}x)")
+        if res['peak_rss_mb'] > base['peak_rss_mb'] * REGRESSION_FACTOR:
+            regressions.append(f"{size} rijen, piekgeheugen: {base['peak_rss_mb']} -> {res['peak_rss_mb']} MB")
+    return regressions
+
+def print_report(report, top=8):
+    for size, res in report['sizes'].items():
+        print(f"\n📊 {int(size):,} rijen: {res['total_sec']:.2f}s totaal ({res['rows_per_sec']:,} rijen/s), piek {res['peak_rss_mb']} MB, HTML {res['html_bytes'] / 1024:,.0f} kB")
+        for nm, st in list(res['stages'].items())[:top]:
+            print(f"   {nm:<28} {st['sec']:>8.3f}s  {st['calls']:>4}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark van de dashboard build op synthetische historie")
+    parser.add_argument('--rows', type=int, nargs='+', default=BENCH_SIZES, help="Aantal activiteiten per run")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default=None, help="JSON rapport (standaard: benchmark_<datum>.json)")
+    parser.add_argument('--baseline', default=BENCH_BASELINE, help="Baseline om mee te vergelijken")
+    parser.add_argument('--save-baseline', action='store_true', help="Dit rapport als nieuwe baseline opslaan")
+    parser.add_argument('--csv-only', metavar='PAD', help="Alleen een synthetische activities.csv schrijven (met de eerste --rows)")
+    parser.add_argument('--keep', action='store_true', help="Werkmappen niet opruimen")
+    parser.add_argument('--child', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_one(args.child, args.seed, args.out)
+    elif args.csv_only:
+        synthetic_activities(args.rows[0], args.seed).to_csv(args.csv_only, index=False)
+        print(f"💾 {args.rows[0]:,} synthetische activiteiten naar {args.csv_only}")
+    else:
+        report = {'meta': {'datum': time.strftime('%Y-%m-%d %H:%M:%S'), 'python': platform.python_version(), 'pandas': pd.__version__,
+                           'numpy': np.__version__, 'platform': platform.platform(), 'cpus': os.cpu_count()},
+                  'sizes': {}}
+        for rows in args.rows:
+            print(f"⏱️ {rows:,} activiteiten...")
+            report['sizes'][str(rows)] = run_size(rows, args.seed, args.keep)
+        print_report(report)
+        out = args.out or f"benchmark_{time.strftime('%Y%m%d_%H%M%S')}.json"
+        with open(out, 'w', encoding='utf-8') as f: json.dump(report, f, indent=2)
+        print(f"\n💾 Rapport: {out}")
+
+        if args.save_baseline:
+            shutil.copyfile(out, args.baseline)
+            print(f"📌 Nieuwe baseline: {args.baseline}")
+        elif os.path.exists(args.baseline):
+            with open(args.baseline, encoding='utf-8') as f: regressions = compare(report, json.load(f))
+            if regressions:
+                print("🐢 Regressies t.o.v. de baseline:\n   " + "\n   ".join(regressions))
+                sys.exit(1)
+            print("✅ Geen regressies t.o.v. de baseline.")
@@ -0,0 +1,83 @@
+import pandas as pd
+import numpy as np
+import os
+from streams_store import load_index, open_channel, MAX_GAP_SEC
+
+# --- BESTE PRESTATIES (mean-maximal) ---
+# Per activiteit één keer berekend en bewaard; de record-curves zijn daarna een groupby over een kleine tabel
+BEST_EFFORTS_CSV = 'best_efforts.csv'
+WINDOWS = {5: '5s', 15: '15s', 30: '30s', 60: '1m', 300: '5m', 600: '10m', 1200: '20m', 1800: '30m', 3600: '60m'}
+EFFORT_METRICS = {'watts': 'Vermogen', 'velocity_smooth': 'Snelheid', 'heartrate': 'Hartslag'}
+EFFORT_UNITS = {'watts': 'W', 'velocity_smooth': 'km/u', 'heartrate': 'bpm'}
+
+def load_best_efforts():
+    if os.path.exists(BEST_EFFORTS_CSV):
+        try:
+            e = pd.read_csv(BEST_EFFORTS_CSV, index_col=['id', 'metric'])
+            e.columns = e.columns.astype(int)
+            return e
+        except Exception as ex:
+            print(f"⚠️ {BEST_EFFORTS_CSV} onleesbaar ({ex}), we rekenen opnieuw.")
+    return pd.DataFrame(columns=list(WINDOWS), index=pd.MultiIndex.from_arrays([pd.Index([], dtype='int64'), pd.Index([], dtype=object)], names=['id', 'metric']), dtype='float64')
+
+def save_best_efforts(efforts):
+    efforts.sort_index().to_csv(BEST_EFFORTS_CSV, float_format='%.1f')
+
+def mean_max(x, windows=WINDOWS):
+    # Sliding window via cumsum: per venster één aftrekking over de hele reeks, O(n)
+    cs = np.concatenate([[0.0], np.cumsum(x, dtype=np.float64)])
+    return [(cs[w:] - cs[:-w]).max() / w if len(x) >= w else np.nan for w in windows]
+
+def activity_efforts(t, channels):
+    # Naar 1 Hz: elk sample geldt tot het volgende; pauzes tellen voor hoogstens MAX_GAP_SEC
+    dt = np.clip(np.diff(t.astype(np.int64), append=t[-1]), 0, MAX_GAP_SEC)
+    out = {}
+    for key, v in channels.items():
+        valid = (v > 0) if key == 'heartrate' else (v >= 0) if key == 'watts' else ~np.isnan(v)
+        if not valid.any():
+            out[key] = [np.nan] * len(WINDOWS); continue
+        x = np.where(valid, v, 0).astype(np.float64)
+        if key == 'velocity_smooth': x *= 3.6
+        out[key] = mean_max(np.repeat(x, dt))
+    return out
+
+def update_best_efforts(index=None):
+    # Alleen activiteiten met streams die nog niet in de tabel staan; de rest blijft staan
+    index = load_index() if index is None else index
+    efforts = load_best_efforts()
+    done = efforts.index.get_level_values('id')
+    todo = index[(index['n'] > 0) & ~index.index.isin(done)]
+    if todo.empty: return efforts
+
+    rows = []
+    for jaar, acts in todo.groupby('jaar'):
+        chans = {k: open_channel(jaar, k) for k in ['time'] + list(EFFORT_METRICS)}
+        for act_id, r in acts.iterrows():
+            sl = slice(r['offset'], r['offset'] + r['n'])
+            per = activity_efforts(np.asarray(chans['time'][sl]), {k: np.asarray(chans[k][sl]) for k in EFFORT_METRICS})
+            rows += [(act_id, k, *vals) for k, vals in per.items()]
+    new = pd.DataFrame(rows, columns=['id', 'metric'] + list(WINDOWS)).set_index(['id', 'metric'])
+    efforts = new if efforts.empty else pd.concat([efforts, new])
+    save_best_efforts(efforts)
+    print(f"🏅 Beste prestaties berekend voor {len(todo)} nieuwe activiteiten.")
+    return efforts
+
+class BestEfforts:
+    def __init__(self, efforts, df):
+        meta = df[['ID', 'Jaar', 'Categorie', 'Datum']].dropna(subset=['ID']).astype({'ID': 'int64'}).drop_duplicates('ID').set_index('ID')
+        long = efforts.reset_index().melt(id_vars=['id', 'metric'], var_name='venster', value_name='Waarde').dropna(subset=['Waarde'])
+        long = long.join(meta, on='id', how='inner')
+        long['Categorie'] = long['Categorie'].astype(str)
+        # Beste per (jaar, categorie, metric, venster); all-time is daar opnieuw het maximum van
+        keys = ['Jaar', 'Categorie', 'metric', 'venster']
+        self.per_year = long.sort_values('Waarde', ascending=False, kind='stable').drop_duplicates(keys)
+        self.all_time = self.per_year.drop_duplicates(keys[1:])
+
+    def curve(self, cat, metric, year=None):
+        src = self.all_time if year is None else self.per_year[self.per_year['Jaar'] == year]
+        c = src[(src['Categorie'] == cat) & (src['metric'] == metric)]
+        return c.set_index('venster').sort_index()[['Waarde', 'Datum', 'Jaar']]
+
+    def years(self, cat, metric):
+        p = self.per_year
+        return sorted(p.loc[(p['Categorie'] == cat) & (p['metric'] == metric), 'Jaar'].unique(), reverse=True)
@@ -0,0 +1,117 @@
+import functools
+import json
+import os
+import time
+import traceback
+from contextlib import contextmanager
+
+# --- BUILD RAPPORT ---
+# Tijd, rijen en bytes per sectie en per generator functie; na elke build als JSON naast dashboard.html
+BUILD_REPORT_JSON = 'build_report.json'
+BUILD_PROFILE = 'build_profile.prof'
+PROFILE_MODES = ('cprofile', 'tracemalloc')
+PROFILE_TOP = 25
+
+_active = [None]
+
+class BuildReport:
+    def __init__(self, profile=None):
+        if profile not in (None,) + PROFILE_MODES: raise ValueError(f"Onbekende profile mode: {profile}")
+        self.profile = profile
+        self.spans, self.functions, self.stack = [], {}, []
+        self.error = None
+        self._failed = None
+        self.meta = {}
+        self.started = time.strftime('%Y-%m-%d %H:%M:%S')
+        self._t0 = None
+        self._profiler = None
+        self.total_sec = 0.0
+
+    def start(self):
+        _active[0] = self
+        self._t0 = time.perf_counter()
+        if self.profile == 'cprofile':
+            import cProfile
+            self._profiler = cProfile.Profile(); self._profiler.enable()
+        elif self.profile == 'tracemalloc':
+            import tracemalloc
+            tracemalloc.start(10)
+        return self
+
+    def fail(self, exc):
+        self.error = {'span': self._failed, 'type': type(exc).__name__, 'message': str(exc), 'traceback': traceback.format_exc()}
+
+    def finish(self):
+        self.total_sec = time.perf_counter() - self._t0
+        if self._profiler is not None: self._profiler.disable()
+        self.stack.clear()
+        _active[0] = None
+
+    @contextmanager
+    def span(self, name, rows=None):
+        # Geneste spans krijgen een pad ("secties/2026"); bytes kan de aanroeper invullen via het teruggegeven dict
+        path = '/'.join(self.stack + [name])
+        rec = {'span': path, 'rows': rows, 'bytes': None}
+        self.stack.append(name)
+        t0 = time.perf_counter()
+        try:
+            yield rec
+        except Exception:
+            # De binnenste span waar het misging; de buitenste zien dezelfde exceptie daarna nog eens
+            if self._failed is None: self._failed = path
+            rec['failed'] = True
+            raise
+        finally:
+            rec['sec'] = round(time.perf_counter() - t0, 4)
+            if self.profile == 'tracemalloc':
+                import tracemalloc
+                now, peak = tracemalloc.get_traced_memory()
+                rec['mem_mb'], rec['mem_peak_mb'] = round(now / 2**20, 1), round(peak / 2**20, 1)
+            if self.stack and self.stack[-1] == name: self.stack.pop()
+            self.spans.append(rec)
+
+    def count(self, name, sec, out):
+        f = self.functions.setdefault(name, {'calls': 0, 'sec': 0.0, 'bytes': 0})
+        f['calls'] += 1; f['sec'] += sec
+        if isinstance(out, str): f['bytes'] += len(out.encode('utf-8'))
+
+    def profile_summary(self):
+        if self._profiler is not None:
+            import io, pstats
+            self._profiler.dump_stats(BUILD_PROFILE)
+            buf = io.StringIO()
+            pstats.Stats(self._profiler, stream=buf).sort_stats('cumulative').print_stats(PROFILE_TOP)
+            return {'mode': 'cprofile', 'file': BUILD_PROFILE, 'top_cumulative': [l for l in buf.getvalue().splitlines() if l.strip()][-PROFILE_TOP:]}
+        if self.profile == 'tracemalloc':
+            import tracemalloc
+            snap = tracemalloc.take_snapshot(); peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            top = snap.statistics('lineno')[:PROFILE_TOP]
+            return {'mode': 'tracemalloc', 'peak_mb': round(peak / 2**20, 1), 'top_lines': [f"{s.size / 2**20:8.2f} MB  {s.count:>8}x  {s.traceback}" for s in top]}
+        return None
+
+    def as_dict(self):
+        funcs = {k: {**v, 'sec': round(v['sec'], 4)} for k, v in sorted(self.functions.items(), key=lambda kv: -kv[1]['sec'])}
+        return {'started': self.started, 'ok': self.error is None, 'total_sec': round(self.total_sec, 3),
+                **self.meta, 'error': self.error, 'spans': self.spans, 'functions': funcs, 'profile': self.profile_summary()}
+
+    def write(self, path=BUILD_REPORT_JSON):
+        with open(path, 'w', encoding='utf-8') as f: json.dump(self.as_dict(), f, indent=2, ensure_ascii=False, default=str)
+        return path
+
+def traced(fn):
+    # Zonder actief rapport kost dit één functie-aanroep extra; met rapport tijd, aanroepen en bytes van de HTML die terugkomt
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        rep = _active[0]
+        if rep is None: return fn(*args, **kwargs)
+        t0 = time.perf_counter(); out = None
+        try:
+            out = fn(*args, **kwargs)
+            return out
+        finally:
+            rep.count(fn.__name__, time.perf_counter() - t0, out)
+    return wrapper
+
+def file_size(path):
+    return os.path.getsize(path) if os.path.exists(path) else None
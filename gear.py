@@ -0,0 +1,115 @@
+import pandas as pd
+import numpy as np
+import os
+
+# --- MATERIAAL REGELS ---
+# Een regel matcht als al zijn voorwaarden kloppen: 'gear' (stuk tekst in de materiaalnaam), 'categorie', 'type' (lijst),
+# 'vanaf' (inclusief) / 'tot' (exclusief). De datumgrenzen van alle regels knippen de tijdlijn in stukken (IntervalIndex);
+# een regel geldt voor een stuk helemaal of niet. Daarna hangt de uitkomst alleen nog af van (naam, categorie, type, stuk):
+# de regels lopen over die paar unieke combinaties in plaats van over elke activiteit.
+def date_segments(dates, rules):
+    bounds = sorted({pd.Timestamp(r[k]) for r in rules for k in ('vanaf', 'tot') if r.get(k)})
+    breaks = pd.DatetimeIndex([pd.Timestamp.min] + bounds + [pd.Timestamp.max])
+    segments = pd.IntervalIndex.from_breaks(breaks, closed='left')
+    return segments.left, segments.get_indexer(pd.DatetimeIndex(dates).as_unit('ns'))
+
+def resolve_gear(df, rules, first_match=False):
+    # df: 'Gear', 'Datum' en (als de regels ze gebruiken) 'Categorie' / 'Activiteitstype'.
+    # Standaard zien latere regels het resultaat van eerdere; first_match: de eerste regel die past wint.
+    if not rules: return df['Gear'].copy()
+    starts, seg = date_segments(df['Datum'], rules)
+    keys = pd.DataFrame({'Gear': df['Gear'].to_numpy(), 'seg': seg,
+                         'Categorie': df['Categorie'].astype(str).to_numpy() if 'Categorie' in df.columns else '',
+                         'Activiteitstype': df['Activiteitstype'].to_numpy() if 'Activiteitstype' in df.columns else ''})
+    codes = keys.groupby(list(keys.columns), sort=False, dropna=False).ngroup().to_numpy()
+    u = keys.drop_duplicates().reset_index(drop=True)
+    start = pd.Series(starts[u['seg']], index=u.index).where(u['seg'] >= 0)
+    gear, done = u['Gear'].copy(), pd.Series(False, index=u.index)
+    for rule in rules:
+        m = ~done if first_match else pd.Series(True, index=u.index)
+        if 'gear' in rule: m &= gear.astype(str).str.lower().str.contains(rule['gear'].lower(), regex=False, na=False)
+        if 'categorie' in rule: m &= u['Categorie'] == rule['categorie']
+        if 'type' in rule: m &= u['Activiteitstype'].isin(rule['type'])
+        if 'vanaf' in rule: m &= start >= pd.Timestamp(rule['vanaf'])
+        if 'tot' in rule: m &= start < pd.Timestamp(rule['tot'])
+        gear[m] = rule['set']; done |= m
+    return pd.Series(gear.to_numpy()[codes], index=df.index)
+
+# --- KILOMETERTELLER ---
+# Per materiaal en jaar: aantal, km, tijd, laatste gebruik, meest gebruikte categorie, en de stand van de teller aan het eind
+# van dat jaar (cumulatief). Elke rij bewaart een vingerafdruk van de kubuscellen waar hij uit komt; alleen materiaal met
+# een nieuw, gewijzigd of verdwenen jaar wordt opnieuw opgeteld, de rest komt ongewijzigd uit gear_odometer.csv.
+GEAR_ODOMETER_CSV = 'gear_odometer.csv'
+YEAR_COLS = ['n', 'km', 'sec', 'laatst', 'categorie']
+ODOMETER_COLS = ['Gear', 'Jaar'] + YEAR_COLS + ['km_tot', 'sec_tot', 'categorie_tot', 'digest']
+
+def gear_cells(cube):
+    return cube.cube[cube.cube['Gear'] != '']
+
+def year_digests(c):
+    # Afgerond: de volgorde van optellen in de kubus verschuift de laatste bits als er elders rijen bijkomen
+    cells = pd.DataFrame({'Day': c['Day'], 'Categorie': c['Categorie'].astype(str), 'n': c['n'], 'km': c['km'].round(3), 'sec': c['sec'].round(1)})
+    h = pd.Series(pd.util.hash_pandas_object(cells, index=False).to_numpy(), index=c.index)
+    d = h.groupby([c['Gear'], c['Jaar'].astype('int64')]).sum()
+    return d.map('{:016x}'.format)
+
+def year_table(c):
+    # c: kubuscellen van de materialen die opnieuw moeten; telkens alle jaren van een materiaal, voor de cumulatieve stand
+    if c.empty: return pd.DataFrame(columns=ODOMETER_COLS)
+    per_cat = c.groupby(['Gear', 'Jaar', 'Categorie'], observed=True)['n'].sum().unstack('Categorie', fill_value=0)
+    t = c.groupby(['Gear', 'Jaar'])[['n', 'km', 'sec']].sum()
+    t['laatst'] = (c['Jaar'] * 1000 + c['Day']).groupby([c['Gear'], c['Jaar']]).max()
+    # Bij gelijke aantallen wint de eerste categorie in de vaste volgorde, net als overal in het dashboard
+    t['categorie'] = per_cat.idxmax(axis=1).astype(str)
+    t['km_tot'] = t.groupby(level='Gear')['km'].cumsum()
+    t['sec_tot'] = t.groupby(level='Gear')['sec'].cumsum()
+    t['categorie_tot'] = per_cat.groupby(level='Gear').cumsum().idxmax(axis=1).astype(str)
+    t['digest'] = year_digests(c)
+    return t.reset_index()[ODOMETER_COLS]
+
+def load_odometer():
+    if os.path.exists(GEAR_ODOMETER_CSV):
+        try:
+            return pd.read_csv(GEAR_ODOMETER_CSV, keep_default_na=False, dtype={'digest': str})
+        except Exception as e:
+            print(f"⚠️ {GEAR_ODOMETER_CSV} onleesbaar ({e}), we tellen opnieuw.")
+    return None
+
+def update_odometer(cube):
+    c = gear_cells(cube)
+    digests = year_digests(c)
+    prev = load_odometer()
+    gears = set(digests.index.get_level_values('Gear'))
+    if prev is not None and list(prev.columns) == ODOMETER_COLS:
+        old = prev.set_index(['Gear', 'Jaar'])['digest']
+        old.index = old.index.set_levels(old.index.levels[1].astype('int64'), level=1)
+        # Nieuw of anders dan vorige keer, of een jaar dat er niet meer is (activiteit verwijderd of ander materiaal)
+        diff = digests.index[digests.ne(old.reindex(digests.index))].union(old.index.difference(digests.index))
+        touched = set(diff.get_level_values('Gear'))
+        keep = prev[~prev['Gear'].isin(touched)]
+    else:
+        touched, keep = gears, None
+    if touched or keep is None:
+        new = year_table(c[c['Gear'].isin(touched)])
+        table = pd.concat([keep, new]) if keep is not None and len(keep) else new
+        table = table.sort_values(['Gear', 'Jaar']).reset_index(drop=True)
+        table.to_csv(GEAR_ODOMETER_CSV, index=False)
+    else:
+        table = prev
+    print(f"🚲 Kilometerteller: {len(touched & gears)} van {len(gears)} materiaal bijgewerkt.")
+    return GearOdometer(table)
+
+class GearOdometer:
+    def __init__(self, table):
+        self.table = table
+        # Teller vandaag = laatste jaar van elk materiaal
+        self.now = table.groupby('Gear').tail(1).set_index('Gear') if len(table) else table.set_index('Gear')
+
+    def year(self, yr=None):
+        # Per materiaal km, sec, Categorie en laatste gebruik; nieuwste gebruik eerst
+        if yr is None:
+            g = pd.DataFrame({'km': self.now['km_tot'], 'sec': self.now['sec_tot'], 'Categorie': self.now['categorie_tot'], 'laatst': self.now['laatst']})
+        else:
+            t = self.table[self.table['Jaar'] == yr].set_index('Gear')
+            g = pd.DataFrame({'km': t['km'], 'sec': t['sec'], 'Categorie': t['categorie'], 'laatst': t['laatst']})
+        return g.sort_index().sort_values('laatst', ascending=False)
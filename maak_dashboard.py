@@ -2,14 +2,31 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-from datetime import datetime, timedelta
+import plotly.io as pio
+from plotly.offline import get_plotlyjs_version
+from datetime import datetime
 import warnings
-import re
+import argparse
+import hashlib
+from html import escape
+import json
+import os
+from activity_store import load_activities
+from aggregates import AggregateCube
+from streaks import compute_streaks
+from streams_store import zone_seconds
+from best_efforts import BestEfforts, load_best_efforts, WINDOWS, EFFORT_METRICS, EFFORT_UNITS
+from training_load import activity_load, daily_load, update_training_load, FTP_FROM_20M
+from routes import RouteGrid, heatmap_png
+from gear import update_odometer
+from periods import rolling, month_to_date, year_to_date, year_window, last_year, previous, DAY
+from build_report import BuildReport, traced, file_size, PROFILE_MODES, BUILD_REPORT_JSON
 
 warnings.filterwarnings("ignore", category=UserWarning)
 
 # --- CONFIGURATIE ---
 PLOT_CONFIG = {'displayModeBar': False, 'staticPlot': False, 'scrollZoom': False, 'responsive': True}
+PLOTLY_JS_URL = f"https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js"
 
 HR_ZONES = {'Z1 Herstel': 135, 'Z2 Duur': 152, 'Z3 Tempo': 168, 'Z4 Drempel': 180, 'Z5 Max': 220}
 
@@ -33,30 +50,6 @@ COLORS = {
 
 YEAR_COLORS = ['#00e5ff', '#10b981', '#a855f7', '#facc15', '#ff007f']
 
-# --- DATUM FIX ---
-def solve_dates(date_str):
-    if pd.isna(date_str) or str(date_str).strip() == "": return pd.NaT
-    d_map = {'jan':1,'feb':2,'mrt':3,'apr':4,'mei':5,'jun':6,'jul':7,'aug':8,'sep':9,'okt':10,'nov':11,'dec':12}
-    try:
-        clean = re.sub(r'[^a-zA-Z0-9\s:]', '', str(date_str).lower())
-        parts = clean.split()
-        day, month_str, year = int(parts[0]), parts[1][:3], int(parts[2])
-        return pd.Timestamp(year=year, month=d_map.get(month_str, 1), day=day, hour=12) 
-    except: return pd.to_datetime(date_str, errors='coerce')
-
-# --- CATEGORIE LOGICA ---
-def determine_category(row):
-    t = str(row['Activiteitstype']).lower().strip()
-    n = str(row['Naam']).lower().strip()
-    
-    if 'train' in t or 'train' in n or any(x in t for x in ['padel', 'tennis', 'squash', 'work', 'fit']): 
-        return 'Padel'
-    if any(x in t for x in ['fiets', 'rit', 'mtb', 'mountainbike', 'ride', 'cycle', 'gravel', 'velomobiel', 'e-bike']) or any(x in n for x in ['fiets', 'rit', 'mtb', 'mountainbike']): 
-        return 'Mountainbike'
-    if any(x in t for x in ['wandel', 'hike', 'walk']): 
-        return 'Wandelen'
-    return 'Overig'
-
 def get_sport_style(cat):
     styles = {
         'Mountainbike': ('🚴', COLORS['mountainbike']),
@@ -86,17 +79,58 @@ def format_diff_html(cur, prev, unit=""):
     arrow = "▲" if diff >= 0 else "▼"
     return f'<span style="color:{color}; font-weight:700; font-size:0.85em; font-family: monospace;">{arrow} {abs(diff):.1f} {unit}</span>'
 
+# --- GRAFIEKEN ---
+# Alle figuren gaan als JSON spec in één blob; de browser tekent ze pas als ze in beeld komen
+CHART_SPECS = {}
+CHART_PREFIX = ['c']
+# Templates (plotly_dark is ~7 kB) staan één keer in de pagina; een grafiek verwijst er bij naam naar.
+# Zo zit het template niet in elk fragment, en blijft een fragment geldig ongeacht welke andere tabs deze run gebouwd zijn.
+PAGE_TEMPLATES = ['plotly_dark']
+CHART_TEMPLATES = {}  # JSON van het template -> naam, gevuld bij het eerste gebruik
+
+def page_template(name):
+    # Zoals het template in fig.to_plotly_json() terechtkomt
+    return go.Figure(layout=dict(template=name)).to_plotly_json()['layout']['template']
+
+def template_names():
+    if not CHART_TEMPLATES:
+        CHART_TEMPLATES.update({pio.json.to_json_plotly(page_template(n)): n for n in PAGE_TEMPLATES})
+    return CHART_TEMPLATES
+
+def reset_charts(prefix='c'):
+    # Elke sectie krijgt eigen id's, zodat losse fragmenten naast elkaar op één pagina passen
+    CHART_SPECS.clear(); CHART_PREFIX[0] = prefix
+
+def chart_html(fig, css="chart-box"):
+    spec = fig.to_plotly_json()
+    tpl = spec['layout'].get('template')
+    name = template_names().get(pio.json.to_json_plotly(tpl)) if tpl is not None else None
+    if name:
+        del spec['layout']['template']; spec['tpl'] = name
+    cid = f"{CHART_PREFIX[0]}-c{len(CHART_SPECS)}"
+    CHART_SPECS[cid] = spec
+    height = fig.layout.height or 300
+    return f'<div class="{css}"><div class="plot" data-chart="{cid}" style="min-height:{height}px"></div></div>'
+
+@traced
+def chart_payload():
+    data = pio.json.to_json_plotly({'charts': CHART_SPECS, 'config': PLOT_CONFIG})
+    return f'<script class="chart-data" type="application/json">{data}</script>'
+
+def templates_payload():
+    data = pio.json.to_json_plotly({n: page_template(n) for n in PAGE_TEMPLATES})
+    return f'<script id="chart-templates" type="application/json">{data}</script>'
+
 # --- UI GENERATORS ---
-def create_ytd_chart(df, current_year):
+# @traced alleen op generatoren die een heel blok bouwen; kleine helpers per kaart (generate_kpi, ...) niet, die lopen honderden keren per build
+@traced
+def create_ytd_chart(cube, current_year):
     fig = go.Figure()
-    years_to_plot = sorted(df['Jaar'].unique(), reverse=True)[:5]
+    # Alleen jaren t/m het getoonde jaar, zodat een oud jaar niet verandert door nieuwe ritten
+    years_to_plot = [y for y in cube.years if y <= current_year][:5]
     
     for i, y in enumerate(years_to_plot):
-        df_y = df[df['Jaar'] == y].groupby('Day')['Afstand_km'].sum().reset_index()
-        if df_y.empty: continue
-        
-        all_days = pd.DataFrame({'Day': range(1, 367)})
-        df_y = pd.merge(all_days, df_y, on='Day', how='left').fillna(0)
+        df_y = cube.daily_km.loc[y].reindex(range(1, 367), fill_value=0).rename_axis('Day').reset_index(name='Afstand_km')
         df_y['Cum_Afstand'] = df_y['Afstand_km'].cumsum()
         
         if y == datetime.now().year:
@@ -123,44 +157,33 @@ def create_ytd_chart(df, current_year):
         legend=dict(orientation="h", y=-0.25, x=0.5, xanchor="center"), 
         font=dict(color='#94a3b8')
     )
-    return f'<div class="chart-box full-width">{fig.to_html(full_html=False, include_plotlyjs="cdn", config=PLOT_CONFIG)}</div>'
+    return chart_html(fig, "chart-box full-width")
 
+@traced
 def calculate_streaks(df):
-    valid = df.dropna(subset=['Datum']).sort_values('Datum')
+    valid = df.dropna(subset=['Datum'])
     if valid.empty: return {}
-    valid['WeekStart'] = valid['Datum'].dt.to_period('W-MON').dt.start_time
-    weeks = sorted(valid['WeekStart'].unique()); days = sorted(valid['Datum'].dt.date.unique())
-    cur_wk, max_wk, max_wk_dates = 0, 0, "-"
-    if weeks:
-        if (pd.Timestamp.now().to_period('W-MON').start_time - weeks[-1]).days <= 7:
-            cur_wk = 1
-            for i in range(len(weeks)-2, -1, -1):
-                if (weeks[i+1]-weeks[i]).days == 7: cur_wk+=1
-                else: break
-        temp, start = 1, weeks[0]; max_wk, max_wk_dates = 1, f"({weeks[0].strftime('%d %b %y')})"
-        for i in range(1, len(weeks)):
-            if (weeks[i]-weeks[i-1]).days == 7: temp+=1
-            else:
-                if temp > max_wk: max_wk = temp; max_wk_dates = f"({start.strftime('%d %b %y')} - {(weeks[i-1]+timedelta(days=6)).strftime('%d %b %y')})"
-                temp = 1; start = weeks[i]
-        if temp > max_wk: max_wk = temp; max_wk_dates = f"({start.strftime('%d %b %y')} - {(weeks[-1]+timedelta(days=6)).strftime('%d %b %y')})"
-    cur_d, max_d, max_d_dates = 0, 0, "-"
-    if days:
-        if (datetime.now().date() - days[-1]).days <= 1: cur_d = 1
-        for i in range(len(days)-2, -1, -1):
-            if (days[i+1]-days[i]).days == 1: cur_d+=1
-            else: break
-        temp, start = 1, days[0]; max_d, max_d_dates = 1, f"({days[0].strftime('%d %b')})"
-        for i in range(1, len(days)):
-            if (days[i]-days[i-1]).days == 1: temp+=1
-            else:
-                if temp > max_d: max_d = temp; max_d_dates = f"({start.strftime('%d %b')} - {days[i-1].strftime('%d %b %y')})"
-                temp = 1; start = days[i]
-        if temp > max_d: max_d = temp; max_d_dates = f"({start.strftime('%d %b')} - {days[-1].strftime('%d %b %y')})"
-    return {'cur_week':cur_wk, 'max_week':max_wk, 'max_week_dates':max_wk_dates, 'cur_day':cur_d, 'max_day':max_d, 'max_day_dates':max_d_dates}
+    wk = compute_streaks(valid['Datum'], 'week'); d = compute_streaks(valid['Datum'], 'day'); mo = compute_streaks(valid['Datum'], 'month')
+    
+    def span(r, fmt_start, fmt_end):
+        if r['longest'] == 0: return "-"
+        if r['longest'] == 1: return f"({r['longest_start'].strftime(fmt_end)})"
+        return f"({r['longest_start'].strftime(fmt_start)} - {r['longest_end'].strftime(fmt_end)})"
+    
+    per_cat = compute_streaks(valid['Datum'], 'week', groups=valid['Categorie'].astype(str))
+    return {'cur_week':wk['current'], 'max_week':wk['longest'], 'max_week_dates':span(wk, '%d %b %y', '%d %b %y'),
+            'cur_day':d['current'], 'max_day':d['longest'], 'max_day_dates':span(d, '%d %b', '%d %b %y'),
+            'cur_month':mo['current'], 'max_month':mo['longest'], 'max_month_dates':span(mo, '%b %y', '%b %y'),
+            'per_cat_week':per_cat}
 
+@traced
 def generate_streaks_box(df):
     s = calculate_streaks(df)
+    cats = ""
+    for cat, r in s.get('per_cat_week', {}).items():
+        if cat == 'Overig' or r['longest'] < 2: continue
+        icon, color = get_sport_style(cat)
+        cats += f'<div class="streak-row" style="font-size:12px;"><span class="label">{icon} {cat} weken op rij:</span><span class="val"><span style="color:{color};">{r["current"]}</span> <span class="streak-sub">(record {r["longest"]})</span></span></div>'
     return f"""<div class="streaks-section">
         <h3 class="box-title">🔥 MOTIVATIE REEKSEN</h3>
         <div class="streaks-container" style="display:flex; gap:30px; flex-wrap:wrap;">
@@ -174,19 +197,25 @@ def generate_streaks_box(df):
                 <div class="streak-row"><span class="label">Record Dagelijks:</span><span class="val" style="color:var(--text);">{s.get('max_day',0)} dagen</span></div>
                 <div class="streak-sub">{s.get('max_day_dates','-')}</div>
             </div>
+            <div style="flex:1; min-width:200px;">
+                <div class="streak-row"><span class="label">Huidig Maandelijks:</span><span class="val" style="color:var(--primary);">{s.get('cur_month',0)} maanden</span></div>
+                <div class="streak-row"><span class="label">Record Maandelijks:</span><span class="val" style="color:var(--text);">{s.get('max_month',0)} maanden</span></div>
+                <div class="streak-sub">{s.get('max_month_dates','-')}</div>
+            </div>
         </div>
+        {f'<div style="margin-top:12px; border-top:1px solid rgba(255,255,255,0.05); padding-top:10px;">{cats}</div>' if cats else ''}
     </div>"""
 
-def create_monthly_charts(df_cur, df_prev, year):
+@traced
+def create_monthly_charts(cube, year):
     months = ['Jan','Feb','Mrt','Apr','Mei','Jun','Jul','Aug','Sep','Okt','Nov','Dec']
-    def get_c(df, cat): return df[df['Categorie'] == cat].groupby(df['Datum'].dt.month).size().reindex(range(1,13), fill_value=0)
     
     html = '<div class="chart-grid">'
     
     for cat, color, title in [('Mountainbike', COLORS['mountainbike'], '🚴 MTB (Sessies)'), 
                               ('Wandelen', COLORS['walk'], '🚶 Wandelen (Sessies)'),
                               ('Padel', COLORS['padel'], '🎾 Padel (Sessies)')]:
-        p = get_c(df_prev, cat); c = get_c(df_cur, cat)
+        p = cube.monthly_counts(year-1, cat); c = cube.monthly_counts(year, cat)
         fig = go.Figure()
         fig.add_trace(go.Bar(x=months, y=p, name=f"{year-1}", marker_color=COLORS['ref_gray']))
         fig.add_trace(go.Bar(x=months, y=c, name=f"{year}", marker_color=color))
@@ -199,41 +228,93 @@ def create_monthly_charts(df_cur, df_prev, year):
             xaxis=dict(fixedrange=True, tickmode='array', tickvals=months, range=[-0.5, 11.5]), 
             yaxis=dict(fixedrange=True, gridcolor='rgba(255,255,255,0.05)'), font=dict(color='#94a3b8')
         )
-        html += f'<div class="chart-box">{fig.to_html(full_html=False, include_plotlyjs="cdn", config=PLOT_CONFIG)}</div>'
+        html += chart_html(fig)
         
     return html + '</div>'
 
-def create_heatmap(df_yr):
-    df_hm = df_yr.copy(); df_hm['Uur'] = df_hm['Datum'].dt.hour; df_hm['Weekdag'] = df_hm['Datum'].dt.day_name()
-    days_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-    nl_days = {'Monday':'Ma', 'Tuesday':'Di', 'Wednesday':'Wo', 'Thursday':'Do', 'Friday':'Vr', 'Saturday':'Za', 'Sunday':'Zo'}
-    grouped = df_hm.groupby(['Weekdag', 'Uur']).size().reset_index(name='Aantal')
-    pivot = grouped.pivot(index='Uur', columns='Weekdag', values='Aantal').fillna(0).reindex(columns=days_order)
-    if pivot.empty: return ""
+@traced
+def create_heatmap(cube, yr):
+    nl_days = ['Ma', 'Di', 'Wo', 'Do', 'Vr', 'Za', 'Zo']
+    grouped = cube.heatmap(yr)
+    if grouped.empty: return ""
+    pivot = grouped.unstack('Weekdag').fillna(0).reindex(columns=range(7)).sort_index()
     fig = go.Figure(data=go.Heatmap(z=pivot.values, x=[nl_days[d] for d in pivot.columns], y=pivot.index, colorscale=[[0, 'rgba(255,255,255,0.03)'], [1, COLORS['mountainbike']]], showscale=False))
     fig.update_layout(title='📅 Hittekaart (Wanneer sport je?)', template='plotly_dark', margin=dict(t=50,b=40,l=10,r=10), height=300, paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', yaxis=dict(title='', range=[6, 23], fixedrange=True), xaxis=dict(fixedrange=True), font=dict(color='#94a3b8'))
-    return f'<div class="chart-box full-width">{fig.to_html(full_html=False, include_plotlyjs="cdn", config=PLOT_CONFIG)}</div>'
+    return chart_html(fig, "chart-box full-width")
+
+@traced
+def create_route_map(routes, yr=None):
+    # Eén PNG met de dichtheid in plaats van elke coördinaat als JSON naar de browser
+    res = heatmap_png(routes.density(yr), tuple(int(COLORS['primary'][i:i + 2], 16) for i in (1, 3, 5)))
+    if res is None: return ""
+    src, shown, total = res
+    buiten = round(100 * (total - shown) / total)
+    rest = f" · {buiten}% buiten beeld" if buiten else ""
+    return f'<div class="chart-box full-width"><div class="box-title">🗺️ Routes {yr or "all-time"} · {routes.ride_count(yr)} activiteiten{rest}</div><img class="route-map" src="{src}" alt="Heatmap van de routes"></div>'
+
+@traced
+def load_zone_time(df, zs):
+    # Echte seconden per hartslagzone uit de streams, opgeteld per jaar en categorie
+    if zs.empty: return zs
+    d = df[['ID', 'Jaar', 'Categorie']].dropna(subset=['ID']).astype({'ID': 'int64'}).join(zs, on='ID', how='inner')
+    return d.groupby(['Jaar', 'Categorie'], observed=True)[list(HR_ZONES)].sum()
+
+@traced
+def create_zone_chart(zones, yr):
+    if zones.empty or yr not in zones.index.get_level_values('Jaar'): return ""
+    z = zones.loc[yr]
+    z = z[z.sum(axis=1) > 0]
+    if z.empty: return ""
+    fig = go.Figure()
+    for i, zone in enumerate(HR_ZONES):
+        uren = z[zone] / 3600
+        fig.add_trace(go.Bar(y=[f"{get_sport_style(c)[0]} {c}" for c in z.index], x=uren, name=zone, orientation='h', marker_color=COLORS[f'z{i+1}'],
+                             customdata=[format_time(v) for v in z[zone]], hovertemplate='%{customdata}<extra>' + zone + '</extra>'))
+    fig.update_layout(title='❤️ Tijd in hartslagzones', template='plotly_dark', barmode='stack', margin=dict(t=50,b=40,l=10,r=10), height=260, paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', legend=dict(orientation='h', y=-0.2), xaxis=dict(title='uren', fixedrange=True), yaxis=dict(fixedrange=True), font=dict(color='#94a3b8'))
+    return chart_html(fig, "chart-box full-width")
+
+@traced
+def load_training(df, zs, efforts):
+    # FTP geschat uit het beste 20 minuten vermogen, alleen nodig voor ritten met wattage maar zonder hartslag
+    c = efforts.curve('Mountainbike', 'watts')
+    ftp = c['Waarde'].get(1200) * FTP_FROM_20M if 1200 in c.index else None
+    return update_training_load(daily_load(df, activity_load(df, HR_ZONES, zs, ftp)))
+
+@traced
+def create_load_chart(training, yr=None):
+    # Eén punt per week (stand op zondag), ook in de jaartabs: een dagreeks zijn 3 x 365 punten per jaar voor een lijn die traag beweegt
+    t = (training[training.index.year == yr] if yr else training).resample('W-SUN').last().dropna(how='all')
+    if t.empty or t['ctl'].max() <= 0: return ""
+    tsb = t['tsb'].round(1)
+    fig = go.Figure()
+    # Vorm boven en onder nul als twee sporen met elk één kleur, in plaats van een kleur per staaf
+    for y, color, legend in ((tsb.where(tsb >= 0), COLORS['padel'], True), (tsb.where(tsb < 0), COLORS['z4'], False)):
+        fig.add_trace(go.Bar(x=t.index, y=y, name='Vorm (TSB)', legendgroup='tsb', showlegend=legend, marker_color=color, opacity=0.5))
+    fig.add_trace(go.Scatter(x=t.index, y=t['ctl'].round(1), name='Fitheid (CTL)', mode='lines', line=dict(color=COLORS['primary'], width=3)))
+    fig.add_trace(go.Scatter(x=t.index, y=t['atl'].round(1), name='Vermoeidheid (ATL)', mode='lines', line=dict(color=COLORS['z3'], width=2)))
+    fig.update_layout(title='💪 Fitheid, vermoeidheid en vorm', template='plotly_dark', barmode='relative', margin=dict(t=50,b=40,l=10,r=10), height=300, paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', legend=dict(orientation='h', y=-0.2), hovermode='x unified', xaxis=dict(fixedrange=True), yaxis=dict(fixedrange=True), font=dict(color='#94a3b8'))
+    return chart_html(fig, "chart-box full-width")
 
-def generate_sport_cards(df_yr, df_prev_comp):
+@traced
+def generate_sport_cards(cur, prev):
+    # cur / prev: totalen per categorie over twee periodes (cube.period_by_cat)
     html = '<div class="sport-grid">'
-    cp = df_yr['Categorie'].unique(); co = ['Mountainbike', 'Padel', 'Wandelen', 'Overig']
+    cp = list(cur.index); co = ['Mountainbike', 'Padel', 'Wandelen', 'Overig']
     cats = [c for c in co if c in cp] + [c for c in cp if c not in co]
     
     for cat in cats:
-        df_s = df_yr[df_yr['Categorie'] == cat]; df_p = df_prev_comp[df_prev_comp['Categorie'] == cat] if df_prev_comp is not None else pd.DataFrame()
-        if df_s.empty: continue
+        s = cur.loc[cat]; p = prev.loc[cat] if cat in prev.index else pd.Series(0.0, index=cur.columns)
         icon, color = get_sport_style(cat)
         
-        n=len(df_s); np=len(df_p); d=df_s['Afstand_km'].sum(); dp=df_p['Afstand_km'].sum() if not df_p.empty else 0
-        t=df_s['Beweegtijd_sec'].sum(); tp=df_p['Beweegtijd_sec'].sum() if not df_p.empty else 0
-        hr=df_s['Hartslag'].mean(); wt=df_s['Wattage'].mean() if 'Wattage' in df_s.columns else None
-        cal = df_s['Calorieën'].sum() if 'Calorieën' in df_s.columns else 0
-        elev = df_s['Hoogtemeters'].sum() if 'Hoogtemeters' in df_s.columns else 0
-        elev_p = df_p['Hoogtemeters'].sum() if 'Hoogtemeters' in df_p.columns and not df_p.empty else 0
+        n=int(s['n']); np_=int(p['n']); d=s['km']; dp=p['km']
+        t=s['sec']; tp=p['sec']
+        hr=s['hr']; wt=s['w']
+        cal = s['kcal']
+        elev = s['hm']; elev_p = p['hm']
         
         spd = f"{(d/(t/3600)):.1f} km/u" if t > 0 and cat != 'Padel' else "-"
         
-        rows = f"""<div class="stat-row"><span>Sessies</span><div class="val-group"><strong>{n}</strong>{format_diff_html(n,np)}</div></div>
+        rows = f"""<div class="stat-row"><span>Sessies</span><div class="val-group"><strong>{n}</strong>{format_diff_html(n,np_)}</div></div>
                    <div class="stat-row"><span>Tijd</span><div class="val-group"><strong>{format_time(t)}</strong>{format_diff_html(t/3600,tp/3600,"u")}</div></div>"""
         
         if cat != 'Padel': 
@@ -249,27 +330,24 @@ def generate_sport_cards(df_yr, df_prev_comp):
         html += f"""<div class="sport-card"><div class="sport-header" style="color:{color}"><div class="icon-circle" style="background:rgba(255,255,255,0.05); border:1px solid {color}40;">{icon}</div><h3>{cat}</h3></div><div class="sport-body">{rows}</div></div>"""
     return html + '</div>'
 
-def generate_yearly_gear(df_yr, df_all, all_time_mode=False):
-    df_g = df_all if all_time_mode else df_yr
-    df_g = df_g.dropna(subset=['Gear']).copy()
-    df_g = df_g[df_g['Gear'].str.strip() != '']
-    if df_g.empty: return '<p style="color:var(--text_light); font-size:13px; padding:20px;">Geen materiaalgegevens bekend.</p>'
+@traced
+def generate_yearly_gear(odometer, yr=None, all_time_mode=False):
+    gy = odometer.year(None if all_time_mode else yr)
+    if gy.empty: return '<p style="color:var(--text_light); font-size:13px; padding:20px;">Geen materiaalgegevens bekend.</p>'
+    ga = odometer.year()
     
-    gears = df_g['Gear'].unique()
     html = '<div class="kpi-grid">'
     
-    for g in gears:
-        dy = df_g[df_g['Gear'] == g]
-        ky = dy['Afstand_km'].sum()
-        sy = dy['Beweegtijd_sec'].sum()
+    for g, row in gy.iterrows():
+        ky = row['km']
+        sy = row['sec']
         
-        act_mode = dy['Categorie'].mode()[0] if not dy.empty else 'Mountainbike'
+        act_mode = row['Categorie']
         icon = '👟' if act_mode == 'Wandelen' else '🚲'
         verb = 'Gelopen' if icon == '👟' else 'Gereden'
         
-        da = df_all[df_all['Gear'] == g]
-        ka = da['Afstand_km'].sum()
-        sa = da['Beweegtijd_sec'].sum()
+        ka = ga.at[g, 'km']
+        sa = ga.at[g, 'sec']
         
         html += f"""
         <div class="kpi-card" style="display:flex; flex-direction:column; gap:12px;">
@@ -292,31 +370,28 @@ def generate_yearly_gear(df_yr, df_all, all_time_mode=False):
             <div style="padding:4px 8px;">
                 <div style="font-size:10px; color:var(--text_light); text-transform:uppercase; font-weight:700; margin-bottom:4px; letter-spacing:0.5px;">All-Time Totaal</div>
                 <div style="display:flex; justify-content:space-between; align-items:flex-end;">
-                    <span style="font-size:15px; font-weight:700; color:var(--text_light); font-variant-numeric: tabular-nums;">{ka:,.0f} km</span>
-                    <span style="font-size:12px; color:var(--text_light); font-weight:600;">{sa/3600:,.1f} u</span>
+                    <span class="gear-all" data-gear="{escape(g)}" data-f="km" style="font-size:15px; font-weight:700; color:var(--text_light); font-variant-numeric: tabular-nums;">{ka:,.0f} km</span>
+                    <span class="gear-all" data-gear="{escape(g)}" data-f="u" style="font-size:12px; color:var(--text_light); font-weight:600;">{sa/3600:,.1f} u</span>
                 </div>
             </div>"""
             
         html += "</div>"
     return html + "</div>"
 
-def generate_hall_of_fame(df):
+@traced
+def generate_hall_of_fame(cube, yr=None, efforts=None):
     html = '<div class="hof-grid">'
-    df_h = df.dropna(subset=['Datum']).copy()
     
     for cat in ['Mountainbike', 'Wandelen']:
-        df_s = df_h[df_h['Categorie'] == cat]
-        if df_s.empty: continue
+        if cube.select(year=yr, cat=cat).empty: continue
         icon, color = get_sport_style(cat)
         
         def t3(col,u=""):
-            if col not in df_s.columns: return ""
-            ds = df_s[df_s[col] > 0].sort_values(col, ascending=False).head(3)
+            ds = cube.top(cat, col, yr)
             if ds.empty: return ""
             
             r=""
-            for i,(_,row) in enumerate(ds.iterrows()):
-                v=row[col]
+            for i,(v,datum) in enumerate(zip(ds['Waarde'], ds['Datum'])):
                 if col == 'Beweegtijd_sec':
                     h, rem = divmod(v, 3600); m, _ = divmod(rem, 60)
                     val = f"{int(h)}u {int(m):02d}m" if h > 0 else f"{int(m)}m"
@@ -326,7 +401,7 @@ def generate_hall_of_fame(df):
                 r += f"""
                 <div class="top3-item" style="display:flex; justify-content:space-between; align-items:center; margin-bottom:8px; border-bottom:1px solid rgba(255,255,255,0.05); padding-bottom:6px;">
                     <span style="font-weight:600; color:var(--text); font-size:13px;">{"🥇🥈🥉"[i]} {val}</span>
-                    <span class="date" style="font-size:11px; color:var(--text_light); background:rgba(255,255,255,0.05); padding:2px 8px; border-radius:12px;">{row["Datum"].strftime("%d-%m-%y")}</span>
+                    <span class="date" style="font-size:11px; color:var(--text_light); background:rgba(255,255,255,0.05); padding:2px 8px; border-radius:12px;">{datum.strftime("%d-%m-%y")}</span>
                 </div>"""
             return r
             
@@ -335,18 +410,77 @@ def generate_hall_of_fame(df):
         
         if cat == 'Mountainbike':
             secs += f'<div class="hof-sec" style="margin-top:10px;"><div class="sec-lbl">Snelste Gem.</div>{t3("Gem_Snelheid","km/u")}</div>'
+            if efforts is not None: secs += best_effort_rows(efforts, cat, yr)
             
         html += f"""<div class="hof-card"><div class="hof-header" style="color:{color}; font-size:18px; font-weight:700; display:flex; gap:8px; align-items:center; margin-bottom:15px;">{icon} {cat}</div>{secs}</div>"""
     return html + '</div>'
 
-def generate_logbook(df):
-    rows = ""
-    for _, r in df.sort_values('Datum', ascending=False).iterrows():
-        km = f"{r['Afstand_km']:.1f}" if r['Afstand_km'] > 0 else "-"
-        hr = f"{r['Hartslag']:.0f}" if pd.notna(r['Hartslag']) and r['Hartslag'] > 0 else "-"
-        
-        rows += f"<tr><td>{r['Datum'].strftime('%d-%m')}</td><td>{get_sport_style(r['Categorie'])[0]}</td><td>{r['Naam']}</td><td align='center'>{hr}</td><td align='right'><strong>{km}</strong></td></tr>"
-    return f'<div class="chart-box full-width" style="overflow-x:auto;"><table class="log-table" style="min-width:600px;"><thead><tr><th>Datum</th><th>Type</th><th>Naam activiteit</th><th align="center">❤️ bpm</th><th align="right">km</th></tr></thead><tbody>{rows}</tbody></table></div>'
+# --- BESTE PRESTATIES (uit de streams) ---
+PR_WINDOWS = [5, 60, 300, 1200, 3600]
+
+def pr_metric(efforts, cat):
+    # Vermogen als er een wattagemeter was, anders snelheid
+    for metric in ['watts', 'velocity_smooth']:
+        if not efforts.curve(cat, metric).empty: return metric
+    return None
+
+def best_effort_rows(efforts, cat, yr=None):
+    metric = pr_metric(efforts, cat)
+    if metric is None: return ""
+    c = efforts.curve(cat, metric, yr).reindex(PR_WINDOWS).dropna(subset=['Waarde'])
+    if c.empty: return ""
+    r = ""
+    for w, row in c.iterrows():
+        r += f"""
+                <div class="top3-item" style="display:flex; justify-content:space-between; align-items:center; margin-bottom:8px; border-bottom:1px solid rgba(255,255,255,0.05); padding-bottom:6px;">
+                    <span style="font-weight:600; color:var(--text); font-size:13px;">⚡ {WINDOWS[w]}: {row['Waarde']:.0f} {EFFORT_UNITS[metric]}</span>
+                    <span class="date" style="font-size:11px; color:var(--text_light); background:rgba(255,255,255,0.05); padding:2px 8px; border-radius:12px;">{row['Datum'].strftime("%d-%m-%y")}</span>
+                </div>"""
+    return f'<div class="hof-sec" style="margin-top:10px;"><div class="sec-lbl">Beste {EFFORT_METRICS[metric]}</div>{r}</div>'
+
+@traced
+def create_pr_curve(efforts, yr=None, cat='Mountainbike'):
+    metric = pr_metric(efforts, cat)
+    if metric is None: return ""
+    # Jaar-tab: dit jaar tegen all-time; Carrière: de laatste 5 jaren naast elkaar
+    lines = [(str(yr), efforts.curve(cat, metric, yr), YEAR_COLORS[0]), ('All-time', efforts.curve(cat, metric), COLORS['gold'])] if yr else \
+            [(str(y), efforts.curve(cat, metric, y), YEAR_COLORS[i % len(YEAR_COLORS)]) for i, y in enumerate(efforts.years(cat, metric)[:5])]
+    fig = go.Figure()
+    for name, c, color in lines:
+        if c.empty: continue
+        fig.add_trace(go.Scatter(x=[WINDOWS[w] for w in c.index], y=c['Waarde'].round(1), name=name, mode='lines+markers', line=dict(color=color, width=3, dash='dot' if name == 'All-time' else 'solid'),
+                                 customdata=c['Datum'].dt.strftime('%d-%m-%y'), hovertemplate='%{y} ' + EFFORT_UNITS[metric] + ' (%{customdata})<extra>' + name + '</extra>'))
+    if not fig.data: return ""
+    fig.update_layout(title=f'⚡ {EFFORT_METRICS[metric]}curve (beste gemiddelde per duur)', template='plotly_dark', margin=dict(t=50,b=40,l=10,r=10), height=300, paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', legend=dict(orientation='h', y=-0.2), xaxis=dict(type='category', categoryorder='array', categoryarray=list(WINDOWS.values()), fixedrange=True), yaxis=dict(title=EFFORT_UNITS[metric], fixedrange=True), font=dict(color='#94a3b8'))
+    return chart_html(fig, "chart-box full-width")
+
+def generate_logbook(yr):
+    # Alleen een placeholder: de rijen komen uit één gedeelde JSON payload en worden in de browser gevirtualiseerd
+    return f'<div class="chart-box full-width logbook" data-year="{yr}" style="overflow-x:auto;"></div>'
+
+@traced
+def logbook_payload(df):
+    # Kolommen in plaats van rijen; categorie en materiaal als codes naar een kleine lijst
+    d = df.sort_values('Datum', ascending=False, kind='stable')
+    cats = list(d['Categorie'].cat.categories)
+    gear_codes, gears = pd.factorize(d['Gear'].astype(object).where(d['Gear'].notna(), ''), sort=True)
+    payload = {
+        'cats': cats, 'icons': [get_sport_style(c)[0] for c in cats], 'gears': list(gears),
+        'd': d['Datum'].dt.strftime('%Y-%m-%d').tolist(), 'c': d['Categorie'].cat.codes.tolist(), 'g': gear_codes.tolist(),
+        'n': d['Naam'].tolist(),
+        'hr': d['Hartslag'].round().fillna(0).astype(int).tolist(),
+        'km': (d['Afstand_km'].astype('float64') * 10).round().fillna(0).astype(int).tolist(),
+    }
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).replace('</', '<\\/')
+
+def generate_kpi_grid(cur, prev):
+    return f"""<div class="kpi-grid">
+                    {generate_kpi("Sessies", int(cur['n']), "👟", format_diff_html(cur['n'], prev['n']))}
+                    {generate_kpi("Afstand", f"{cur['km']:,.0f}", "📏", format_diff_html(cur['km'], prev['km'], "km"), unit="km")}
+                    {generate_kpi("Tijd", format_time(cur['sec']), "⏱️", format_diff_html(cur['sec']/3600, prev['sec']/3600, "u"))}
+                    {generate_kpi("Energie", f"{cur['kcal']:,.0f}", "🔥", format_diff_html(cur['kcal'], prev['kcal'], "kcal"), unit="kcal")}
+                    {generate_kpi("Hoogtemeters", f"{cur['hm']:,.0f}", "⛰️", format_diff_html(cur['hm'], prev['hm'], "m"), unit="m")}
+                </div>"""
 
 def generate_kpi(lbl, val, icon, diff_html, unit=""):
     val_html = f"{val}"
@@ -355,79 +489,194 @@ def generate_kpi(lbl, val, icon, diff_html, unit=""):
         
     return f"""<div class="kpi-card"><div style="display:flex;justify-content:space-between;"><div class="lbl" style="font-size:12px;color:var(--text_light);font-weight:700;text-transform:uppercase;letter-spacing:0.5px;">{lbl}</div><div class="icon" style="font-size:18px;">{icon}</div></div><div class="val" style="font-size:26px;font-weight:800;color:var(--text);margin:8px 0; font-variant-numeric: tabular-nums;">{val_html}</div><div style="font-size:13px;">{diff_html}</div></div>"""
 
-# --- MAIN ---
-def genereer_dashboard():
-    print("🚀 Start V78.0 (Harde X-as fix & proracer weg)...")
-    try:
-        df = pd.read_csv('activities.csv')
-        nm = {'Datum van activiteit':'Datum', 'Naam activiteit':'Naam', 'Activiteitstype':'Activiteitstype', 'Beweegtijd':'Beweegtijd_sec', 'Afstand':'Afstand_km', 'Gemiddelde hartslag':'Hartslag', 'Gemiddelde snelheid':'Gem_Snelheid', 'Uitrusting voor activiteit':'Gear', 'Calorieën':'Calorieën', 'Hoogteverschil':'Hoogtemeters', 'Elevatiewinst':'Hoogtemeters'}
-        df = df.rename(columns={k:v for k,v in nm.items() if k in df.columns})
-        
-        if 'Hoogtemeters' not in df.columns: df['Hoogtemeters'] = 0
-        if 'Gear' not in df.columns: df['Gear'] = ''
-        
-        for c in ['Afstand_km', 'Beweegtijd_sec', 'Gem_Snelheid', 'Calorieën', 'Hoogtemeters']:
-            if c in df.columns: df[c] = pd.to_numeric(df[c].astype(str).str.replace(',', '.'), errors='coerce').fillna(0)
-        df['Hartslag'] = pd.to_numeric(df['Hartslag'], errors='coerce')
-        if 'Wattage' in df.columns: df['Wattage'] = pd.to_numeric(df['Wattage'], errors='coerce')
-        
-        df['Datum'] = df['Datum'].apply(solve_dates); df = df.dropna(subset=['Datum'])
-        df['Categorie'] = df.apply(determine_category, axis=1); df['Jaar'] = df['Datum'].dt.year; df['Day'] = df['Datum'].dt.dayofyear
-        if df['Gem_Snelheid'].mean() < 10: df['Gem_Snelheid'] *= 3.6
-        
-        # --- GEAR FIX: Trek E-MTB & Proracer logica ---
-        df['Gear'] = df['Gear'].astype(str).replace(['nan', 'None'], '').str.strip()
-        
-        # Wijzig merida naar Trek E-MTB
-        df.loc[df['Gear'].str.lower().str.contains('merida', na=False), 'Gear'] = 'Trek E-MTB'
-        
-        # Proracer wissen zodat het niet meer in de materiaal tabellen komt
-        df.loc[df['Gear'].str.lower().str.contains('proracer', na=False), 'Gear'] = ''
-        
-        mtb_vanaf_sep22 = (df['Categorie'] == 'Mountainbike') & (df['Datum'] >= pd.Timestamp('2022-09-01'))
-        df.loc[mtb_vanaf_sep22, 'Gear'] = 'Trek E-MTB'
-        df['Gear'] = df['Gear'].replace('', np.nan)
-        # -----------------------------------
-        
-        years = sorted(df['Jaar'].unique(), reverse=True)
-        nav, sects = "", ""
-        
-        for yr in years:
-            df_yr = df[df['Jaar'] == yr]; df_prev = df[df['Jaar'] == yr-1]
-            ytd = datetime.now().timetuple().tm_yday
-            df_prev_comp = df_prev[df_prev['Day'] <= ytd] if yr == datetime.now().year else df_prev
-            
-            streaks_html = generate_streaks_box(df) if yr == datetime.now().year else ""
-            
-            cal_yr = df_yr['Calorieën'].sum() if 'Calorieën' in df_yr.columns else 0
-            cal_prev = df_prev_comp['Calorieën'].sum() if 'Calorieën' in df_prev_comp.columns and not df_prev_comp.empty else 0
-            hm_yr = df_yr['Hoogtemeters'].sum() if 'Hoogtemeters' in df_yr.columns else 0
-            hm_prev = df_prev_comp['Hoogtemeters'].sum() if 'Hoogtemeters' in df_prev_comp.columns and not df_prev_comp.empty else 0
-            
-            sects += f"""<div id="v-{yr}" class="tab-content" style="display:{"block" if yr == datetime.now().year else "none"}">
-                <div class="kpi-grid">
-                    {generate_kpi("Sessies", len(df_yr), "👟", format_diff_html(len(df_yr), len(df_prev_comp)))}
-                    {generate_kpi("Afstand", f"{df_yr['Afstand_km'].sum():,.0f}", "📏", format_diff_html(df_yr['Afstand_km'].sum(), df_prev_comp['Afstand_km'].sum(), "km"), unit="km")}
-                    {generate_kpi("Tijd", format_time(df_yr['Beweegtijd_sec'].sum()), "⏱️", format_diff_html(df_yr['Beweegtijd_sec'].sum()/3600, df_prev_comp['Beweegtijd_sec'].sum()/3600, "u"))}
-                    {generate_kpi("Energie", f"{cal_yr:,.0f}", "🔥", format_diff_html(cal_yr, cal_prev, "kcal"), unit="kcal")}
-                    {generate_kpi("Hoogtemeters", f"{hm_yr:,.0f}", "⛰️", format_diff_html(hm_yr, hm_prev, "m"), unit="m")}
-                </div>
+# --- SECTIES ---
+@traced
+def build_year_section(cube, df, yr, zones, efforts, training, routes, odometer):
+    reset_charts(f"y{yr}")
+    ytd = datetime.now().timetuple().tm_yday
+    day_max = ytd if yr == datetime.now().year else None
+    # Het lopende jaar tegenover vorig jaar t/m dezelfde dag van het jaar
+    cur_w, prev_w = year_window(yr), year_window(yr-1, day_max)
+    
+    streaks_html = generate_streaks_box(df) if yr == datetime.now().year else ""
+    
+    return f"""{generate_kpi_grid(cube.period(cur_w), cube.period(prev_w))}
                 {streaks_html}
-                {create_ytd_chart(df, yr)}
-                <h3 class="sec-sub">Per Sport</h3>{generate_sport_cards(df_yr, df_prev_comp)}
-                <h3 class="sec-sub">Materiaal {yr}</h3>{generate_yearly_gear(df_yr, df)}
-                <h3 class="sec-sub">Maandelijkse Voortgang</h3>{create_monthly_charts(df_yr, df_prev, yr)}
+                {create_ytd_chart(cube, yr)}
+                {create_load_chart(training, yr)}
+                <h3 class="sec-sub">Per Sport</h3>{generate_sport_cards(cube.period_by_cat(cur_w), cube.period_by_cat(prev_w))}
+                <h3 class="sec-sub">Materiaal {yr}</h3>{generate_yearly_gear(odometer, yr)}
+                <h3 class="sec-sub">Maandelijkse Voortgang</h3>{create_monthly_charts(cube, yr)}
                 <h3 class="sec-sub">Diepte-analyse</h3>
-                {create_heatmap(df_yr)}
-                <h3 class="sec-sub">Records {yr}</h3>{generate_hall_of_fame(df_yr)}
-                <h3 class="sec-sub">Logboek</h3>{generate_logbook(df_yr)}
-            </div>"""
-            nav += f'<button class="nav-btn {"active" if yr == datetime.now().year else ""}" onclick="openTab(event, \'v-{yr}\')">{yr}</button>'
-            
-        nav += '<button class="nav-btn" onclick="openTab(event, \'v-Tot\')">Carrière</button>'
-        sects += f'<div id="v-Tot" class="tab-content" style="display:none"><h2 class="sec-title" style="color:var(--text);">All-Time Garage</h2>{generate_yearly_gear(df, df, True)}<h3 class="sec-sub">All-Time Records</h3>{generate_hall_of_fame(df)}</div>'
-        
-        html = f"""<!DOCTYPE html><html><head><meta charset="UTF-8">
+                {create_heatmap(cube, yr)}{create_route_map(routes, yr)}
+                {create_zone_chart(zones, yr)}
+                <h3 class="sec-sub">Records {yr}</h3>{generate_hall_of_fame(cube, yr, efforts)}
+                {create_pr_curve(efforts, yr)}
+                <h3 class="sec-sub">Logboek</h3>{generate_logbook(yr)}
+                {chart_payload()}"""
+
+@traced
+def build_career_section(cube, efforts, training, routes, odometer):
+    reset_charts("tot")
+    return f'{create_load_chart(training)}{create_route_map(routes)}<h2 class="sec-title" style="color:var(--text);">All-Time Garage</h2>{generate_yearly_gear(odometer, all_time_mode=True)}<h3 class="sec-sub">All-Time Records</h3>{generate_hall_of_fame(cube, efforts=efforts)}{create_pr_curve(efforts)}{chart_payload()}'
+
+# --- LAATSTE 4 WEKEN ---
+# Geen jaar-tab maar rollende periodes tot vandaag; alle totalen komen uit de prefix sums van de kubus (periods.py)
+RECENT_KEY = 'Recent'
+RECENT_DAYS = 28
+RECENT_WEEKS = 12
+# Elk venster tegenover dezelfde periode vorig jaar
+COMPARE_WINDOWS = [('Laatste 7 dagen', lambda t: rolling(7, t)), ('Laatste 28 dagen', lambda t: rolling(28, t)), ('Deze maand', month_to_date),
+                   ('Dit jaar', year_to_date), ('Laatste 365 dagen', lambda t: rolling(365, t))]
+
+def recent_inputs(df, today):
+    # Het oudste venster is 365 dagen, een jaar terug
+    return df[df['Datum'] >= today - pd.DateOffset(years=2)], today.strftime('%Y-%m-%d')
+
+@traced
+def generate_window_cards(cube, today):
+    html = '<div class="sport-grid">'
+    for label, window in COMPARE_WINDOWS:
+        w = window(today)
+        s, p = cube.period(w), cube.period(last_year(w))
+        rows = f"""<div class="stat-row"><span>Sessies</span><div class="val-group"><strong>{int(s['n'])}</strong>{format_diff_html(s['n'], p['n'])}</div></div>
+                   <div class="stat-row"><span>Afstand</span><div class="val-group"><strong>{s['km']:,.0f} km</strong>{format_diff_html(s['km'], p['km'])}</div></div>
+                   <div class="stat-row"><span>Tijd</span><div class="val-group"><strong>{format_time(s['sec'])}</strong>{format_diff_html(s['sec']/3600, p['sec']/3600, "u")}</div></div>
+                   <div class="stat-row"><span>Hoogtemeters</span><div class="val-group"><strong>{s['hm']:,.0f} m</strong>{format_diff_html(s['hm'], p['hm'])}</div></div>"""
+        html += f"""<div class="sport-card"><div class="sport-header" style="color:var(--primary)"><h3>{label}</h3></div><div class="sec-lbl">{w[0].strftime("%d-%m-%y")} t/m {w[1].strftime("%d-%m-%y")}</div><div class="sport-body">{rows}</div></div>"""
+    return html + '</div>'
+
+@traced
+def create_weekly_chart(cube, today):
+    weeks = [rolling(7, today - i * 7 * DAY) for i in range(RECENT_WEEKS - 1, -1, -1)]
+    x = [w[1].strftime('%d-%m') for w in weeks]
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=x, y=[cube.periods.totals(*last_year(w))['km'] for w in weeks], name="Vorig jaar", marker_color=COLORS['ref_gray']))
+    fig.add_trace(go.Bar(x=x, y=[cube.periods.totals(*w)['km'] for w in weeks], name="Dit jaar", marker_color=COLORS['primary']))
+    fig.update_layout(
+        title=f'📊 Km per week (laatste {RECENT_WEEKS} weken)', template='plotly_dark', barmode='group', margin=dict(t=50,b=60,l=10,r=10), height=300,
+        paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', legend=dict(orientation="h", y=-0.25, x=0.5, xanchor="center"),
+        xaxis=dict(fixedrange=True), yaxis=dict(fixedrange=True, gridcolor='rgba(255,255,255,0.05)'), font=dict(color='#94a3b8')
+    )
+    return chart_html(fig, "chart-box full-width")
+
+@traced
+def build_recent_section(cube, today):
+    reset_charts("rec")
+    cur = rolling(RECENT_DAYS, today); prev = previous(cur)
+    return f"""<h2 class="sec-title">Laatste {RECENT_DAYS} dagen <span class="sec-lbl">tegenover de {RECENT_DAYS} dagen ervoor</span></h2>
+                {generate_kpi_grid(cube.period(cur), cube.period(prev))}
+                <h3 class="sec-sub">Per Sport</h3>{generate_sport_cards(cube.period_by_cat(cur), cube.period_by_cat(prev))}
+                <h3 class="sec-sub">Tegenover vorig jaar</h3>{generate_window_cards(cube, today)}
+                {create_weekly_chart(cube, today)}
+                {chart_payload()}"""
+
+# --- FRAGMENTEN (incrementele build) ---
+FRAGMENT_DIR = 'fragments'
+FRAGMENT_MANIFEST = os.path.join(FRAGMENT_DIR, 'manifest.json')
+LOGBOOK_KEY = 'logboek'
+FRAGMENT_EXT = {LOGBOOK_KEY: 'json'}
+# Wijzigt de generator zelf, dan moet alles opnieuw
+CODE_FILES = ['maak_dashboard.py', 'aggregates.py', 'activity_store.py', 'streaks.py', 'streams_store.py', 'best_efforts.py', 'training_load.py', 'routes.py', 'gear.py', 'periods.py']
+
+def code_version():
+    h = hashlib.sha1()
+    for f in CODE_FILES:
+        if os.path.exists(f):
+            with open(f, 'rb') as fh: h.update(fh.read())
+    return h.hexdigest()
+
+def section_inputs(cube, df, yr):
+    # Precies de rijen waar een jaar-tab uit leest: het jaar zelf, het vorige jaar (vergelijking) en de jaren in de km-grafiek
+    if yr is None: return df, ''
+    jaren = set([y for y in cube.years if y <= yr][:5]) | {yr - 1}
+    # Het lopende jaar hangt ook af van vandaag (YTD vergelijking, reeksen) en van alle datums (reeksen)
+    extra = datetime.now().strftime('%Y-%m-%d') if yr == datetime.now().year else ''
+    rows = df if extra else df[df['Jaar'].isin(jaren)]
+    return rows, extra
+
+def section_hash(rows, *extra):
+    h = hashlib.sha1()
+    h.update(pd.util.hash_pandas_object(rows.sort_values(['Datum', 'Naam'], kind='stable'), index=False).to_numpy().tobytes())
+    for e in extra: h.update(str(e).encode())
+    return h.hexdigest()[:12]
+
+def load_manifest():
+    if not os.path.exists(FRAGMENT_MANIFEST): return {}
+    try:
+        with open(FRAGMENT_MANIFEST, encoding='utf-8') as f: return json.load(f)
+    except Exception:
+        return {}
+
+def write_fragments(sections, manifest):
+    # sections: {key: (hash, builder)}; alleen bouwen wat veranderd is
+    os.makedirs(FRAGMENT_DIR, exist_ok=True)
+    new_manifest, built = {}, []
+    for key, (h, builder) in sections.items():
+        fname = f"{key}-{h}.{FRAGMENT_EXT.get(key, 'html')}"
+        if manifest.get(key, {}).get('hash') != h or not os.path.exists(os.path.join(FRAGMENT_DIR, fname)):
+            with open(os.path.join(FRAGMENT_DIR, fname), 'w', encoding='utf-8') as f: f.write(builder())
+            built.append(key)
+        new_manifest[key] = {'hash': h, 'file': f"{FRAGMENT_DIR}/{fname}"}
+    keep = {os.path.basename(v['file']) for v in new_manifest.values()} | {os.path.basename(FRAGMENT_MANIFEST)}
+    for f in os.listdir(FRAGMENT_DIR):
+        if f not in keep: os.remove(os.path.join(FRAGMENT_DIR, f))
+    with open(FRAGMENT_MANIFEST, 'w', encoding='utf-8') as f: json.dump(new_manifest, f, indent=2)
+    return new_manifest, built
+
+# --- MAIN ---
+DASHBOARD_HTML = 'dashboard.html'
+
+def write_dashboard(html, path=DASHBOARD_HTML):
+    with open(path, 'w', encoding='utf-8') as f: f.write(html)
+
+def section_span(report, key, rows, builder):
+    # Elke tab als eigen span, ook als hij pas in write_fragments gebouwd wordt
+    def run():
+        with report.span(key, rows=rows) as rec:
+            out = builder()
+            rec['bytes'] = len(out.encode('utf-8'))
+            return out
+    return run
+
+def year_builders(report, cube, df, zones, efforts, training, routes, odometer):
+    # Per tab (jaar) een builder die pas rekent als hij aangeroepen wordt; Carrière als laatste
+    rows_per_year = df['Jaar'].value_counts()
+    today = pd.Timestamp.now().normalize()
+    builders = {RECENT_KEY: (None, section_span(report, RECENT_KEY, len(recent_inputs(df, today)[0]), lambda: build_recent_section(cube, today)))}
+    nav = f'<button class="nav-btn" onclick="openTab(event, \'v-{RECENT_KEY}\')">{RECENT_DAYS // 7} weken</button>'
+    for yr in cube.years:
+        builders[str(yr)] = (yr, section_span(report, str(yr), int(rows_per_year.get(yr, 0)), lambda yr=yr: build_year_section(cube, df, yr, zones, efforts, training, routes, odometer)))
+        nav += f'<button class="nav-btn {"active" if yr == datetime.now().year else ""}" onclick="openTab(event, \'v-{yr}\')">{yr}</button>'
+    builders['Tot'] = (None, section_span(report, 'Tot', len(df), lambda: build_career_section(cube, efforts, training, routes, odometer)))
+    nav += '<button class="nav-btn" onclick="openTab(event, \'v-Tot\')">Carrière</button>'
+    return builders, nav
+
+def section_hashes(cube, df, zones, efforts, training, routes, builders):
+    versie = code_version()
+    # Zonetijd komt uit de streams, niet uit de activiteiten: apart meenemen in de hash
+    zone_key = lambda yr: zones.loc[yr].round().to_json() if yr in zones.index.get_level_values(0) else ''
+    # Een jaar-tab toont zijn eigen records naast de all-time curve; een rit zonder record bouwt niets opnieuw
+    def efforts_key(yr):
+        rows = efforts.per_year if yr is None else pd.concat([efforts.per_year[efforts.per_year['Jaar'] == yr], efforts.all_time])
+        return rows.sort_values(['Jaar', 'Categorie', 'metric', 'venster'])[['id', 'metric', 'venster', 'Waarde']].to_csv(index=False)
+    # De belastingcurve loopt door over jaargrenzen heen: hash wat de tab toont
+    load_key = lambda yr: (training[training.index.year == yr] if yr else training).round(1).to_csv()
+    hashes = {key: section_hash(*section_inputs(cube, df, yr), versie, zone_key(yr), efforts_key(yr), load_key(yr), routes.digest(yr)) for key, (yr, _) in builders.items() if key != RECENT_KEY}
+    hashes[RECENT_KEY] = section_hash(*recent_inputs(df, pd.Timestamp.now().normalize()), versie)
+    hashes[LOGBOOK_KEY] = section_hash(df, versie)
+    return hashes
+
+def gear_totals(odometer):
+    return {g: {'km': round(float(r['km']), 1), 'sec': float(r['sec'])} for g, r in odometer.year().iterrows()}
+
+def tab_html(key, inner="", src=""):
+    active = key == str(datetime.now().year)
+    attr = f' data-src="{src}"' if src else ""
+    return f'<div id="v-{key}" class="tab-content"{attr} style="display:{"block" if active else "none"}">{inner}</div>'
+
+def render_page(nav, sects, gear, log_data):
+    return f"""<!DOCTYPE html><html><head><meta charset="UTF-8">
         <meta name="viewport" content="width=device-width, initial-scale=1.0">
         <title>⚡ Sportoverzicht</title>
         
@@ -477,26 +726,195 @@ def genereer_dashboard():
         .stat-row strong{{color:var(--text); font-weight:700}}
         .val-group{{display:flex;gap:8px;align-items:center}}
         
-        .log-table{{width:100%;border-collapse:collapse;font-size:12px;}} .log-table th{{text-align:left;padding:12px 10px;border-bottom:1px solid rgba(255,255,255,0.05);color:var(--text_light);font-weight:700;}} .log-table td{{padding:12px 10px;border-bottom:1px solid rgba(255,255,255,0.02);font-weight:500; color:var(--text);}}
+        .log-filters{{display:flex;flex-wrap:wrap;gap:8px;align-items:center;margin-bottom:10px;}}
+        .log-filters select, .log-filters input{{font-family:inherit;font-size:12px;background:rgba(255,255,255,0.05);color:var(--text);border:1px solid rgba(255,255,255,0.1);border-radius:12px;padding:6px 10px;}}
+        .log-filters input{{flex:1;min-width:140px;}}
+        .log-table{{min-width:600px;font-size:12px;}} .log-scroll{{overflow-y:auto;}} .log-spacer{{position:relative;}}
+        .log-row{{display:grid;grid-template-columns:60px 50px 1fr 70px 70px;align-items:center;height:36px;padding:0 10px;border-bottom:1px solid rgba(255,255,255,0.02);font-weight:500;color:var(--text);}}
+        .log-spacer .log-row{{position:absolute;left:0;right:0;top:0;}} .log-row span{{overflow:hidden;white-space:nowrap;text-overflow:ellipsis;}}
+        .log-row span:nth-child(4){{text-align:center;}} .log-row span:nth-child(5){{text-align:right;font-weight:700;}}
+        .log-head{{color:var(--text_light);font-weight:700;border-bottom:1px solid rgba(255,255,255,0.05);}}
         .streak-row{{display:flex;justify-content:space-between;font-size:14px;font-weight:700;color:var(--text); margin-bottom:4px;}}
         .streak-sub{{font-size:11px;color:var(--text_light);}}
         .icon-circle{{width:32px;height:32px;border-radius:8px;display:flex;align-items:center;justify-content:center;margin-bottom:10px;}}
+        .route-map{{display:block;width:100%;height:auto;max-height:600px;object-fit:contain;}}
         </style></head><body><div class="container">
         <div class="header"><h1 style="font-size:28px;font-weight:800;letter-spacing:-1px;margin:0; background: -webkit-linear-gradient(45deg, #00e5ff, #10b981); -webkit-background-clip: text; -webkit-text-fill-color: transparent;">⚡ Sportoverzicht</h1></div>
         <div class="nav">{nav}</div>{sects}</div>
+        <script id="gear-data" type="application/json">{json.dumps(gear)}</script>
+        {templates_payload()}
+        {log_data}
+        <script src="{PLOTLY_JS_URL}" charset="utf-8" defer></script>
         <script>
         function openTab(e,n){{
             document.querySelectorAll('.tab-content').forEach(x=>x.style.display='none');
             document.querySelectorAll('.nav-btn').forEach(x=>x.classList.remove('active'));
-            document.getElementById(n).style.display='block';
+            const el = document.getElementById(n);
+            el.style.display='block';
+            loadTab(el);
             e.currentTarget.classList.add('active');
             window.scrollTo({{top:0, behavior:'smooth'}});
             setTimeout(() => {{ window.dispatchEvent(new Event('resize')); }}, 50);
         }}
+        // Grafieken in verborgen tabs hebben geen afmeting en worden dus pas getekend als de tab opent
+        const CH = {{charts: {{}}, templates: JSON.parse(document.getElementById('chart-templates').textContent), config: {{}}}};
+        let io;
+        function drawChart(el){{
+            const s = CH.charts[el.dataset.chart];
+            const layout = Object.assign({{}}, s.layout, s.tpl ? {{template: CH.templates[s.tpl]}} : {{}});
+            el.style.minHeight = '';
+            Plotly.newPlot(el, s.data, layout, CH.config);
+        }}
+        function initSection(root){{
+            root.querySelectorAll('script.chart-data').forEach(x => {{
+                const d = JSON.parse(x.textContent);
+                Object.assign(CH.charts, d.charts); CH.config = d.config;
+                x.remove();
+            }});
+            root.querySelectorAll('.plot[data-chart]').forEach(el => io.observe(el));
+            root.querySelectorAll('.logbook').forEach(initLogbook);
+            // All-time totalen per materiaal komen uit de pagina zelf, zodat oude jaar-fragmenten niet hoeven te veranderen
+            const gear = JSON.parse(document.getElementById('gear-data').textContent);
+            root.querySelectorAll('.gear-all').forEach(el => {{
+                const g = gear[el.dataset.gear]; if (!g) return;
+                el.textContent = el.dataset.f === 'km'
+                    ? Math.round(g.km).toLocaleString('en-US') + ' km'
+                    : (g.sec / 3600).toLocaleString('en-US', {{minimumFractionDigits: 1, maximumFractionDigits: 1}}) + ' u';
+            }});
+        }}
+        // Logboek: één gedeelde payload, per jaar alleen de zichtbare rijen in de DOM
+        const LOG_ROW = 36, LOG_VIEW = 480, LOG_BUFFER = 8;
+        let logData = null;
+        function getLog(){{
+            if (!logData) {{
+                const el = document.getElementById('log-data');
+                logData = el.dataset.src ? fetch(el.dataset.src).then(r => r.json()) : Promise.resolve(JSON.parse(el.textContent));
+                logData = logData.then(L => {{ L.nl = L.n.map(x => String(x).toLowerCase()); return L; }});
+            }}
+            return logData;
+        }}
+        function logOptions(sel, label, names, codes){{
+            sel.add(new Option(label, ''));
+            [...new Set(codes)].sort((a, b) => String(names[a]).localeCompare(String(names[b]))).forEach(c => {{ if (names[c] !== '') sel.add(new Option(names[c], c)); }});
+        }}
+        function initLogbook(box){{
+            getLog().then(L => {{
+                const rows = [];
+                for (let i = 0; i < L.d.length; i++) if (L.d[i].startsWith(box.dataset.year)) rows.push(i);
+                box.innerHTML = '<div class="log-filters"><select class="log-cat"></select><select class="log-gear"></select><input class="log-name" type="search" placeholder="Zoek op naam..."><span class="streak-sub log-count"></span></div>'
+                    + '<div class="log-table"><div class="log-row log-head"><span>Datum</span><span>Type</span><span>Naam activiteit</span><span>❤️ bpm</span><span>km</span></div>'
+                    + '<div class="log-scroll"><div class="log-spacer"></div></div></div>';
+                const cat = box.querySelector('.log-cat'), gear = box.querySelector('.log-gear'), name = box.querySelector('.log-name');
+                const scroll = box.querySelector('.log-scroll'), spacer = box.querySelector('.log-spacer'), count = box.querySelector('.log-count');
+                logOptions(cat, 'Alle sporten', L.cats, rows.map(j => L.c[j]));
+                logOptions(gear, 'Alle materiaal', L.gears, rows.map(j => L.g[j]));
+                const pool = [];
+                let view = rows;
+                function render(){{
+                    const first = Math.max(0, Math.floor(scroll.scrollTop / LOG_ROW) - LOG_BUFFER);
+                    const n = Math.ceil(LOG_VIEW / LOG_ROW) + 2 * LOG_BUFFER;
+                    while (pool.length < Math.min(n, view.length)) {{
+                        const r = document.createElement('div'); r.className = 'log-row';
+                        for (let k = 0; k < 5; k++) r.appendChild(document.createElement('span'));
+                        spacer.appendChild(r); pool.push(r);
+                    }}
+                    pool.forEach((r, k) => {{
+                        const i = first + k;
+                        if (i >= view.length) {{ r.style.display = 'none'; return; }}
+                        const j = view[i], c = r.children, km = L.km[j];
+                        r.style.display = ''; r.style.transform = 'translateY(' + i * LOG_ROW + 'px)';
+                        c[0].textContent = L.d[j].slice(8, 10) + '-' + L.d[j].slice(5, 7);
+                        c[1].textContent = L.icons[L.c[j]];
+                        c[2].textContent = L.n[j]; c[2].title = L.n[j];
+                        c[3].textContent = L.hr[j] > 0 ? L.hr[j] : '-';
+                        c[4].textContent = km > 0 ? (km / 10).toFixed(1) : '-';
+                    }});
+                }}
+                function apply(){{
+                    const c = cat.value, g = gear.value, q = name.value.trim().toLowerCase();
+                    view = rows.filter(j => (c === '' || L.c[j] === +c) && (g === '' || L.g[j] === +g) && (!q || L.nl[j].includes(q)));
+                    spacer.style.height = view.length * LOG_ROW + 'px';
+                    scroll.style.height = Math.min(LOG_VIEW, view.length * LOG_ROW) + 'px';
+                    scroll.scrollTop = 0;
+                    count.textContent = view.length + ' van ' + rows.length + ' activiteiten';
+                    render();
+                }}
+                cat.addEventListener('change', apply); gear.addEventListener('change', apply); name.addEventListener('input', apply);
+                scroll.addEventListener('scroll', () => requestAnimationFrame(render), {{passive: true}});
+                apply();
+            }}).catch(() => {{ box.innerHTML = '<p class="streak-sub">Kon het logboek niet laden.</p>'; }});
+        }}
+        function loadTab(el){{
+            if (!el.dataset.src || el.dataset.loaded) return;
+            el.dataset.loaded = '1';
+            el.innerHTML = '<p class="streak-sub" style="padding:20px;">Laden...</p>';
+            fetch(el.dataset.src).then(r => r.text()).then(h => {{ el.innerHTML = h; initSection(el); }})
+                .catch(() => {{ el.dataset.loaded = ''; el.innerHTML = '<p class="streak-sub" style="padding:20px;">Kon dit jaar niet laden.</p>'; }});
+        }}
+        document.addEventListener('DOMContentLoaded', () => {{
+            io = new IntersectionObserver(entries => entries.forEach(e => {{
+                if (e.isIntersecting) {{ io.unobserve(e.target); drawChart(e.target); }}
+            }}), {{rootMargin: '200px'}});
+            initSection(document);
+            document.querySelectorAll('.tab-content').forEach(el => {{ if (el.style.display !== 'none') loadTab(el); }});
+        }});
         </script></body></html>"""
+
+def genereer_dashboard(incremental=False, profile=None):
+    print("🚀 Start V78.0 (Harde X-as fix & proracer weg)...")
+    report = BuildReport(profile).start()
+    try:
+        with report.span('laden') as rec:
+            df = load_activities()
+            rec['rows'] = len(df)
+        
+        with report.span('kubus', rows=len(df)):
+            cube = AggregateCube(df)
+        with report.span('materiaal'):
+            odometer = update_odometer(cube)
+        with report.span('streams'):
+            zs = zone_seconds(HR_ZONES)
+            zones = load_zone_time(df, zs)
+            efforts = BestEfforts(load_best_efforts(), df)
+        with report.span('routes'):
+            routes = RouteGrid(df)
+        with report.span('trainingsbelasting'):
+            training = load_training(df, zs, efforts)
+        builders, nav = year_builders(report, cube, df, zones, efforts, training, routes, odometer)
+        
+        with report.span('secties'):
+            if incremental:
+                hashes = section_hashes(cube, df, zones, efforts, training, routes, builders)
+                sections = {key: (hashes[key], builder) for key, (_, builder) in builders.items()}
+                sections[LOGBOOK_KEY] = (hashes[LOGBOOK_KEY], section_span(report, LOGBOOK_KEY, len(df), lambda: logbook_payload(df)))
+                manifest, built = write_fragments(sections, load_manifest())
+                print(f"🧩 {len(built)} van {len(sections)} fragmenten opnieuw gebouwd: {', '.join(built) or '-'}")
+                sects = "".join(tab_html(key, src=manifest[key]['file']) for key in builders)
+                log_data = f'<script id="log-data" type="application/json" data-src="{manifest[LOGBOOK_KEY]["file"]}"></script>'
+            else:
+                sects = "".join(tab_html(key, builder()) for key, (_, builder) in builders.items())
+                log_data = f'<script id="log-data" type="application/json">{section_span(report, LOGBOOK_KEY, len(df), lambda: logbook_payload(df))()}</script>'
+        
+        html = render_page(nav, sects, gear_totals(odometer), log_data)
         
-        with open('dashboard.html', 'w', encoding='utf-8') as f: f.write(html)
+        with report.span('schrijven') as rec:
+            write_dashboard(html)
+            rec['bytes'] = len(html.encode('utf-8'))
         print("✅ Dashboard (V78.0) klaar: X-as is keihard geforceerd naar 12 maanden!")
-    except Exception as e: print(f"❌ Fout: {e}")
+    except Exception as e:
+        report.fail(e)
+        print(f"❌ Fout in {report.error['span'] or 'de build'}: {e}\n{report.error['traceback']}")
+    finally:
+        report.finish()
+    report.meta.update({'incremental': incremental, 'rows': int(len(df)) if 'df' in locals() else None, 'html_bytes': file_size(DASHBOARD_HTML)})
+    report.write()
+    slow = sorted((r for r in report.spans if r['span'].count('/') == 0), key=lambda r: -r['sec'])[:3]
+    print(f"📋 {BUILD_REPORT_JSON}: {report.total_sec:.1f}s; traagst: " + ', '.join(f"{r['span']} {r['sec']:.2f}s" for r in slow))
+    return report
 
-if __name__ == "__main__": genereer_dashboard()
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bouw dashboard.html uit activities.csv / activities.parquet")
+    parser.add_argument('--incremental', action='store_true', help="Per jaar een fragment in fragments/, alleen gewijzigde jaren opnieuw bouwen")
+    parser.add_argument('--profile', choices=PROFILE_MODES, help="cProfile of tracemalloc meedraaien (tracemalloc maakt de build ~10x trager); resultaat in het build rapport")
+    args = parser.parse_args()
+    if genereer_dashboard(incremental=args.incremental, profile=args.profile).error is not None: exit(1)
@@ -0,0 +1,63 @@
+import pandas as pd
+import numpy as np
+
+# --- PERIODE VERGELIJKING ---
+# Dagtotalen per categorie als cumulatieve sommen (prefix sums): het totaal van een periode is het verschil van twee rijen,
+# hoe lang de periode ook is. Rollend 7/28/365 dagen, maand of jaar tot vandaag, dezelfde periode vorig jaar: allemaal O(1).
+# Een periode is (start, eind), beide inclusief, als genormaliseerde Timestamps.
+DAY = pd.Timedelta(days=1)
+
+class PrefixSums:
+    def __init__(self, cube, cols):
+        # cube: rijen met Jaar, Day (dag van het jaar), Categorie en de op te tellen kolommen
+        self.cols = list(cols)
+        cats = pd.Categorical(cube['Categorie'])
+        self.cats = pd.Index(cats.categories, name='Categorie')
+        dates = pd.to_datetime(cube['Jaar'].astype('int64') * 1000 + cube['Day'].astype('int64'), format='%Y%j')
+        self.first = dates.min() if len(cube) else pd.Timestamp(0)
+        days = ((dates - self.first) // DAY).to_numpy(dtype='int64')
+        # Rij i = alles vóór dag i; rij 0 is nul, zodat elke periode een gewone aftrekking is
+        sums = np.zeros((days.max() + 2 if len(days) else 1, len(self.cats), len(self.cols)))
+        np.add.at(sums, (days + 1, cats.codes), cube[self.cols].to_numpy(dtype='float64'))
+        self.cum = sums.cumsum(axis=0)
+
+    def _pos(self, day):
+        # Rij met alles t/m 'day'; buiten de reeks vastgeklemd aan begin of eind
+        return int(np.clip((pd.Timestamp(day).normalize() - self.first) // DAY + 1, 0, len(self.cum) - 1))
+
+    def window(self, start, end):
+        a, b = self._pos(pd.Timestamp(start) - DAY), self._pos(end)
+        # Afronden: het verschil van twee grote sommen laat ruis in de laatste bits, en 0.0 moet ook echt 0 zijn
+        return np.round(self.cum[max(a, b)] - self.cum[a], 6)
+
+    def by_cat(self, start, end):
+        t = pd.DataFrame(self.window(start, end), index=self.cats, columns=self.cols)
+        return t[t['n'] > 0]
+
+    def totals(self, start, end):
+        return pd.Series(self.window(start, end).sum(axis=0), index=self.cols)
+
+# --- VENSTERS ---
+def rolling(days, today):
+    return today - (days - 1) * DAY, today
+
+def month_to_date(today):
+    return today.replace(day=1), today
+
+def year_to_date(today):
+    return today.replace(month=1, day=1), today
+
+def year_window(yr, day_max=None):
+    # Heel het jaar, of t/m dag 'day_max' van het jaar (zelfde dag van het jaar als vandaag, voor de vergelijking met vorig jaar)
+    start, end = pd.Timestamp(yr, 1, 1), pd.Timestamp(yr, 12, 31)
+    return start, end if day_max is None else min(end, start + (day_max - 1) * DAY)
+
+def last_year(window):
+    # 29 februari valt terug op 28 februari
+    return tuple(d - pd.DateOffset(years=1) for d in window)
+
+def previous(window):
+    # Even lange periode er direct voor
+    start, end = window
+    n = (end - start) // DAY + 1
+    return start - n * DAY, start - DAY
@@ -0,0 +1,290 @@
+import argparse
+import gzip
+import hashlib
+import html as htmllib
+import json
+import os
+import re
+import shutil
+from plotly.offline import get_plotlyjs, get_plotlyjs_version
+
+from maak_dashboard import DASHBOARD_HTML, FRAGMENT_DIR
+from update_activities import is_deauthorized
+
+# brotli is optioneel: zonder komen er alleen .gz varianten
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# --- PUBLICEREN ---
+# Van de gebouwde dashboard.html (+ fragments/) een kopie om te hosten: inline stijlen als klassen, geminificeerd,
+# alles met een inhouds-hash in de naam, .gz/.br ernaast en een service worker die de pagina offline beschikbaar houdt.
+# docs/ omdat GitHub Pages alleen uit de root of /docs serveert.
+PUBLISH_DIR = 'docs'
+ASSET_DIR = 'assets'
+MANIFEST_JSON = 'manifest.json'
+SW_FILE = 'sw.js'
+COMPRESS_EXT = {'.html', '.js', '.json', '.css', '.svg', '.webmanifest'}
+KEEP_INLINE = {'tab-content', 'plot'}  # de JS zet daar zelf style.display / style.minHeight
+FONT_HOSTS = ['fonts.googleapis.com', 'fonts.gstatic.com']
+
+RAW_RE = re.compile(r'<(script|style|pre|textarea)\b[^>]*>.*?</\1\s*>', re.S | re.I)
+TAG_RE = re.compile(r'<[a-zA-Z][^<>]*?\sstyle="[^"]*"[^<>]*>')
+ATTR_RE = lambda name: re.compile(r'\s' + name + r'="([^"]*)"')
+
+def digest(data, n=10):
+    return hashlib.sha1(data).hexdigest()[:n]
+
+def hashed_name(path, data):
+    stem, ext = os.path.splitext(os.path.basename(path))
+    return f"{stem}.{digest(data)}{ext}"
+
+# --- STIJLEN NAAR KLASSEN ---
+class StyleSheet:
+    # Dezelfde style="..." honderden keren per pagina; elke unieke declaratie wordt één klasse met een naam uit de inhoud,
+    # zodat een fragment dat niet veranderd is ook na het publiceren byte voor byte gelijk blijft
+    def __init__(self):
+        self.classes = {}
+
+    def class_for(self, decl):
+        return self.classes.setdefault(decl, 's' + digest(decl.encode('utf-8'), 6))
+
+    def css(self):
+        # !important: een inline stijl won van elke selector, de klasse moet dat ook doen
+        rule = lambda decl: ';'.join(p + '!important' for p in decl.split(';'))
+        return ''.join(f".{name}{{{rule(decl)}}}" for decl, name in sorted(self.classes.items(), key=lambda x: x[1]))
+
+def normalize_style(style):
+    parts = []
+    for p in htmllib.unescape(style).split(';'):
+        if ':' not in p: continue
+        k, v = p.split(':', 1)
+        parts.append(k.strip().lower() + ':' + re.sub(r'\s+', ' ', v.strip()))
+    return ';'.join(parts)
+
+def restyle_tag(tag, sheet):
+    cls = ATTR_RE('class').search(tag)
+    if cls and KEEP_INLINE & set(cls.group(1).split()): return tag
+    style = ATTR_RE('style').search(tag)
+    decl = normalize_style(style.group(1))
+    if re.search(r'[{}<>]', decl): return tag
+    tag = tag[:style.start()] + tag[style.end():]
+    if not decl: return tag
+    name = sheet.class_for(decl)
+    cls = ATTR_RE('class').search(tag)
+    if cls: return tag[:cls.start()] + f' class="{cls.group(1)} {name}"' + tag[cls.end():]
+    return re.sub(r'^<([a-zA-Z][\w-]*)', rf'<\1 class="{name}"', tag, count=1)
+
+# --- MINIFICEREN ---
+def minify_css(css):
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    return re.sub(r':\s+', ':', css).replace(';}', '}').strip()
+
+def minify_js(js):
+    # Alleen inspringing, lege regels en commentaarregels weg; de regeleindes blijven (automatische puntkomma's)
+    lines = [l.strip() for l in js.split('\n')]
+    return '\n'.join(l for l in lines if l and not l.startswith('//'))
+
+def minify_raw(block):
+    open_end = block.index('>') + 1
+    close_start = block.rindex('</')
+    head, body, tail = block[:open_end], block[open_end:close_start], block[close_start:]
+    name = head[1:].split(None, 1)[0].rstrip('>').lower()
+    if name == 'style': return head + minify_css(body) + tail
+    if name == 'script' and 'application/json' not in head and 'src=' not in head: return head + minify_js(body) + tail
+    return block
+
+def minify_html(page, sheet):
+    # Tekst buiten script/style/pre: stijlen naar klassen en elke reeks witruimte naar één spatie (zoals de browser ze toont)
+    out, pos = [], 0
+    for m in list(RAW_RE.finditer(page)) + [None]:
+        text = page[pos:m.start() if m else len(page)]
+        text = TAG_RE.sub(lambda t: restyle_tag(t.group(0), sheet), text)
+        out.append(re.sub(r'\s+', ' ', text))
+        if m:
+            out.append(minify_raw(m.group(0))); pos = m.end()
+    return ''.join(out).strip()
+
+# --- SCHRIJVEN ---
+class Output:
+    def __init__(self, root):
+        self.root, self.files = root, {}
+
+    def write(self, rel, data):
+        path = os.path.join(self.root, rel)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        variants = {rel: data}
+        if os.path.splitext(rel)[1] in COMPRESS_EXT:
+            # Vooraf gecomprimeerd: de server stuurt het bestand met de juiste Content-Encoding zonder zelf te rekenen
+            variants[rel + '.gz'] = gzip.compress(data, 9, mtime=0)
+            if brotli: variants[rel + '.br'] = brotli.compress(data, quality=11)
+        for name, blob in variants.items():
+            if name != rel and len(blob) >= len(data): continue
+            target = os.path.join(self.root, name)
+            if not (os.path.exists(target) and os.path.getsize(target) == len(blob) and open(target, 'rb').read() == blob):
+                with open(target + '.tmp', 'wb') as f: f.write(blob)
+                os.replace(target + '.tmp', target)
+            self.files[name] = len(blob)
+        return rel
+
+    def prune(self, dirs):
+        # Oude versies van hashed bestanden en .gz/.br van een vorige run weg; de rest van de map (CNAME, ...) blijft staan
+        for f in os.listdir(self.root):
+            if f.endswith(('.gz', '.br')) and f not in self.files: os.remove(os.path.join(self.root, f))
+        for d in dirs:
+            full = os.path.join(self.root, d)
+            if not os.path.isdir(full): continue
+            for f in os.listdir(full):
+                if f"{d}/{f}" not in self.files: os.remove(os.path.join(full, f))
+
+    def hashed(self):
+        return sorted(f for f in self.files if f.startswith((ASSET_DIR + '/', FRAGMENT_DIR + '/')) and not f.endswith(('.gz', '.br')))
+
+    def sizes(self, rel):
+        return [self.files.get(rel + ext) for ext in ('', '.gz', '.br')]
+
+def publish_asset(out, src, data):
+    return out.write(f"{ASSET_DIR}/{hashed_name(src, data)}", data)
+
+def publish_manifest(out):
+    if not os.path.exists(MANIFEST_JSON): return None
+    with open(MANIFEST_JSON, encoding='utf-8') as f: manifest = json.load(f)
+    for icon in manifest.get('icons', []):
+        if os.path.exists(icon['src']):
+            with open(icon['src'], 'rb') as f: icon['src'] = publish_asset(out, icon['src'], f.read())
+    return out.write(MANIFEST_JSON, json.dumps(manifest, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+def service_worker(shell, immutable):
+    # Pagina: meteen uit de cache, op de achtergrond verversen en melden als er nieuwe data is.
+    # Hashed bestanden (Plotly, jaar-fragmenten): eerst cache, want dezelfde naam is altijd dezelfde inhoud; bij een
+    # nieuwe versie worden alleen de fragmenten met een nieuwe naam opgehaald. Fonts van Google: eerst cache.
+    return f"""const SHELL = {json.dumps(shell)};
+const CURRENT = {json.dumps(immutable)};
+const FONT_HOSTS = {json.dumps(FONT_HOSTS)};
+const IMMUTABLE = /\\/({ASSET_DIR}|{FRAGMENT_DIR})\\//;
+const abs = u => new URL(u, self.registration.scope).href;
+self.addEventListener('install', e => e.waitUntil(caches.open('shell').then(c => c.addAll(SHELL)).then(() => self.skipWaiting())));
+self.addEventListener('activate', e => e.waitUntil((async () => {{
+    const keep = new Set(CURRENT.map(abs)), cache = await caches.open('assets');
+    for (const req of await cache.keys()) if (!keep.has(req.url)) await cache.delete(req);
+    await self.clients.claim();
+}})()));
+async function cacheFirst(name, req) {{
+    const cache = await caches.open(name), hit = await cache.match(req);
+    if (hit) return hit;
+    const res = await fetch(req);
+    if (res.ok || res.type === 'opaque') await cache.put(req, res.clone());
+    return res;
+}}
+async function shellFirst(e) {{
+    const url = new URL(e.request.url), key = url.origin + url.pathname;
+    const cache = await caches.open('shell'), hit = await cache.match(key);
+    const fresh = fetch(e.request).then(async res => {{
+        if (!res.ok) return res;
+        const body = await res.clone().text(), old = hit && await hit.clone().text();
+        await cache.put(key, res.clone());
+        if (hit && old !== body) (await self.clients.matchAll()).forEach(c => c.postMessage('nieuw'));
+        return res;
+    }});
+    if (!hit) return fresh;
+    e.waitUntil(fresh.catch(() => null));
+    return hit;
+}}
+self.addEventListener('fetch', e => {{
+    if (e.request.method !== 'GET') return;
+    const url = new URL(e.request.url);
+    if (url.origin === location.origin && IMMUTABLE.test(url.pathname)) return e.respondWith(cacheFirst('assets', e.request));
+    if (FONT_HOSTS.includes(url.hostname)) return e.respondWith(cacheFirst('fonts', e.request));
+    if (e.request.mode === 'navigate' || SHELL.some(u => abs(u) === url.origin + url.pathname)) return e.respondWith(shellFirst(e));
+}});
+"""
+
+SW_REGISTER = """<script>
+if ('serviceWorker' in navigator) {
+navigator.serviceWorker.register('sw.js');
+navigator.serviceWorker.addEventListener('message', e => {
+if (e.data !== 'nieuw' || document.getElementById('sw-nieuw')) return;
+const b = document.createElement('button'); b.id = 'sw-nieuw'; b.className = 'nav-btn active'; b.textContent = '🔄 Nieuwe data, tik om te verversen';
+b.style.cssText = 'position:fixed;bottom:20px;left:50%;transform:translateX(-50%);z-index:200;';
+b.onclick = () => location.reload(); document.body.appendChild(b);
+});
+}
+</script>"""
+
+def publish(src=DASHBOARD_HTML, out_dir=PUBLISH_DIR, cdn=False):
+    with open(src, encoding='utf-8') as f: page = f.read()
+    out, sheet = Output(out_dir), StyleSheet()
+
+    # Fragmenten eerst: hun klassen moeten in de CSS van de pagina staan
+    def publish_fragment(m):
+        path = m.group(2)
+        if not path.startswith(FRAGMENT_DIR + '/') or not os.path.exists(path): return m.group(0)
+        with open(path, encoding='utf-8') as f: body = f.read()
+        if path.endswith('.html'): body = minify_html(body, sheet)
+        data = body.encode('utf-8')
+        stem = os.path.basename(path).split('-')[0]
+        rel = out.write(f"{FRAGMENT_DIR}/{stem}-{digest(data)}{os.path.splitext(path)[1]}", data)
+        return f'{m.group(1)}"{rel}"'
+    page = re.sub(r'(\sdata-src=)"([^"]*)"', publish_fragment, page)
+
+    # Plotly als eigen bestand met hash in de naam: één keer downloaden, daarna uit de cache
+    if not cdn:
+        plotly = get_plotlyjs().encode('utf-8')
+        rel = publish_asset(out, f"plotly-{get_plotlyjs_version()}.min.js", plotly)
+        page = re.sub(r'(<script src=")[^"]*plotly[^"]*(")', rf'\g<1>{rel}\g<2>', page, count=1)
+    # Lokale plaatjes (icoon) ook met hash; een verwijzing naar iets dat niet bestaat blijft zoals ze was
+    def local_asset(m):
+        path = m.group(2)
+        if re.match(r'^(https?:|data:|//)', path) or path == MANIFEST_JSON or not os.path.isfile(path) or path.endswith('.html'): return m.group(0)
+        with open(path, 'rb') as f: rel = publish_asset(out, path, f.read())
+        return f'{m.group(1)}"{rel}"'
+    page = re.sub(r'(<link[^>]*\shref=)"([^"]*)"', local_asset, page)
+    manifest = publish_manifest(out)
+
+    page = minify_html(page, sheet)
+    page = page.replace('</style>', sheet.css() + '</style>', 1)
+    fonts = '<link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>'
+    page = page.replace('<link href="https://fonts.googleapis.com', fonts + '<link href="https://fonts.googleapis.com', 1)
+    page = page.replace('</body>', minify_js(SW_REGISTER) + '</body>', 1)
+    out.write(DASHBOARD_HTML, page.encode('utf-8'))
+    # GitHub Pages toont bij de kale URL index.html; het dashboard zelf blijft onder dezelfde naam (start_url)
+    out.write('index.html', f'<!DOCTYPE html><meta http-equiv="refresh" content="0;url={DASHBOARD_HTML}">'.encode('utf-8'))
+    out.write('.nojekyll', b'')
+
+    shell = ['./', f'./{DASHBOARD_HTML}'] + ([f'./{manifest}'] if manifest else [])
+    out.write(SW_FILE, service_worker(shell, out.hashed()).encode('utf-8'))
+    out.prune([ASSET_DIR, FRAGMENT_DIR])
+    return out
+
+def kb(n):
+    return f"{n / 1024:,.0f} kB" if n is not None else "-"
+
+def report(out):
+    # Eerste bezoek op mobiel: de pagina, Plotly en de tab die open staat; de andere jaren komen pas als je ze opent
+    with open(os.path.join(out.root, DASHBOARD_HTML), encoding='utf-8') as f: page = f.read()
+    active = re.search(r'data-src="([^"]*)" style="display:block"', page)
+    first = [DASHBOARD_HTML] + [f for f in out.hashed() if f.startswith(f"{ASSET_DIR}/plotly")] + ([active.group(1)] if active else [])
+    for f in first:
+        raw, gz, br = out.sizes(f)
+        print(f"📦 {f}: {kb(raw)} (gzip {kb(gz)}, brotli {kb(br)})")
+    total = sum(min(s for s in out.sizes(f) if s is not None) for f in first)
+    print(f"📉 Eerste bezoek: {len(first)} bestanden, {kb(total)} over de lijn; daarna alleen de pagina en gewijzigde jaren"
+          + ("" if brotli else " (pip install brotli voor .br)"))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gebouwd dashboard klaarmaken om te hosten: minificeren, hashes, .gz/.br en service worker")
+    parser.add_argument('--src', default=DASHBOARD_HTML)
+    parser.add_argument('--out', default=PUBLISH_DIR)
+    parser.add_argument('--cdn', action='store_true', help="Plotly van de CDN laden in plaats van een eigen kopie")
+    args = parser.parse_args()
+    if is_deauthorized():
+        # Toegang ingetrokken (strava_webhook.py): de data mag niet meer online, de site gaat weg tot er opnieuw gekoppeld is
+        shutil.rmtree(args.out, ignore_errors=True)
+        print(f"🚫 Toegang tot Strava ingetrokken: {args.out}/ verwijderd, niets gepubliceerd.")
+        exit(0)
+    out = publish(args.src, args.out, args.cdn)
+    print(f"🚚 Gepubliceerd in {args.out}/: {len(out.files)} bestanden, {len(out.hashed())} met hash in de naam.")
+    report(out)
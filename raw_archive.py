@@ -0,0 +1,82 @@
+import gzip
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+# --- RUW API ARCHIEF ---
+# Elke response van Strava zoals hij binnenkwam, per sync (of backfill-jaar) een nieuw gzip segment met JSON lines dat daarna
+# nooit meer verandert. Een nieuwe kolom of een schemawijziging is dan een replay van het archief, zonder één API call.
+# Records: {'kind': summary | detail | deleted, 'id', 't', 'data'}; het laatste record per id telt.
+ARCHIVE_DIR = 'archive'
+COMPACT_AFTER = 64  # segmenten; daarna samenvoegen tot één record per id en soort
+SUMMARY, DETAIL, DELETED = 'summary', 'detail', 'deleted'
+SEGMENT_EXT = '.jsonl.gz'
+_lock = threading.Lock()
+_last = [0]
+
+def segment_paths():
+    if not os.path.isdir(ARCHIVE_DIR): return []
+    return sorted(os.path.join(ARCHIVE_DIR, f) for f in os.listdir(ARCHIVE_DIR) if f.endswith(SEGMENT_EXT))
+
+def new_segment_path():
+    # Namen sorteren in schrijfvolgorde, ook vanuit meerdere threads (backfill) en als de klok terugspringt
+    with _lock:
+        if not _last[0]:
+            paths = segment_paths()
+            _last[0] = int(os.path.basename(paths[-1])[:-len(SEGMENT_EXT)]) if paths else 0
+        _last[0] = max(time.time_ns(), _last[0] + 1)
+        return os.path.join(ARCHIVE_DIR, f"{_last[0]:020d}{SEGMENT_EXT}")
+
+def append(records):
+    # records: [(soort, id, json)]; één nieuw segment, via een tijdelijke naam zodat een half bestand nooit meetelt
+    if not records: return None
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    t = datetime.now().isoformat(timespec='seconds')
+    return write_segment(new_segment_path(), [{'kind': k, 'id': int(i), 't': t, 'data': d} for k, i, d in records])
+
+def write_segment(path, rows):
+    lines = ''.join(json.dumps(r, ensure_ascii=False, separators=(',', ':')) + '\n' for r in rows)
+    with gzip.open(path + '.tmp', 'wt', encoding='utf-8') as f: f.write(lines)
+    os.replace(path + '.tmp', path)
+    return path
+
+def read_segment(path):
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            return [json.loads(l) for l in f if l.strip()]
+    except (OSError, EOFError, ValueError) as e:
+        print(f"⚠️ Segment {path} onleesbaar ({e}), overgeslagen.")
+        return []
+
+def replay(paths=None):
+    # Laatste stand per id. Een detail-response (/activities/{id}) heeft ook alle velden van de lijst, dus telt ook als samenvatting.
+    summary, detail, deleted = {}, {}, {}
+    for path in segment_paths() if paths is None else paths:
+        for r in read_segment(path):
+            i = r['id']
+            if r['kind'] == DELETED:
+                summary.pop(i, None); detail.pop(i, None); deleted[i] = r
+                continue
+            deleted.pop(i, None)
+            summary[i] = r
+            if r['kind'] == DETAIL: detail[i] = r
+    return summary, detail, deleted
+
+def compact(min_segments=2):
+    # Alles samen in één nieuw segment (achteraan, dus een crash halverwege laat een geldig archief achter), dan de oude weg
+    paths = segment_paths()
+    if len(paths) < min_segments: return 0
+    summary, detail, deleted = replay(paths)
+    rows = list(deleted.values())
+    for i, r in summary.items():
+        if detail.get(i) is not None and detail[i] is not r: rows.append(detail[i])
+        rows.append(r)
+    write_segment(new_segment_path(), rows)
+    for p in paths: os.remove(p)
+    print(f"🗜️ Archief samengevoegd: {len(paths)} segmenten → 1 ({len(rows)} records).")
+    return len(paths)
+
+def maybe_compact():
+    if len(segment_paths()) > COMPACT_AFTER: compact()
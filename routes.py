@@ -0,0 +1,206 @@
+import pandas as pd
+import numpy as np
+import base64
+import hashlib
+import os
+import struct
+import zlib
+
+# --- ROUTES (summary_polyline) ---
+# Per activiteit één keer gerasterd naar cellen in Web Mercator pixels; per jaar een gepakt bestand zoals bij de streams.
+# Een kaart is daarna tellen hoeveel ritten door elke cel gaan: nieuwe ritten komen er gewoon bij.
+ROUTES_DIR = 'routes'
+ROUTES_INDEX = os.path.join(ROUTES_DIR, 'index.csv')
+ROUTE_ZOOM = 12          # ~24 m per cel in Vlaanderen
+MAX_SEGMENT_PX = 256     # langere sprongen (GPS fout, trein, pauze zonder signaal) niet tekenen
+MAP_MAX_PX = 900
+MAP_QUANTILE = 0.01      # 1% van de cellen aan elke kant buiten beeld: één verre vakantie rekt de kaart niet op
+# Geen kaart van de voordeur op een publiek dashboard: (lat, lon, straal in m), cellen daarbinnen vallen weg.
+# Uit ROUTE_PRIVACY_ZONES="lat,lon,straal;lat,lon,straal" (een secret in de workflow) of per atleet in de roster.
+# Niets ingesteld = geen heatmap; wie echt geen zones wil zet ROUTE_PRIVACY_ZONES=geen.
+PRIVACY_OPT_OUT = 'geen'
+
+def parse_privacy_zones(spec):
+    if spec is None or not spec.strip(): return None
+    if spec.strip().lower() == PRIVACY_OPT_OUT: return []
+    return [tuple(float(v) for v in part.split(',')) for part in spec.split(';') if part.strip()]
+
+ROUTE_PRIVACY_ZONES = parse_privacy_zones(os.environ.get('ROUTE_PRIVACY_ZONES'))
+WORLD_PX = 256 * 2 ** ROUTE_ZOOM
+KEY_SHIFT = np.uint64(32)
+
+def cells_path(jaar):
+    return os.path.join(ROUTES_DIR, f"{jaar}.cells")
+
+def load_route_index():
+    if os.path.exists(ROUTES_INDEX):
+        try:
+            return pd.read_csv(ROUTES_INDEX, index_col='id')
+        except Exception as e:
+            print(f"⚠️ Routes index onleesbaar ({e}), we beginnen opnieuw.")
+    return pd.DataFrame({'jaar': [], 'offset': [], 'n': []}, dtype='int64', index=pd.Index([], dtype='int64', name='id'))
+
+def open_cells(jaar):
+    path = cells_path(jaar)
+    if not os.path.exists(path) or os.path.getsize(path) == 0: return np.empty(0, dtype=np.uint64)
+    return np.memmap(path, dtype=np.uint64, mode='r')
+
+# --- POLYLINES DECODEREN ---
+def decode_polylines(polylines):
+    # Google polyline, alle strings in één keer: 5-bit chunks, bit 0x20 = er volgt nog een chunk, zigzag, dan cumsum per lijn
+    enc = [p.encode('ascii') if isinstance(p, str) else b'' for p in polylines]
+    lengths = np.array([len(e) for e in enc])
+    if lengths.sum() == 0: return [np.empty((0, 2)) for _ in enc]
+    b = np.frombuffer(b''.join(enc), dtype=np.uint8).astype(np.int64) - 63
+    last = (b & 0x20) == 0
+    ends = np.flatnonzero(last)
+    starts = np.concatenate([[0], ends[:-1] + 1])
+    pos = np.arange(len(b)) - np.repeat(starts, ends - starts + 1)
+    v = np.add.reduceat((b & 0x1f) << (5 * pos), starts)
+    v = np.where(v & 1, ~(v >> 1), v >> 1)
+    # Aantal getallen per lijn: de eindes die binnen haar bytes vallen
+    bounds = np.concatenate([[0], np.cumsum(lengths)])
+    counts = np.diff(np.searchsorted(ends, bounds - 1, side='right'))
+    out, k = [], 0
+    for c in counts:
+        pts = v[k:k + c - c % 2].reshape(-1, 2).cumsum(axis=0) / 1e5
+        out.append(pts); k += c
+    return out
+
+# --- RASTERISEREN ---
+def to_pixels(latlon):
+    lat, lon = np.radians(np.clip(latlon[:, 0], -85.05, 85.05)), latlon[:, 1]
+    x = (lon + 180) / 360 * WORLD_PX
+    y = (1 - np.log(np.tan(lat) + 1 / np.cos(lat)) / np.pi) / 2 * WORLD_PX
+    return x, y
+
+def rasterize(points):
+    # Alle cellen waar de lijn door gaat: ze wisselt van cel op elke kruising met een gridlijn,
+    # dus het punt halverwege twee opeenvolgende kruisingen ligt in precies één cel die ze raakt
+    if len(points) == 0: return np.empty(0, dtype=np.uint64)
+    x, y = to_pixels(points)
+    px, py = [x], [y]
+    if len(points) > 1:
+        keep = np.hypot(np.diff(x), np.diff(y)) <= MAX_SEGMENT_PX
+        x0, y0, x1, y1 = x[:-1][keep], y[:-1][keep], x[1:][keep], y[1:][keep]
+        m = len(x0)
+        ts, segs = [np.zeros(m), np.ones(m)], [np.arange(m), np.arange(m)]
+        for a0, a1 in ((x0, x1), (y0, y1)):
+            f0 = np.floor(a0)
+            n = np.abs(np.floor(a1) - f0).astype(np.int64)
+            s = np.repeat(np.arange(m), n)
+            k = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+            b = np.where(a1[s] > a0[s], f0[s] + k + 1, f0[s] - k)
+            ts.append((b - a0[s]) / (a1[s] - a0[s])); segs.append(s)
+        t, s = np.concatenate(ts), np.concatenate(segs)
+        o = np.lexsort((t, s)); t, s = t[o], s[o]
+        same = s[1:] == s[:-1]
+        tm, sm = (t[1:] + t[:-1])[same] / 2, s[1:][same]
+        px.append(x0[sm] + (x1 - x0)[sm] * tm); py.append(y0[sm] + (y1 - y0)[sm] * tm)
+    x, y = np.concatenate(px), np.concatenate(py)
+    key = (x.astype(np.uint64) << KEY_SHIFT) | y.astype(np.uint64)
+    return np.unique(key)
+
+def append_routes(index, batch):
+    # batch: [(id, jaar, polyline)]; een lege polyline (binnen, handmatig) krijgt n=0 en komt niet terug
+    os.makedirs(ROUTES_DIR, exist_ok=True)
+    cells = [rasterize(p) for p in decode_polylines([p for _, _, p in batch])]
+    rows = []
+    for jaar in sorted({j for _, j, _ in batch}):
+        part = [(k, i) for k, (i, j, _) in enumerate(batch) if j == jaar]
+        known = index[index['jaar'] == jaar]
+        start = end = int((known['offset'] + known['n']).max()) if len(known) else 0
+        for k, act_id in part:
+            rows.append((act_id, jaar, end, len(cells[k]))); end += len(cells[k])
+        with open(cells_path(jaar), 'ab') as f:
+            # Een afgebroken run kan een half geschreven staart achterlaten: eerst terug naar wat de index kent
+            f.truncate(start * 8)
+            np.concatenate([cells[k] for k, _ in part]).astype(np.uint64).tofile(f)
+    new = pd.DataFrame(rows, columns=['id', 'jaar', 'offset', 'n']).set_index('id')
+    index = new if index.empty else pd.concat([index[~index.index.isin(new.index)], new])
+    index.sort_index().to_csv(ROUTES_INDEX)
+    return index
+
+# --- DICHTHEID ---
+class RouteGrid:
+    def __init__(self, df, index=None):
+        # Per jaar: unieke cellen en het aantal ritten erdoor; alleen activiteiten die nog in de data staan
+        index = load_route_index() if index is None else index
+        ids = set(df['ID'].dropna().astype('int64'))
+        index = index[(index['n'] > 0) & index.index.isin(ids)]
+        self.years, self.rides = {}, {}
+        if ROUTE_PRIVACY_ZONES is None and len(index):
+            print("⚠️ Geen ROUTE_PRIVACY_ZONES ingesteld: de route heatmap blijft uit het dashboard (ROUTE_PRIVACY_ZONES=geen om hem zonder zones te tonen).")
+        for jaar, acts in index.groupby('jaar'):
+            cells = open_cells(jaar)
+            acts = acts[acts['offset'] + acts['n'] <= len(cells)]
+            if acts.empty: continue
+            pos = np.concatenate([np.arange(o, o + n) for o, n in zip(acts['offset'], acts['n'])])
+            self.years[jaar] = np.unique(np.asarray(cells)[pos], return_counts=True)
+            self.rides[jaar] = len(acts)
+
+    def density(self, yr=None):
+        if yr is not None: return self.years.get(yr, (np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int64)))
+        if not self.years: return np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int64)
+        keys, counts = np.concatenate([k for k, _ in self.years.values()]), np.concatenate([c for _, c in self.years.values()])
+        u, inv = np.unique(keys, return_inverse=True)
+        return u, np.bincount(inv, weights=counts).astype(np.int64)
+
+    def digest(self, yr=None):
+        # Voor de fragment hashes: verandert alleen als er in dat jaar (of all-time) een route bij komt of weg gaat
+        # Andere privacy zones geven een andere kaart: die horen er ook in
+        keys, counts = self.density(yr)
+        return hashlib.sha1(repr(ROUTE_PRIVACY_ZONES).encode() + keys.tobytes() + counts.tobytes()).hexdigest()[:12] if len(keys) else ''
+
+    def ride_count(self, yr=None):
+        return self.rides.get(yr, 0) if yr is not None else sum(self.rides.values())
+
+def privacy_mask(x, y):
+    keep = np.ones(len(x), dtype=bool)
+    for lat, lon, radius in ROUTE_PRIVACY_ZONES or []:
+        cx, cy = to_pixels(np.array([[lat, lon]]))
+        m_per_px = 40075016.686 * np.cos(np.radians(lat)) / WORLD_PX
+        keep &= np.hypot(x - cx[0], y - cy[0]) * m_per_px > radius
+    return keep
+
+def density_image(keys, counts, max_px=MAP_MAX_PX):
+    # Naar een raster van hoogstens max_px breed/hoog rond waar de meeste ritten liggen; waarde = log(aantal ritten)
+    x, y = (keys >> KEY_SHIFT).astype(np.int64), (keys & np.uint64(0xFFFFFFFF)).astype(np.int64)
+    keep = privacy_mask(x, y)
+    x, y, counts = x[keep], y[keep], counts[keep]
+    if len(x) == 0: return None
+    q = [MAP_QUANTILE, 1 - MAP_QUANTILE] if len(x) > 100 else [0, 1]
+    x0, x1 = np.quantile(x, q).astype(np.int64); y0, y1 = np.quantile(y, q).astype(np.int64)
+    pad = max(x1 - x0, y1 - y0) // 20 + 2
+    x0, x1, y0, y1 = x0 - pad, x1 + pad, y0 - pad, y1 + pad
+    f = int(np.ceil(max(x1 - x0, y1 - y0) / max_px))
+    w, h = (x1 - x0) // f + 1, (y1 - y0) // f + 1
+    inside = (x >= x0) & (x <= x1) & (y >= y0) & (y <= y1)
+    cell = ((y[inside] - y0) // f) * w + (x[inside] - x0) // f
+    grid = np.bincount(cell, weights=counts[inside], minlength=w * h).reshape(h, w)
+    return np.log1p(grid), int(inside.sum()), len(x)
+
+def palette(rgb_low, rgb_high):
+    # Index 0 transparant, daarna van de gekozen kleur naar wit voor de drukste cellen
+    t = np.linspace(0, 1, 255)[:, None]
+    lo, hi = np.array(rgb_low, dtype=float), np.array(rgb_high, dtype=float)
+    mid = np.where(t < 0.7, lo * (0.35 + t / 0.7 * 0.65), lo + (hi - lo) * (t - 0.7) / 0.3)
+    return np.vstack([[0, 0, 0], mid]).round().astype(np.uint8)
+
+def png_bytes(img, pal):
+    # Minimale PNG met palet (kleurtype 3): een byte per pixel en veel nullen, dus zlib maakt hem klein
+    h, w = img.shape
+    raw = np.hstack([np.zeros((h, 1), dtype=np.uint8), img]).tobytes()
+    def chunk(tag, data): return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', w, h, 8, 3, 0, 0, 0)) + chunk(b'PLTE', pal.tobytes())
+            + chunk(b'tRNS', b'\x00') + chunk(b'IDAT', zlib.compress(raw, 9)) + chunk(b'IEND', b''))
+
+def heatmap_png(grid, rgb, max_px=MAP_MAX_PX):
+    keys, counts = grid
+    if len(keys) == 0 or ROUTE_PRIVACY_ZONES is None: return None
+    res = density_image(keys, counts, max_px)
+    if res is None: return None
+    img, shown, total = res
+    top = img.max()
+    idx = np.where(img > 0, 1 + np.round(img / (top if top > 0 else 1) * 254), 0).astype(np.uint8)
+    return 'data:image/png;base64,' + base64.b64encode(png_bytes(idx, palette(rgb, (255, 255, 255)))).decode('ascii'), shown, total
@@ -0,0 +1,178 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+import maak_dashboard as md
+from activity_store import load_activities_delta, ACTIVITIES_CSV
+from aggregates import AggregateCube
+from best_efforts import BestEfforts, load_best_efforts, BEST_EFFORTS_CSV
+from streams_store import zone_seconds, STREAMS_INDEX
+from routes import RouteGrid, ROUTES_INDEX
+from gear import update_odometer
+from build_report import BuildReport
+
+# --- DAEMON ---
+# Eén proces dat de opgeschoonde data, de kubus en de zonetijden vasthoudt en alleen herbouwt wat veranderd is.
+# Wijzigingen komen binnen via polling van de bronbestanden of een POST /rebuild vanuit de sync (DASHBOARD_URL).
+WATCH_FILES = [ACTIVITIES_CSV, STREAMS_INDEX, BEST_EFFORTS_CSV, ROUTES_INDEX]
+POLL_SEC = 2.0
+SETTLE_SEC = 0.5  # de sync schrijft de CSV niet atomisch: pas lezen als hij even niet meer verandert
+STATIC_EXT = {'.js', '.png', '.jpg', '.ico', '.svg', '.webmanifest'}
+STATIC_FILES = {'manifest.json'}
+
+def file_stamps():
+    st = {p: (os.stat(p).st_mtime_ns, os.stat(p).st_size) if os.path.exists(p) else None for p in WATCH_FILES}
+    # Het lopende jaar (YTD, reeksen) en de belastingcurve hangen van vandaag af
+    st['dag'] = datetime.now().strftime('%Y-%m-%d')
+    return st
+
+class ResidentDashboard:
+    def __init__(self):
+        self.activities = None  # (rij-hashes, df) uit load_activities_delta
+        self.cube = self.odometer = self.zs = self.routes = None
+        self.sections = {}      # key -> (hash, html of logboek JSON)
+        self.stamps = {}
+        self.page = None        # (bytes, etag); in één keer vervangen zodat de server nooit een halve pagina ziet
+        self.status = {}
+        self.lock = threading.Lock()
+
+    def refresh(self):
+        with self.lock:
+            stamps = file_stamps()
+            changed = {k for k in stamps if stamps[k] != self.stamps.get(k)}
+            if not changed: return False
+            time.sleep(SETTLE_SEC)
+            if file_stamps() != stamps: return False  # nog bezig met schrijven, volgende poll opnieuw
+            self.rebuild(stamps, changed)
+            return True
+
+    def rebuild(self, stamps, changed):
+        report = BuildReport().start()
+        rebuilt = []
+        try:
+            with report.span('laden') as rec:
+                if ACTIVITIES_CSV in changed or self.activities is None:
+                    self.activities, rec['rows'] = load_activities_delta(self.activities)
+                    self.cube = None
+                df = self.activities[1]
+            with report.span('kubus', rows=len(df)):
+                if self.cube is None: self.cube, self.odometer = AggregateCube(df), None
+                cube = self.cube
+            with report.span('materiaal'):
+                if self.odometer is None: self.odometer = update_odometer(cube)
+                odometer = self.odometer
+            with report.span('streams'):
+                # Zonetijd leest alle streams: alleen opnieuw als de index veranderd is
+                if STREAMS_INDEX in changed or self.zs is None: self.zs = zone_seconds(md.HR_ZONES)
+                zones = md.load_zone_time(df, self.zs)
+                efforts = BestEfforts(load_best_efforts(), df)
+            with report.span('routes'):
+                if ACTIVITIES_CSV in changed or ROUTES_INDEX in changed or self.routes is None: self.routes = RouteGrid(df)
+                routes = self.routes
+            with report.span('trainingsbelasting'):
+                training = md.load_training(df, self.zs, efforts)
+            builders, nav = md.year_builders(report, cube, df, zones, efforts, training, routes, odometer)
+            hashes = md.section_hashes(cube, df, zones, efforts, training, routes, builders)
+            builders[md.LOGBOOK_KEY] = (None, md.section_span(report, md.LOGBOOK_KEY, len(df), lambda: md.logbook_payload(df)))
+            with report.span('secties'):
+                for key, (_, builder) in builders.items():
+                    if self.sections.get(key, (None,))[0] != hashes[key]:
+                        self.sections[key] = (hashes[key], builder()); rebuilt.append(key)
+                self.sections = {k: self.sections[k] for k in builders}
+                sects = "".join(md.tab_html(key, self.sections[key][1]) for key in builders if key != md.LOGBOOK_KEY)
+                log_data = f'<script id="log-data" type="application/json">{self.sections[md.LOGBOOK_KEY][1]}</script>'
+            html = md.render_page(nav, sects, md.gear_totals(odometer), log_data)
+            with report.span('schrijven') as rec:
+                md.write_dashboard(html)
+                rec['bytes'] = len(html.encode('utf-8'))
+            body = html.encode('utf-8')
+            self.page = (body, '"' + hashlib.sha1(body).hexdigest()[:16] + '"')
+        except Exception as e:
+            report.fail(e)
+            print(f"❌ Fout in {report.error['span'] or 'de build'}: {e}\n{report.error['traceback']}")
+        finally:
+            report.finish()
+            # Ook na een fout: pas bij de volgende wijziging opnieuw proberen, de oude pagina blijft staan
+            self.stamps = stamps
+        report.meta.update({'daemon': True, 'changed': sorted(changed), 'rebuilt': rebuilt, 'html_bytes': len(self.page[0]) if self.page else None})
+        report.write()
+        self.status = {'built': report.started, 'ok': report.error is None, 'sec': round(report.total_sec, 3), 'changed': sorted(changed),
+                       'rebuilt': rebuilt, 'etag': self.page and self.page[1], 'rows': len(self.activities[1]) if self.activities else None}
+        print(f"{'✅' if report.error is None else '❌'} {report.total_sec * 1000:.0f} ms; gewijzigd: {', '.join(sorted(changed))}; opnieuw gebouwd: {', '.join(rebuilt) or '-'}")
+
+class DashboardHandler(SimpleHTTPRequestHandler):
+    dashboard = None
+    wake = None
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0]
+        if path in ('/', '/' + md.DASHBOARD_HTML): return self.send_page()
+        if path == '/status': return self.send_json(200, self.dashboard.status)
+        name = os.path.basename(path)
+        # Alleen wat de pagina zelf nodig heeft; activities.csv en de rest van de map blijven privé
+        if os.path.splitext(name)[1].lower() in STATIC_EXT or name in STATIC_FILES: return super().do_GET()
+        self.send_error(404)
+
+    def do_POST(self):
+        if self.path.split('?', 1)[0] != '/rebuild': return self.send_error(404)
+        self.wake.set()
+        self.send_json(202, {'queued': True})
+
+    def send_page(self):
+        page = self.dashboard.page
+        if page is None: return self.send_error(503, "Dashboard wordt nog gebouwd")
+        body, etag = page
+        if etag in [t.strip() for t in self.headers.get('If-None-Match', '').split(',')]:
+            self.send_response(304); self.send_header('ETag', etag); self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'no-cache')  # altijd even navragen; met de ETag kost dat alleen een 304
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, code, data):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        pass
+
+def watch(dashboard, wake, poll):
+    while True:
+        wake.wait(poll); wake.clear()
+        dashboard.refresh()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dashboard in het geheugen houden, herbouwen bij wijzigingen en lokaal serveren")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--poll', type=float, default=POLL_SEC, help="Seconden tussen twee controles van de bronbestanden")
+    parser.add_argument('--no-serve', action='store_true', help="Alleen bijhouden en dashboard.html schrijven, geen HTTP server")
+    args = parser.parse_args()
+
+    dashboard, wake = ResidentDashboard(), threading.Event()
+    print("🚀 Eerste build...")
+    dashboard.refresh()
+    if args.no_serve:
+        print(f"👀 Bronbestanden worden elke {args.poll:g}s gecontroleerd (Ctrl+C om te stoppen).")
+    else:
+        DashboardHandler.dashboard, DashboardHandler.wake = dashboard, wake
+        server = ThreadingHTTPServer((args.host, args.port), lambda *a: DashboardHandler(*a, directory=os.getcwd()))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f"🌐 Dashboard op http://{args.host}:{args.port}/ (POST /rebuild om meteen te herbouwen, GET /status voor de laatste build)")
+    try:
+        watch(dashboard, wake, args.poll)
+    except KeyboardInterrupt:
+        print("👋 Gestopt.")
@@ -0,0 +1,138 @@
+import requests
+from requests.adapters import HTTPAdapter
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# --- STRAVA RATE LIMIT ---
+# Strava telt per kwartier (klok-uitgelijnd) en per dag; headers zien eruit als "100,1000" en "12,340"
+WINDOW_SEC = 900
+DEFAULT_LIMIT_15 = 100
+RESERVE = 5  # een paar calls over laten voor andere stappen in dezelfde run
+
+class RateLimitStop(Exception):
+    pass
+
+def parse_rate_headers(headers):
+    # Nieuwere apps krijgen aparte read-limieten; die zijn strenger voor GET's
+    for prefix in ('X-ReadRateLimit', 'X-RateLimit'):
+        limit, usage = headers.get(f'{prefix}-Limit'), headers.get(f'{prefix}-Usage')
+        if limit and usage:
+            try:
+                l15, lday = (int(x) for x in limit.split(',')[:2])
+                u15, uday = (int(x) for x in usage.split(',')[:2])
+                return l15, u15, lday, uday
+            except ValueError:
+                return None
+    return None
+
+def seconds_to_window_reset(now=None):
+    now = time.time() if now is None else now
+    return WINDOW_SEC - (now % WINDOW_SEC) + 1
+
+class TokenBucket:
+    def __init__(self, limit=DEFAULT_LIMIT_15, reserve=RESERVE):
+        self.lock = threading.Lock()
+        self.reserve = reserve
+        self.capacity = max(limit - reserve, 1)
+        self.rate = limit / WINDOW_SEC
+        self.tokens = float(self.capacity)
+        self.stamp = time.monotonic()
+        self.paused_until = 0.0
+        self.daily_left = None
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def acquire(self, max_wait):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.daily_left is not None and self.daily_left <= self.reserve:
+                    raise RateLimitStop("daglimiet bereikt")
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                else:
+                    wait = (1 - self.tokens) / self.rate
+            if wait > max_wait:
+                raise RateLimitStop(f"volgende call pas over {wait:.0f}s")
+            time.sleep(min(wait, 1.0))
+
+    def update(self, headers):
+        parsed = parse_rate_headers(headers)
+        if not parsed: return
+        l15, u15, lday, uday = parsed
+        with self.lock:
+            self.capacity = max(l15 - self.reserve, 1)
+            self.rate = l15 / WINDOW_SEC
+            # Strava is de bron van waarheid: nooit meer tokens dan er écht over zijn dit kwartier
+            self.tokens = min(self.tokens, max(l15 - u15 - self.reserve, 0))
+            self.daily_left = lday - uday
+
+    def pause(self, seconds):
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+# --- FETCHER ---
+class StravaFetcher:
+    def __init__(self, token, workers=4, max_wait=120):
+        self.session = requests.Session()
+        self.session.headers['Authorization'] = f"Bearer {token}"
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        self.session.mount('https://', adapter); self.session.mount('http://', adapter)
+        self.workers = workers
+        self.max_wait = max_wait
+        self.bucket = TokenBucket()
+        self.stopped = threading.Event()
+
+    def get(self, url, params=None):
+        while True:
+            if self.stopped.is_set(): raise RateLimitStop("gestopt")
+            try:
+                self.bucket.acquire(self.max_wait)
+            except RateLimitStop:
+                self.stopped.set(); raise
+            r = self.session.get(url, params=params, timeout=30)
+            self.bucket.update(r.headers)
+            if r.status_code != 429: return r
+            retry = r.headers.get('Retry-After')
+            wait = float(retry) if retry and retry.replace('.', '', 1).isdigit() else seconds_to_window_reset()
+            if wait > self.max_wait:
+                self.stopped.set()
+                raise RateLimitStop(f"429, opnieuw proberen kan pas over {wait:.0f}s")
+            print(f"⏳ 429 van Strava, we wachten {wait:.0f}s en gaan dan verder...")
+            self.bucket.pause(wait)
+
+    def fetch_many(self, items, fn, on_checkpoint=None, checkpoint_every=25):
+        # fn(fetcher, item) -> resultaat of None; checkpoints gaan per batch zodat een afgebroken run niets verliest
+        results, pending = [], []
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(fn, self, item): item for item in items}
+            try:
+                for fut in as_completed(futures):
+                    try:
+                        res = fut.result()
+                    except RateLimitStop:
+                        continue
+                    except requests.RequestException as e:
+                        print(f"⚠️ Netwerkfout, volgende run opnieuw: {e}")
+                        continue
+                    except Exception as e:
+                        # Afgekapte JSON, ontbrekend veld, ...: alleen dit item overslaan, de rest gaat door
+                        print(f"⚠️ {futures[fut]} overgeslagen, volgende run opnieuw: {e!r}")
+                        continue
+                    if res is None: continue
+                    results.append(res); pending.append(res)
+                    if on_checkpoint and len(pending) >= checkpoint_every:
+                        on_checkpoint(pending); pending = []
+            finally:
+                # Ook bij een onderbreking: wat al binnen is, gaat nog naar het laatste checkpoint
+                if on_checkpoint and pending: on_checkpoint(pending)
+        if self.stopped.is_set():
+            print("⚠️ API limiet bereikt; de volgende run gaat verder waar deze stopte.")
+        return results
@@ -0,0 +1,217 @@
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import requests
+
+import update_activities as ua
+
+# --- STRAVA WEBHOOK ---
+# Strava stuurt per activiteit een event (create/update/delete) en bij intrekken van de toegang een athlete-event.
+# We antwoorden meteen, zetten het event in een wachtrij op schijf en verwerken na een rustige periode alles in één keer:
+# alleen de genoemde id's ophalen, daarna één dashboard build.
+WEBHOOK_QUEUE = 'webhook_queue.jsonl'
+VERIFY_TOKEN = os.environ.get('STRAVA_VERIFY_TOKEN', '')
+ATHLETE_ID = os.environ.get('STRAVA_ATHLETE_ID')  # optioneel: events van andere atleten op dezelfde app negeren
+PUSH_SUBSCRIPTIONS_URL = f"{ua.API_URL}/api/v3/push_subscriptions"
+DEBOUNCE_SEC = 60    # na een upload volgen vaak nog updates (titel, materiaal): even wachten tot het stil is
+MAX_DELAY_SEC = 300  # maar bij een constante stroom events nooit langer dan dit
+RETRY_SEC = 900      # id's die niet lukten (API limiet) pas na een nieuw kwartier opnieuw
+
+class EventQueue:
+    def __init__(self, path=WEBHOOK_QUEUE, debounce=DEBOUNCE_SEC, max_delay=MAX_DELAY_SEC):
+        self.path, self.debounce, self.max_delay = path, debounce, max_delay
+        self.lock = threading.Lock()
+        self.changed = threading.Event()
+        self.first = self.last = None  # monotone tijden van het oudste en nieuwste onverwerkte event
+        self.not_before = 0.0
+        if self.pending():
+            self.first = self.last = time.monotonic()
+
+    def pending(self):
+        with self.lock:
+            if not os.path.exists(self.path): return []
+            with open(self.path, encoding='utf-8') as f: return [json.loads(l) for l in f if l.strip()]
+
+    def push(self, event):
+        # Eerst naar schijf, dan pas 200 naar Strava: een herstart verliest niets
+        with self.lock:
+            with open(self.path, 'a', encoding='utf-8') as f: f.write(json.dumps(event) + '\n')
+            now = time.monotonic()
+            self.first = self.first or now
+            self.last = now
+        self.changed.set()
+
+    def due(self, now):
+        if self.first is None or now < self.not_before: return False
+        return now - self.last >= self.debounce or now - self.first >= self.max_delay
+
+    def done(self, n, retry=(), retry_delete=()):
+        # De eerste n events zijn verwerkt; wat intussen binnenkwam blijft staan, mislukte id's gaan achteraan
+        # met hun eigen soort: een delete die niet lukte blijft een delete
+        with self.lock:
+            with open(self.path, encoding='utf-8') as f: rest = [l for l in f if l.strip()][n:]
+            rest += [json.dumps({'object_type': 'activity', 'object_id': i, 'aspect_type': aspect, 'retry': True}) + '\n'
+                     for aspect, ids in (('update', retry), ('delete', retry_delete)) for i in ids]
+            with open(self.path + '.tmp', 'w', encoding='utf-8') as f: f.writelines(rest)
+            os.replace(self.path + '.tmp', self.path)
+            now = time.monotonic()
+            self.first = self.last = now if rest else None
+            if retry: self.not_before = now + RETRY_SEC
+
+def coalesce(events):
+    # Per activiteit telt alleen het laatste event; create+delete in dezelfde batch kost dus geen call
+    upsert, delete, deauth = set(), set(), False
+    for e in sorted(events, key=lambda e: e.get('event_time', 0)):
+        if ATHLETE_ID and e.get('owner_id') is not None and str(e['owner_id']) != ATHLETE_ID: continue
+        if e.get('object_type') == 'athlete':
+            if str(e.get('updates', {}).get('authorized', '')).lower() == 'false': deauth = True
+            continue
+        if e.get('object_type') != 'activity': continue
+        act_id = int(e['object_id'])
+        if e.get('aspect_type') == 'delete':
+            upsert.discard(act_id); delete.add(act_id)
+        else:
+            delete.discard(act_id); upsert.add(act_id)
+    return upsert, delete, deauth
+
+def mark_deauthorized():
+    state = ua.load_sync_state()
+    state['deauthorized'] = datetime.now().isoformat(timespec='seconds')
+    ua.write_sync_state(state)
+    print(f"🚫 Toegang tot Strava ingetrokken (vastgelegd in {ua.SYNC_STATE_FILE}): geen sync meer en publish.py haalt de site offline"
+          " tot er opnieuw gekoppeld is.")
+
+def rebuild_dashboard(incremental):
+    # Draait serve_dashboard.py, dan doet die het herbouwen; anders hier, in hetzelfde proces (imports maar één keer)
+    if ua.DASHBOARD_URL:
+        ua.notify_dashboard(); return
+    import maak_dashboard
+    maak_dashboard.genereer_dashboard(incremental=incremental)
+
+def process_batch(queue, incremental):
+    events = queue.pending()
+    if not events: return
+    upsert, delete, deauth = coalesce(events)
+    print(f"📬 {len(events)} events: {len(upsert)} op te halen, {len(delete)} te verwijderen" + (", toegang ingetrokken" if deauth else ""))
+    if deauth:
+        mark_deauthorized()
+        queue.done(len(events)); return
+    if ua.still_deauthorized():
+        # Niets ophalen; na opnieuw koppelen haalt de gewone sync alles in
+        queue.done(len(events)); return
+    retry, retry_delete = [], []
+    try:
+        if upsert or delete: retry = ua.apply_changes(upsert, delete)
+    except SystemExit:
+        # apply_changes stopt met exit(1) als het token niet lukt: alles opnieuw proberen na de wachttijd
+        retry, retry_delete = sorted(upsert), sorted(delete)
+        print("⚠️ Sync mislukt, events blijven in de wachtrij.")
+    except Exception as e:
+        retry, retry_delete = sorted(upsert), sorted(delete)
+        print(f"❌ Fout bij verwerken van de events: {e}")
+    queue.done(len(events), retry, retry_delete)
+    failed = len(retry) + len(retry_delete)
+    if failed: print(f"⏳ {failed} activiteiten over {RETRY_SEC // 60} minuten opnieuw.")
+    if (upsert or delete) and failed < len(upsert) + len(delete): rebuild_dashboard(incremental)
+
+def worker(queue, incremental):
+    while True:
+        queue.changed.wait(1.0); queue.changed.clear()
+        if queue.due(time.monotonic()): process_batch(queue, incremental)
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    queue = None
+
+    def do_GET(self):
+        # Validatie bij het aanmaken van de subscription: challenge terugsturen als het token klopt
+        q = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+        if q.get('hub.mode') == 'subscribe' and q.get('hub.verify_token') == VERIFY_TOKEN and 'hub.challenge' in q:
+            return self.send_json(200, {'hub.challenge': q['hub.challenge']})
+        self.send_json(403, {'error': 'verify_token klopt niet'})
+
+    def do_POST(self):
+        try:
+            event = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        except ValueError:
+            return self.send_json(400, {'error': 'geen JSON'})
+        if not isinstance(event, dict) or 'object_type' not in event:
+            return self.send_json(400, {'error': 'geen Strava event'})
+        # Strava wil binnen 2 seconden een 200, anders probeert hij het opnieuw
+        self.queue.push(event)
+        self.send_json(200, {'queued': True})
+
+    def send_json(self, code, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        pass
+
+def serve(args):
+    if not VERIFY_TOKEN: print("⚠️ STRAVA_VERIFY_TOKEN niet gezet: Strava kan de subscription niet valideren.")
+    queue = EventQueue(debounce=args.debounce, max_delay=args.max_delay)
+    WebhookHandler.queue = queue
+    server = ThreadingHTTPServer((args.host, args.port), WebhookHandler)
+    threading.Thread(target=worker, args=(queue, args.incremental), daemon=True).start()
+    print(f"📡 Webhook op http://{args.host}:{args.port}/ ({len(queue.pending())} events in de wachtrij; build {args.debounce:g}s na het laatste event)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("👋 Gestopt; onverwerkte events blijven in " + WEBHOOK_QUEUE)
+
+def send(args):
+    # Lokale stand-in voor Strava: hetzelfde formaat als de echte push events
+    if args.aspect == 'deauth':
+        event = {'object_type': 'athlete', 'object_id': args.owner, 'aspect_type': 'update', 'updates': {'authorized': 'false'}}
+    else:
+        event = {'object_type': 'activity', 'object_id': args.id, 'aspect_type': args.aspect, 'updates': dict(kv.split('=', 1) for kv in args.update)}
+    event.update({'owner_id': args.owner, 'subscription_id': 0, 'event_time': int(time.time())})
+    r = requests.post(args.url, json=event, timeout=5)
+    print(f"{'✅' if r.ok else '❌'} {r.status_code} {r.text}")
+
+def subscribe(args):
+    data = {'client_id': ua.CLIENT_ID, 'client_secret': ua.CLIENT_SECRET}
+    if args.list:
+        r = requests.get(PUSH_SUBSCRIPTIONS_URL, params=data, timeout=30)
+    elif args.delete:
+        r = requests.delete(f"{PUSH_SUBSCRIPTIONS_URL}/{args.delete}", params=data, timeout=30)
+    else:
+        # Strava doet meteen een GET op de callback: de receiver moet dan al draaien
+        r = requests.post(PUSH_SUBSCRIPTIONS_URL, data={**data, 'callback_url': args.callback, 'verify_token': VERIFY_TOKEN}, timeout=30)
+    print(f"{'✅' if r.ok else '❌'} {r.status_code} {r.text}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Strava push events ontvangen en alleen de gewijzigde activiteiten synchroniseren")
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    p = sub.add_parser('serve', help="Webhook receiver draaien")
+    p.add_argument('--host', default='0.0.0.0')
+    p.add_argument('--port', type=int, default=8001)
+    p.add_argument('--incremental', action='store_true', help="Dashboard met fragmenten per jaar bouwen")
+    p.add_argument('--debounce', type=float, default=DEBOUNCE_SEC, help="Seconden stilte na het laatste event voor we verwerken")
+    p.add_argument('--max-delay', type=float, default=MAX_DELAY_SEC, help="Nooit langer wachten dan dit na het eerste event")
+    p.set_defaults(fn=serve)
+    p = sub.add_parser('send', help="Test-event naar een lokale receiver sturen")
+    p.add_argument('aspect', choices=['create', 'update', 'delete', 'deauth'])
+    p.add_argument('id', type=int, nargs='?', default=0, help="Activiteit-id")
+    p.add_argument('--update', nargs='*', default=[], metavar='VELD=WAARDE', help="Bv. title=Nieuwe naam")
+    p.add_argument('--owner', type=int, default=int(ATHLETE_ID or 0))
+    p.add_argument('--url', default='http://127.0.0.1:8001/')
+    p.set_defaults(fn=send)
+    p = sub.add_parser('subscribe', help="Subscription bij Strava aanmaken, tonen of verwijderen")
+    p.add_argument('--callback', help="Publieke URL van de receiver")
+    p.add_argument('--list', action='store_true')
+    p.add_argument('--delete', type=int, metavar='ID')
+    p.set_defaults(fn=subscribe)
+    args = parser.parse_args()
+    if args.cmd == 'subscribe' and not (args.list or args.delete or args.callback):
+        parser.error("subscribe heeft --callback, --list of --delete nodig")
+    args.fn(args)
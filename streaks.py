@@ -0,0 +1,64 @@
+import pandas as pd
+import numpy as np
+
+# --- REEKSEN ---
+# Elke periode wordt een geheel getal (dag, ISO-week, maand); opeenvolgende getallen vormen een reeks
+PERIODS = ('day', 'week', 'month')
+GROUP_SHIFT = np.int64(1) << 40  # groep-code in de hoge bits, zodat alle groepen in één keer gaan
+ALL = 'Alles'
+
+def period_ordinals(dates, period):
+    d = np.asarray(dates, dtype='datetime64[D]')
+    if period == 'day': return d.astype(np.int64)
+    # 1970-01-01 was een donderdag: +3 laat weken op maandag beginnen (ISO)
+    if period == 'week': return (d.astype(np.int64) + 3) // 7
+    if period == 'month': return d.astype('datetime64[M]').astype(np.int64)
+    raise ValueError(f"Onbekende periode: {period}")
+
+def ordinal_bounds(o, period):
+    o = np.asarray(o, dtype=np.int64)
+    if period == 'day':
+        start = o.astype('datetime64[D]'); end = start
+    elif period == 'week':
+        start = (o * 7 - 3).astype('datetime64[D]'); end = start + np.timedelta64(6, 'D')
+    else:
+        start = o.astype('datetime64[M]').astype('datetime64[D]')
+        end = (o + 1).astype('datetime64[M]').astype('datetime64[D]') - np.timedelta64(1, 'D')
+    return pd.to_datetime(start), pd.to_datetime(end)
+
+def streak_runs(dates, period='day', groups=None):
+    # Geeft alle reeksen terug als tabel (groep, begin, eind, lengte) in één vectorized pass
+    dates = pd.Series(dates).reset_index(drop=True)
+    valid = dates.notna().to_numpy()
+    o = period_ordinals(dates[valid], period)
+    if groups is None:
+        codes, labels = np.zeros(len(o), dtype=np.int64), np.array([ALL], dtype=object)
+    else:
+        codes, labels = pd.factorize(pd.Series(groups).reset_index(drop=True)[valid], sort=True)
+        codes = codes.astype(np.int64)
+    if not len(o): return pd.DataFrame(columns=['groep', 'begin', 'eind', 'lengte'])
+    base = o.min()  # niet-negatief houden, anders klopt het uitpakken van de groep-bits niet
+    u = np.unique(codes * GROUP_SHIFT + (o - base))
+    # diff != 1 -> nieuwe reeks; een andere groep verschilt altijd meer dan 1
+    run_id = np.concatenate([[0], np.cumsum(np.diff(u) != 1)])
+    lengte = np.bincount(run_id)
+    first = np.concatenate([[0], np.cumsum(lengte)[:-1]])
+    begin, eind = u[first], u[first + lengte - 1]
+    return pd.DataFrame({'groep': labels[begin // GROUP_SHIFT], 'begin': begin % GROUP_SHIFT + base, 'eind': eind % GROUP_SHIFT + base, 'lengte': lengte})
+
+def compute_streaks(dates, period='day', groups=None, today=None):
+    runs = streak_runs(dates, period, groups)
+    today = pd.Timestamp.now() if today is None else pd.Timestamp(today)
+    now = period_ordinals([today.normalize()], period)[0]
+    out = {}
+    for groep, r in runs.groupby('groep', sort=False):
+        best = r.iloc[int(np.argmax(r['lengte'].to_numpy()))]
+        last = r.iloc[-1]
+        # Een reeks loopt nog als de huidige of de vorige periode actief was
+        loopt = last['eind'] >= now - 1
+        b_start, b_end = ordinal_bounds([best['begin'], best['eind']], period)
+        c_start, c_end = ordinal_bounds([last['begin'], last['eind']], period)
+        out[groep] = {'current': int(last['lengte']) if loopt else 0,
+                      'current_start': c_start[0] if loopt else None, 'current_end': c_end[1] if loopt else None,
+                      'longest': int(best['lengte']), 'longest_start': b_start[0], 'longest_end': b_end[1]}
+    return out if groups is not None else out.get(ALL, {'current': 0, 'current_start': None, 'current_end': None, 'longest': 0, 'longest_start': None, 'longest_end': None})
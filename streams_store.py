@@ -0,0 +1,98 @@
+import pandas as pd
+import numpy as np
+import os
+
+# --- STREAMS OPSLAG ---
+# Per jaar één gepakt bestand per kanaal (streams/2026.heartrate, ...); index.csv zegt per activiteit waar haar samples staan
+STREAMS_DIR = 'streams'
+STREAMS_INDEX = os.path.join(STREAMS_DIR, 'index.csv')
+CHANNELS = {'time': np.int32, 'heartrate': np.int16, 'watts': np.int16, 'velocity_smooth': np.float32}
+STREAM_KEYS = list(CHANNELS)
+# Waarde voor "geen data": hartslag 0 telt nergens mee, vermogen -1 is iets anders dan 0 watt (uitbollen)
+MISSING = {'time': -1, 'heartrate': 0, 'watts': -1, 'velocity_smooth': np.nan}
+MAX_GAP_SEC = 30  # langere gaten in de time stream zijn pauzes, geen tijd in een zone
+CHUNK_SAMPLES = 2_000_000
+
+def channel_path(jaar, key):
+    return os.path.join(STREAMS_DIR, f"{jaar}.{key}")
+
+def load_index():
+    if os.path.exists(STREAMS_INDEX):
+        try:
+            return pd.read_csv(STREAMS_INDEX, index_col='id')
+        except Exception as e:
+            print(f"⚠️ Streams index onleesbaar ({e}), we beginnen opnieuw.")
+    return pd.DataFrame({'jaar': [], 'offset': [], 'n': []}, dtype='int64', index=pd.Index([], dtype='int64', name='id'))
+
+def save_index(index):
+    index.sort_index().to_csv(STREAMS_INDEX)
+
+def stream_data(streams, key):
+    s = streams.get(key)
+    return s.get('data') if isinstance(s, dict) else None
+
+def to_channel(streams, key, n):
+    data = stream_data(streams, key)
+    if data is None or len(data) != n: return np.full(n, MISSING[key], dtype=CHANNELS[key])
+    arr = np.asarray(data, dtype=np.float64)
+    if CHANNELS[key] != np.float32:
+        arr = np.where(np.isnan(arr), MISSING[key], np.round(arr))
+        info = np.iinfo(CHANNELS[key]); arr = np.clip(arr, info.min, info.max)
+    return arr.astype(CHANNELS[key])
+
+def append_streams(index, batch):
+    # batch: [(id, jaar, streams-dict)]; een leeg dict = activiteit zonder streams (niet opnieuw vragen)
+    os.makedirs(STREAMS_DIR, exist_ok=True)
+    rows = []
+    for jaar in sorted({j for _, j, _ in batch}):
+        part = [(i, s) for i, j, s in batch if j == jaar]
+        known = index[index['jaar'] == jaar]
+        start = end = int((known['offset'] + known['n']).max()) if len(known) else 0
+        per_key = {k: [] for k in CHANNELS}
+        for act_id, streams in part:
+            n = len(stream_data(streams, 'time') or [])
+            for k in CHANNELS: per_key[k].append(to_channel(streams, k, n))
+            rows.append((act_id, jaar, end, n)); end += n
+        for k, arrays in per_key.items():
+            # Een afgebroken run kan een half geschreven staart achterlaten: eerst terug naar wat de index kent
+            with open(channel_path(jaar, k), 'ab') as f:
+                f.truncate(start * np.dtype(CHANNELS[k]).itemsize)
+                np.concatenate(arrays).tofile(f)
+    new = pd.DataFrame(rows, columns=['id', 'jaar', 'offset', 'n']).set_index('id')
+    index = new if index.empty else pd.concat([index[~index.index.isin(new.index)], new])
+    save_index(index)
+    return index
+
+def open_channel(jaar, key):
+    path = channel_path(jaar, key)
+    if not os.path.exists(path) or os.path.getsize(path) == 0: return np.empty(0, dtype=CHANNELS[key])
+    return np.memmap(path, dtype=CHANNELS[key], mode='r')
+
+# --- TIJD IN ZONES ---
+def zone_seconds(zones, index=None):
+    # zones: {naam: bovengrens}, oplopend; per activiteit de echte seconden per zone, jaar per jaar en in blokken
+    index = load_index() if index is None else index
+    names, bounds = list(zones), np.asarray(list(zones.values())[:-1])
+    nz = len(names) + 1  # +1: code 0 = geen hartslag
+    out = []
+    for jaar, acts in index[index['n'] > 0].sort_values('offset').groupby('jaar'):
+        tijd, hr = open_channel(jaar, 'time'), open_channel(jaar, 'heartrate')
+        offsets, lengths, ids = acts['offset'].to_numpy(), acts['n'].to_numpy(), acts.index.to_numpy()
+        if len(tijd) < offsets[-1] + lengths[-1]: continue
+        blok = np.concatenate([[0], np.cumsum(lengths)]) // CHUNK_SAMPLES
+        for b in np.unique(blok[:-1]):
+            sel = np.flatnonzero(blok[:-1] == b)
+            s, e = offsets[sel[0]], offsets[sel[-1]] + lengths[sel[-1]]
+            # Alleen de samples die de index kent (een vervangen activiteit laat een wees-stuk achter)
+            first = np.concatenate([[0], np.cumsum(lengths[sel])[:-1]])
+            pos = np.arange(lengths[sel].sum()) + np.repeat(offsets[sel] - s - first, lengths[sel])
+            t = np.asarray(tijd[s:e], dtype=np.int64)[pos]; h = np.asarray(hr[s:e])[pos]
+            dt = np.diff(t, prepend=t[:1])
+            dt[first] = 0  # eerste sample van elke activiteit
+            dt = np.clip(dt, 0, MAX_GAP_SEC)
+            zone = np.where(h > 0, np.searchsorted(bounds, h, side='right') + 1, 0)
+            act = np.repeat(np.arange(len(sel)), lengths[sel])
+            sec = np.bincount(act * nz + zone, weights=dt, minlength=len(sel) * nz).reshape(len(sel), nz)
+            out.append(pd.DataFrame(sec[:, 1:], index=pd.Index(ids[sel], name='id'), columns=names))
+    if not out: return pd.DataFrame(columns=names, index=pd.Index([], dtype='int64', name='id'))
+    return pd.concat(out)
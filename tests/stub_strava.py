@@ -0,0 +1,107 @@
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+# --- STUB STRAVA API ---
+# Strava op localhost: telt calls per kwartier en per dag, stuurt dezelfde X-RateLimit headers mee en weigert met een 429
+# zodra het kwartier op is (of als force_429 nog loopt). /athlete/activities met after/before en paging zoals Strava
+# (met 'after' oplopend, anders nieuwste eerst), /activities/{id} en /activities/{id}/streams: genoeg voor strava_fetcher.py
+# en update_activities.py (API_URL naar stub.url).
+class StubStrava:
+    def __init__(self, activities=(), limit15=100, limit_day=1000, retry_after=None):
+        self.activities = {a['id']: a for a in activities}
+        self.limit15, self.limit_day = limit15, limit_day
+        self.usage15 = self.usage_day = 0
+        self.retry_after = retry_after  # None: geen Retry-After header, zoals Strava zelf
+        self.force_429 = 0              # zoveel volgende calls weigeren, los van de limiet
+        self.truncated = set()          # id's waarvan de detail-response halverwege afbreekt
+        self.calls = []                 # pad met query string, in volgorde van binnenkomst
+        self.lock = threading.Lock()
+        self.server = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                if self.path.startswith('/oauth/token'): return self.send(200, {'access_token': 'stub'})
+                self.send(404, {})
+
+            def do_GET(self):
+                code, body, headers = stub.handle(self.path)
+                self.send(code, body, headers)
+
+            def send(self, code, body, headers=None):
+                data = body if isinstance(body, bytes) else json.dumps(body).encode()
+                self.send_response(code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for k, v in (headers or {}).items(): self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def rate_headers(self):
+        return {'X-RateLimit-Limit': f"{self.limit15},{self.limit_day}", 'X-RateLimit-Usage': f"{self.usage15},{self.usage_day}"}
+
+    def handle(self, path):
+        u = urlparse(path)
+        with self.lock:
+            self.calls.append(path)
+            if self.force_429 or self.usage15 >= self.limit15 or self.usage_day >= self.limit_day:
+                self.force_429 = max(self.force_429 - 1, 0)
+                headers = self.rate_headers()
+                if self.retry_after is not None: headers['Retry-After'] = str(self.retry_after)
+                return 429, {'message': 'Rate Limit Exceeded'}, headers
+            self.usage15 += 1; self.usage_day += 1
+            headers = self.rate_headers()
+
+        parts = u.path.strip('/').split('/')
+        if u.path == '/api/v3/athlete/activities':
+            q = parse_qs(u.query)
+            per_page, page = int(q.get('per_page', ['30'])[0]), int(q.get('page', ['1'])[0])
+            after, before = (int(q[k][0]) if k in q else None for k in ('after', 'before'))
+            acts = [a for a in self.activities.values() if (after is None or epoch(a) > after) and (before is None or epoch(a) < before)]
+            acts.sort(key=epoch, reverse=after is None)
+            return 200, acts[(page - 1) * per_page:page * per_page], headers
+        if parts[:3] == ['api', 'v3', 'activities'] and len(parts) in (4, 5):
+            act_id = int(parts[3])
+            if act_id not in self.activities: return 404, {'message': 'Record Not Found'}, headers
+            if len(parts) == 5:
+                return (200, streams(self.activities[act_id]), headers) if parts[4] == 'streams' else (404, {}, headers)
+            body = json.dumps(self.activities[act_id]).encode()
+            return 200, body[:len(body) // 2] if act_id in self.truncated else body, headers
+        return 404, {}, headers
+
+def epoch(a):
+    return int(datetime.strptime(a['start_date'], '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=timezone.utc).timestamp())
+
+def streams(a):
+    # Elke 10 s een sample, hartslag en vermogen vast: genoeg om zonetijd en beste prestaties te kunnen rekenen
+    n = a['moving_time'] // 10 + 1
+    data = {'time': [10 * i for i in range(n)], 'heartrate': [140] * n, 'watts': [200] * n, 'velocity_smooth': [a['average_speed']] * n}
+    return {k: {'data': v, 'series_type': 'time'} for k, v in data.items()}
+
+def make_activities(n, first_id=1000, start='2024-01-01', hours=24):
+    # Om de 'hours' uur een rit, oplopend in id en tijd
+    t0 = datetime.fromisoformat(start)
+    stamp = lambda i: (t0 + timedelta(hours=hours * i)).strftime('%Y-%m-%dT%H:%M:%SZ')
+    return [{'id': first_id + i, 'name': f"Rit {i}", 'type': 'Ride', 'start_date': stamp(i), 'start_date_local': stamp(i),
+             'distance': 20000.0, 'moving_time': 3600, 'average_speed': 5.5, 'calories': 600.0} for i in range(n)]
@@ -0,0 +1,26 @@
+import pandas as pd
+
+from activity_store import parse_dates, categorize
+
+# --- DATUMS ---
+def test_parse_dates_handles_every_export_format():
+    s = pd.Series(['2024-03-13 14:54:58', '13 mrt 2026', '13 mrt. 2026, 14:54:58', '2024-03-13T14:54:58Z', '2024-03-13 14:54', '', None, 'geen datum'])
+    out, bad = parse_dates(s)
+    assert out[0] == pd.Timestamp('2024-03-13 14:54:58')
+    # Nederlandse export: de dag zelf, vast om 12:00
+    assert out[1] == out[2] == pd.Timestamp('2026-03-13 12:00')
+    assert out[3] == pd.Timestamp('2024-03-13 14:54:58') and out[4] == pd.Timestamp('2024-03-13 14:54')
+    # Leeg is geen fout, onleesbaar wel
+    assert out[5:].isna().all() and bad.tolist() == [False] * 7 + [True]
+
+# --- CATEGORIEËN ---
+def test_categorize_by_type_then_name():
+    types = pd.Series(['Fietsrit', 'Training', 'Wandelen', 'Yoga', 'Yoga', 'Virtuele fietsrit'])
+    names = pd.Series(['Ochtendrit', 'Padel', 'Boswandeling', 'Avondrit', 'Training', 'Zwift'])
+    assert categorize(types, names).tolist() == ['Mountainbike', 'Padel', 'Wandelen', 'Mountainbike', 'Padel', 'Mountainbike']
+
+def test_categorize_priority_and_default():
+    # 'train' in de naam (prioriteit 1) wint van een fietstype (prioriteit 2); niets herkend is Overig
+    c = categorize(pd.Series(['Ride', 'Zwemmen'], index=[5, 9]), pd.Series(['Trainingsrit', 'Baantjes'], index=[5, 9]))
+    assert c.tolist() == ['Padel', 'Overig'] and list(c.index) == [5, 9]
+    assert list(c.cat.categories) == ['Mountainbike', 'Padel', 'Wandelen', 'Overig']
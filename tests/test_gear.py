@@ -0,0 +1,61 @@
+from types import SimpleNamespace
+
+import pandas as pd
+
+from gear import resolve_gear, update_odometer
+
+def rides(*rows):
+    return pd.DataFrame(rows, columns=['Gear', 'Datum', 'Categorie']).assign(Datum=lambda d: pd.to_datetime(d['Datum']))
+
+# --- REGELS ---
+RULES = [
+    {'gear': 'merida', 'set': 'Trek E-MTB'},
+    {'categorie': 'Mountainbike', 'vanaf': '2022-09-01', 'tot': '2023-01-01', 'set': 'Leenfiets'},
+]
+
+def test_later_rules_see_earlier_results():
+    df = rides(('Merida Big Nine', '2022-08-31 23:59', 'Mountainbike'), ('Merida Big Nine', '2022-09-01 00:00', 'Mountainbike'),
+               ('', '2022-12-31 10:00', 'Mountainbike'), ('', '2023-01-01 00:00', 'Mountainbike'), ('', '2022-10-01 10:00', 'Padel'))
+    # 'vanaf' inclusief, 'tot' exclusief
+    assert resolve_gear(df, RULES).tolist() == ['Trek E-MTB', 'Leenfiets', 'Leenfiets', '', '']
+
+def test_first_match_stops_at_the_first_rule():
+    df = rides(('Merida Big Nine', '2022-10-01', 'Mountainbike'))
+    assert resolve_gear(df, RULES, first_match=True).tolist() == ['Trek E-MTB']
+    assert resolve_gear(df, RULES).tolist() == ['Leenfiets']
+
+def test_no_rules_keeps_the_gear():
+    df = rides(('Canyon', '2024-01-01', 'Mountainbike'))
+    assert resolve_gear(df, []).tolist() == ['Canyon']
+
+# --- KILOMETERTELLER ---
+def cube(*rows):
+    c = pd.DataFrame(rows, columns=['Gear', 'Jaar', 'Day', 'Categorie', 'n', 'km', 'sec'])
+    return SimpleNamespace(cube=c.assign(Categorie=pd.Categorical(c['Categorie'], categories=['Mountainbike', 'Padel', 'Wandelen', 'Overig'])))
+
+BASE = [('Trek', 2023, 10, 'Mountainbike', 1, 30.0, 3600.0), ('Trek', 2024, 5, 'Mountainbike', 2, 50.0, 7200.0),
+        ('Schoenen', 2024, 6, 'Wandelen', 1, 8.0, 5400.0), ('', 2024, 7, 'Padel', 1, 0.0, 3600.0)]
+
+def test_odometer_accumulates_per_year(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    t = update_odometer(cube(*BASE)).table.set_index(['Gear', 'Jaar'])
+    assert t.loc[('Trek', 2024), 'km_tot'] == 80 and t.loc[('Trek', 2024), 'laatst'] == 2024005
+    # Zonder materiaal telt niet mee
+    assert sorted(set(t.index.get_level_values('Gear'))) == ['Schoenen', 'Trek']
+
+def test_odometer_only_recounts_touched_gear(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    update_odometer(cube(*BASE))
+    before = pd.read_csv('gear_odometer.csv', keep_default_na=False, dtype={'digest': str})
+    capsys.readouterr()
+    # Eén wandeling erbij: alleen de schoenen opnieuw
+    t = update_odometer(cube(*BASE, ('Schoenen', 2024, 9, 'Wandelen', 1, 4.0, 2700.0))).table
+    assert '1 van 2 materiaal bijgewerkt' in capsys.readouterr().out
+    assert t[t['Gear'] == 'Schoenen']['km_tot'].tolist() == [12]
+    pd.testing.assert_frame_equal(t[t['Gear'] == 'Trek'].reset_index(drop=True), before[before['Gear'] == 'Trek'].reset_index(drop=True), check_dtype=False)
+    # Niets veranderd: niets opnieuw; een verdwenen jaar telt wel als wijziging
+    walk = ('Schoenen', 2024, 9, 'Wandelen', 1, 4.0, 2700.0)
+    update_odometer(cube(*BASE, walk))
+    assert '0 van 2' in capsys.readouterr().out
+    t = update_odometer(cube(*BASE[1:], walk)).table
+    assert '1 van 2' in capsys.readouterr().out and t[t['Gear'] == 'Trek']['Jaar'].tolist() == [2024]
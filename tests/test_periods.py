@@ -0,0 +1,47 @@
+import pandas as pd
+
+from periods import PrefixSums, rolling, year_window, last_year, previous, month_to_date
+
+T = pd.Timestamp
+
+def sums():
+    # Drie dagen met ritten: 30 dec 2023, 1 jan en 3 jan 2024
+    cube = pd.DataFrame({'Jaar': [2023, 2024, 2024, 2024], 'Day': [364, 1, 3, 3],
+                         'Categorie': ['Mountainbike', 'Mountainbike', 'Padel', 'Mountainbike'],
+                         'n': [1, 1, 1, 1], 'km': [10.0, 20.0, 0.0, 5.5]})
+    return PrefixSums(cube, ['n', 'km'])
+
+# --- VENSTERS OP DE PREFIX SUMS ---
+def test_window_is_inclusive_on_both_ends():
+    p = sums()
+    assert p.totals(T('2024-01-01'), T('2024-01-03')).tolist() == [3, 25.5]
+    assert p.totals(T('2024-01-02'), T('2024-01-02')).tolist() == [0, 0]
+
+def test_window_is_clipped_to_the_data():
+    p = sums()
+    # Ver voor de eerste en ver na de laatste dag: alles
+    assert p.totals(T('2000-01-01'), T('2030-12-31')).tolist() == [4, 35.5]
+    # Helemaal ervoor of erna: niets
+    assert p.totals(T('2000-01-01'), T('2023-12-29')).tolist() == [0, 0]
+    assert p.totals(T('2024-01-04'), T('2030-01-01')).tolist() == [0, 0]
+    # Eind voor begin: leeg, geen negatieve totalen
+    assert p.totals(T('2024-01-03'), T('2024-01-01')).tolist() == [0, 0]
+
+def test_by_cat_drops_empty_categories():
+    t = sums().by_cat(T('2023-12-30'), T('2024-01-01'))
+    assert list(t.index) == ['Mountainbike'] and t.loc['Mountainbike', 'km'] == 30
+
+def test_empty_cube():
+    p = PrefixSums(pd.DataFrame({'Jaar': [], 'Day': [], 'Categorie': [], 'n': [], 'km': []}), ['n', 'km'])
+    assert p.totals(T('2024-01-01'), T('2024-12-31')).tolist() == [0, 0]
+
+# --- PERIODES ---
+def test_period_helpers():
+    today = T('2024-03-15')
+    assert rolling(7, today) == (T('2024-03-09'), today)
+    assert previous(rolling(7, today)) == (T('2024-03-02'), T('2024-03-08'))
+    assert month_to_date(today) == (T('2024-03-01'), today)
+    assert year_window(2024, 75) == (T('2024-01-01'), T('2024-03-15'))
+    assert year_window(2023, 400) == (T('2023-01-01'), T('2023-12-31'))
+    # 29 februari valt terug op 28 februari
+    assert last_year((T('2024-02-01'), T('2024-02-29'))) == (T('2023-02-01'), T('2023-02-28'))
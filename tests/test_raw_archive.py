@@ -0,0 +1,52 @@
+import os
+
+import pytest
+
+import raw_archive
+from raw_archive import append, replay, compact, segment_paths, SUMMARY, DETAIL, DELETED
+
+@pytest.fixture(autouse=True)
+def archive(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+def act(i, name):
+    return {'id': i, 'name': name}
+
+def history():
+    append([(SUMMARY, 1, act(1, 'a')), (SUMMARY, 2, act(2, 'b')), (SUMMARY, 3, act(3, 'c'))])
+    append([(DETAIL, 1, act(1, 'a2')), (DELETED, 2, None)])
+    append([(DELETED, 3, None)])
+    append([(SUMMARY, 3, act(3, 'c terug'))])  # weer zichtbaar (privé -> publiek)
+
+# --- REPLAY ---
+def test_replay_keeps_the_last_record_per_id():
+    history()
+    summary, detail, deleted = replay()
+    assert {i: r['data']['name'] for i, r in summary.items()} == {1: 'a2', 3: 'c terug'}
+    assert list(detail) == [1] and list(deleted) == [2]
+
+def test_replay_skips_unreadable_segments():
+    history()
+    with open(os.path.join(raw_archive.ARCHIVE_DIR, '99999999999999999999.jsonl.gz'), 'wb') as f: f.write(b'geen gzip')
+    assert set(replay()[0]) == {1, 3}
+
+def test_segments_sort_in_write_order():
+    paths = [append([(SUMMARY, i, act(i, str(i)))]) for i in range(20)]
+    assert segment_paths() == paths
+
+# --- COMPACT ---
+def test_compact_gives_the_same_replay():
+    history()
+    before = replay()
+    assert compact() == 4
+    assert len(segment_paths()) == 1
+    after = replay()
+    for b, a in zip(before, after):
+        assert {i: r['data'] for i, r in b.items()} == {i: r['data'] for i, r in a.items()}
+    # Na compactie komen nieuwe segmenten er gewoon achter
+    append([(DELETED, 1, None)])
+    assert set(replay()[0]) == {3}
+
+def test_compact_needs_two_segments():
+    append([(SUMMARY, 1, act(1, 'a'))])
+    assert compact() == 0 and len(segment_paths()) == 1
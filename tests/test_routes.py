@@ -0,0 +1,41 @@
+import numpy as np
+
+import routes
+from routes import decode_polylines, privacy_mask, parse_privacy_zones, to_pixels
+
+# Voorbeeld uit de documentatie van het Google polyline formaat
+GOOGLE = '_p~iF~ps|U_ulLnnqC_mqNvxq`@'
+GOOGLE_POINTS = [[38.5, -120.2], [40.7, -120.95], [43.252, -126.453]]
+
+# --- POLYLINES ---
+def test_decode_the_reference_polyline():
+    (pts,) = decode_polylines([GOOGLE])
+    np.testing.assert_allclose(pts, GOOGLE_POINTS)
+
+def test_decode_many_at_once_keeps_lines_apart():
+    # Elke lijn begint weer bij 0,0: geen cumsum over de grens van twee lijnen heen
+    out = decode_polylines([GOOGLE, '', None, GOOGLE[:10]])
+    np.testing.assert_allclose(out[0], GOOGLE_POINTS)
+    assert out[1].shape == out[2].shape == (0, 2)
+    np.testing.assert_allclose(out[3], GOOGLE_POINTS[:1])
+
+def test_decode_only_empty():
+    assert [p.shape for p in decode_polylines(['', None])] == [(0, 2), (0, 2)]
+
+# --- PRIVACY ---
+def test_parse_privacy_zones():
+    assert parse_privacy_zones(None) is None and parse_privacy_zones(' ') is None
+    assert parse_privacy_zones('geen') == []
+    assert parse_privacy_zones('51.05,3.72,500; 50.8,4.3,200') == [(51.05, 3.72, 500.0), (50.8, 4.3, 200.0)]
+
+def test_privacy_mask_drops_cells_inside_the_radius(monkeypatch):
+    monkeypatch.setattr(routes, 'ROUTE_PRIVACY_ZONES', [(51.05, 3.72, 500)])
+    # ~300 m en ~800 m ten oosten van het middelpunt (1° lengte is daar ~70 km)
+    x, y = to_pixels(np.array([[51.05, 3.72], [51.05, 3.7243], [51.05, 3.7315]]))
+    assert privacy_mask(x, y).tolist() == [False, False, True]
+
+def test_privacy_mask_without_zones_keeps_everything(monkeypatch):
+    x, y = to_pixels(np.array([[51.05, 3.72]]))
+    for zones in (None, []):
+        monkeypatch.setattr(routes, 'ROUTE_PRIVACY_ZONES', zones)
+        assert privacy_mask(x, y).tolist() == [True]
@@ -0,0 +1,97 @@
+import time
+
+import pytest
+
+from strava_fetcher import StravaFetcher, TokenBucket, RateLimitStop, WINDOW_SEC
+from stub_strava import StubStrava, make_activities
+
+@pytest.fixture
+def stub():
+    s = StubStrava(make_activities(60)).start()
+    yield s
+    s.stop()
+
+def detail(fetcher, act_id, base=None):
+    return fetcher.get(f"{base}/api/v3/activities/{act_id}").json()
+
+def fetch_all(fetcher, stub, **kw):
+    batches = []
+    results = fetcher.fetch_many(sorted(stub.activities), lambda f, i: detail(f, i, stub.url), on_checkpoint=lambda rows: batches.append(len(rows)), **kw)
+    return results, batches
+
+# --- TOKEN BUCKET ---
+def test_bucket_refills_at_the_window_rate():
+    bucket = TokenBucket(limit=90, reserve=0)
+    bucket.tokens, bucket.stamp = 0.0, time.monotonic() - 100  # 100 s bij 90 calls per kwartier = 10 tokens
+    bucket.acquire(max_wait=0)
+    assert 8.9 < bucket.tokens < 9.1
+
+def test_bucket_never_exceeds_capacity():
+    bucket = TokenBucket(limit=100, reserve=5)
+    bucket.tokens, bucket.stamp = 0.0, time.monotonic() - 10 * WINDOW_SEC
+    bucket.acquire(max_wait=0)
+    assert bucket.tokens == bucket.capacity - 1 == 94
+
+def test_headers_cap_the_bucket(stub):
+    stub.limit15, stub.usage15 = 20, 10
+    fetcher = StravaFetcher('tok', max_wait=0)
+    fetcher.get(f"{stub.url}/api/v3/activities/1000")
+    # 20 - 11 gebruikt - 5 reserve
+    assert fetcher.bucket.tokens <= 4 and fetcher.bucket.capacity == 15
+
+# --- 429 EN LIMIETEN ---
+def test_resumes_after_429_with_retry_after(stub):
+    stub.force_429, stub.retry_after = 1, 1
+    fetcher = StravaFetcher('tok', max_wait=5)
+    t = time.monotonic()
+    r = fetcher.get(f"{stub.url}/api/v3/activities/1000")
+    assert r.status_code == 200 and r.json()['id'] == 1000
+    assert len(stub.calls) == 2 and time.monotonic() - t >= 0.9
+
+def test_stops_when_retry_after_exceeds_max_wait(stub):
+    stub.force_429, stub.retry_after = 1, 600
+    fetcher = StravaFetcher('tok', max_wait=5)
+    with pytest.raises(RateLimitStop):
+        fetcher.get(f"{stub.url}/api/v3/activities/1000")
+    assert fetcher.stopped.is_set()
+    # Eén keer gestopt is gestopt: geen calls meer
+    with pytest.raises(RateLimitStop):
+        fetcher.get(f"{stub.url}/api/v3/activities/1001")
+    assert len(stub.calls) == 1
+
+def test_stops_before_the_window_budget_runs_out(stub):
+    stub.limit15, stub.usage15 = 20, 14
+    fetcher = StravaFetcher('tok', max_wait=5)
+    fetcher.get(f"{stub.url}/api/v3/activities/1000")  # 15 van 20 gebruikt, 5 in reserve
+    with pytest.raises(RateLimitStop):
+        fetcher.get(f"{stub.url}/api/v3/activities/1001")
+    assert len(stub.calls) == 1
+
+def test_stops_at_the_daily_limit(stub):
+    stub.limit_day, stub.usage_day = 10, 4
+    fetcher = StravaFetcher('tok', max_wait=5)
+    fetcher.get(f"{stub.url}/api/v3/activities/1000")
+    with pytest.raises(RateLimitStop, match='daglimiet'):
+        fetcher.get(f"{stub.url}/api/v3/activities/1001")
+
+# --- FETCH_MANY ---
+def test_fetch_many_checkpoints_in_batches(stub):
+    results, batches = fetch_all(StravaFetcher('tok', workers=4), stub, checkpoint_every=25)
+    assert sorted(r['id'] for r in results) == sorted(stub.activities)
+    assert batches == [25, 25, 10]
+
+def test_fetch_many_keeps_results_when_the_budget_runs_out(stub):
+    stub.limit15 = 35  # 30 calls tot de reserve, daarna pas weer een token na ~26 s (> max_wait)
+    results, batches = fetch_all(StravaFetcher('tok', workers=4, max_wait=1), stub, checkpoint_every=25)
+    # Vier workers tegelijk kunnen net voor de eerste headers een paar calls extra doen; alles wat binnen is, is bewaard
+    assert 30 <= len(results) < 35 and batches[0] == 25 and sum(batches) == len(results)
+
+def test_fetch_many_skips_broken_items(stub):
+    # Afgekapte body (JSONDecodeError) en een ontbrekend veld (KeyError in fn)
+    stub.truncated = {1003}
+    del stub.activities[1042]['calories']
+    batches = []
+    fn = lambda f, i: {'id': i, 'calories': detail(f, i, stub.url)['calories']}
+    results = StravaFetcher('tok', workers=4).fetch_many(sorted(stub.activities), fn, on_checkpoint=lambda rows: batches.append(len(rows)), checkpoint_every=25)
+    assert len(results) == 58 and sum(batches) == 58
+    assert not {1003, 1042} & {r['id'] for r in results}
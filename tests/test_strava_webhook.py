@@ -0,0 +1,56 @@
+import pytest
+
+import strava_webhook as wh
+from strava_webhook import coalesce, EventQueue
+
+def ev(i, aspect, t, **kw):
+    return {'object_type': 'activity', 'object_id': i, 'aspect_type': aspect, 'event_time': t, 'owner_id': 7, **kw}
+
+# --- COALESCE ---
+def test_create_then_delete_costs_no_call():
+    upsert, delete, deauth = coalesce([ev(1, 'create', 10), ev(1, 'update', 11), ev(1, 'delete', 12), ev(2, 'update', 13)])
+    assert upsert == {2} and delete == {1} and not deauth
+
+def test_coalesce_orders_by_event_time():
+    # Strava garandeert de volgorde niet: de delete van t=5 komt na de create van t=9 binnen
+    assert coalesce([ev(1, 'create', 9), ev(1, 'delete', 5)])[:2] == ({1}, set())
+
+def test_coalesce_filters_other_athletes_and_sees_deauth(monkeypatch):
+    monkeypatch.setattr(wh, 'ATHLETE_ID', '7')
+    deauth = {'object_type': 'athlete', 'object_id': 7, 'aspect_type': 'update', 'updates': {'authorized': 'false'}, 'owner_id': 7}
+    upsert, delete, revoked = coalesce([ev(1, 'create', 1), ev(2, 'create', 2, owner_id=8), deauth])
+    assert upsert == {1} and revoked
+
+# --- WACHTRIJ ---
+@pytest.fixture
+def queue(tmp_path):
+    return EventQueue(path=str(tmp_path / 'queue.jsonl'), debounce=60, max_delay=300)
+
+def test_queue_debounces_with_a_maximum_delay(queue):
+    queue.push(ev(1, 'create', 1))
+    t0 = queue.first
+    assert not queue.due(t0 + 30) and queue.due(t0 + 61)
+    # Een constante stroom events schuift de build niet eindeloos op
+    queue.last = t0 + 290
+    assert not queue.due(t0 + 299) and queue.due(t0 + 300)
+
+def test_done_keeps_new_events_and_requeues_failures_with_their_aspect(queue):
+    queue.push(ev(1, 'create', 1)); queue.push(ev(2, 'delete', 2))
+    events = queue.pending()
+    queue.push(ev(3, 'update', 3))  # binnen tijdens het verwerken
+    queue.done(len(events), retry=[1], retry_delete=[2])
+    rest = queue.pending()
+    assert [(e['object_id'], e['aspect_type']) for e in rest] == [(3, 'update'), (1, 'update'), (2, 'delete')]
+    # Mislukte id's pas na RETRY_SEC opnieuw
+    assert not queue.due(queue.first + wh.DEBOUNCE_SEC + 1)
+    # Een nieuwe EventQueue op hetzelfde bestand (herstart) verliest niets
+    assert EventQueue(path=queue.path).pending() == rest
+
+def test_process_batch_retries_deletes_as_deletes(queue, monkeypatch):
+    def fail(upsert, delete): raise RuntimeError('netwerk weg')
+    monkeypatch.setattr(wh.ua, 'apply_changes', fail)
+    monkeypatch.setattr(wh.ua, 'still_deauthorized', lambda: False)
+    monkeypatch.setattr(wh, 'rebuild_dashboard', lambda incremental: pytest.fail('niets gelukt, niets te herbouwen'))
+    queue.push(ev(1, 'create', 1)); queue.push(ev(2, 'delete', 2))
+    wh.process_batch(queue, incremental=True)
+    assert coalesce(queue.pending())[:2] == ({1}, {2})
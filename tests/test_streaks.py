@@ -0,0 +1,39 @@
+import pandas as pd
+
+from streaks import streak_runs, compute_streaks
+
+def dates(*ds):
+    return pd.Series(pd.to_datetime(list(ds)))
+
+# --- ISO WEKEN ---
+def test_week_runs_follow_iso_weeks():
+    # Zondag en de maandag erna zijn twee weken op rij; maandag t/m zondag is één week
+    runs = streak_runs(dates('2024-01-01', '2024-01-07', '2024-01-08', '2024-01-22'), 'week')
+    assert runs['lengte'].tolist() == [2, 1]
+    assert compute_streaks(dates('2024-01-01', '2024-01-07'), 'week', today='2024-01-07')['current'] == 1
+
+def test_week_streak_across_the_year_boundary():
+    # 2020-12-31 (week 53) en 2021-01-04 (week 1 van 2021) sluiten aan
+    r = compute_streaks(dates('2020-12-31', '2021-01-04'), 'week', today='2021-01-10')
+    assert r['longest'] == 2 and r['longest_start'] == pd.Timestamp('2020-12-28') and r['longest_end'] == pd.Timestamp('2021-01-10')
+
+def test_current_streak_allows_the_previous_period():
+    d = dates('2024-03-01', '2024-03-02', '2024-03-03')
+    assert compute_streaks(d, 'day', today='2024-03-04')['current'] == 3
+    assert compute_streaks(d, 'day', today='2024-03-05')['current'] == 0
+
+def test_month_runs():
+    r = compute_streaks(dates('2023-11-30', '2023-12-01', '2024-01-15', '2024-03-01'), 'month', today='2024-03-10')
+    assert r['longest'] == 3 and r['current'] == 1 and r['longest_end'] == pd.Timestamp('2024-01-31')
+
+# --- GROEPEN ---
+def test_groups_do_not_join_runs():
+    d = dates('2024-01-01', '2024-01-02', '2024-01-03', '2024-01-04')
+    g = pd.Series(['Padel', 'Wandelen', 'Padel', 'Padel'])
+    r = compute_streaks(d, 'day', groups=g, today='2024-01-04')
+    assert (r['Padel']['longest'], r['Padel']['current']) == (2, 2)
+    assert (r['Wandelen']['longest'], r['Wandelen']['current']) == (1, 0)
+
+def test_missing_dates_and_empty_input():
+    assert streak_runs(pd.Series([pd.NaT, pd.Timestamp('2024-01-01')]), 'day')['lengte'].tolist() == [1]
+    assert compute_streaks(pd.Series([], dtype='datetime64[ns]'), 'week')['longest'] == 0
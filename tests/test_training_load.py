@@ -0,0 +1,30 @@
+import numpy as np
+
+from training_load import ewma
+
+def naive(u, x0, days):
+    out, x = [], x0
+    for v in u:
+        x = (1 - 1 / days) * x + v / days
+        out.append(x)
+    return np.array(out)
+
+# --- EWMA ---
+def test_ewma_matches_the_recursion():
+    u = np.random.default_rng(1).uniform(0, 200, 1000)
+    for days in (7, 42):
+        np.testing.assert_allclose(ewma(u, 0.0, days), naive(u, 0.0, days), rtol=1e-9)
+
+def test_ewma_blocks_carry_the_state():
+    # Een blok per 10 dagen moet hetzelfde geven als één blok
+    u = np.random.default_rng(2).uniform(0, 200, 95)
+    np.testing.assert_allclose(ewma(u, 55.0, 42, block=10), ewma(u, 55.0, 42, block=1000), rtol=1e-12)
+    np.testing.assert_allclose(ewma(u, 55.0, 42, block=10), naive(u, 55.0, 42), rtol=1e-9)
+
+def test_ewma_long_rest_decays_without_overflow():
+    # Jaren zonder training: geen inf/nan door a^-t, gewoon uitdoven
+    out = ewma(np.zeros(3650), 100.0, 7)
+    assert np.isfinite(out).all() and out[-1] < 1e-6 and np.isclose(out[0], 100.0 * 6 / 7)
+
+def test_ewma_empty():
+    assert len(ewma([], 10.0, 42)) == 0
@@ -0,0 +1,96 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+import update_activities as ua
+from stub_strava import StubStrava, make_activities
+
+# Drie jaar ritten, om de 4 weken: elk jaar een eigen backfill-venster, en alles binnen één kwartier aan calls
+HISTORY = dict(start='2022-01-01', hours=24 * 28)
+
+@pytest.fixture
+def stub(tmp_path, monkeypatch):
+    s = StubStrava(make_activities(40, **HISTORY), limit15=10_000, limit_day=100_000).start()
+    monkeypatch.chdir(tmp_path)
+    for name, path in [('AUTH_URL', '/oauth/token'), ('ACTIVITIES_URL', '/api/v3/athlete/activities'), ('ACTIVITY_DETAIL_URL', '/api/v3/activities')]:
+        monkeypatch.setattr(ua, name, s.url + path)
+    monkeypatch.setattr(ua, 'DASHBOARD_URL', '')
+    monkeypatch.setattr(ua, 'MAX_RATE_WAIT', 0)
+    yield s
+    s.stop()
+
+def csv():
+    return pd.read_csv(ua.ACTIVITIES_CSV)
+
+def list_calls(stub):
+    return [c for c in stub.calls if c.startswith('/api/v3/athlete/activities')]
+
+def detail_calls(stub):
+    return {int(c.split('/')[4].split('?')[0]) for c in stub.calls if c.startswith('/api/v3/activities/') and '/streams' not in c}
+
+def add_activity(stub, **kw):
+    a = {**make_activities(1, first_id=max(stub.activities) + 1, start='2025-01-01')[0], **kw}
+    stub.activities[a['id']] = a
+    return a
+
+# --- VOLLEDIGE EN INCREMENTELE SYNC ---
+def test_full_sync_backfills_per_year_window(stub):
+    ua.process_data()
+    df = csv()
+    assert sorted(df[ua.ID_COL]) == sorted(stub.activities)
+    assert detail_calls(stub) == set(stub.activities)
+    # Eén call om het eerste jaar te vinden, dan één pagina per jaar t/m volgend jaar
+    windows = [c for c in list_calls(stub) if 'before=' in c]
+    assert len(list_calls(stub)) == len(windows) + 1 and len(windows) == pd.Timestamp.now().year + 2 - 2022
+    state = json.load(open(ua.SYNC_STATE_FILE))
+    assert state['last_id'] == max(stub.activities)
+    assert not os.path.exists(ua.BACKFILL_DIR)
+
+def test_incremental_sync_is_one_list_call(stub):
+    ua.process_data()
+    new = add_activity(stub)
+    stub.calls.clear()
+    ua.process_data()
+    assert len(list_calls(stub)) == 1 and 'after=' in list_calls(stub)[0]
+    # Alleen de nieuwe rit heeft details en streams nodig
+    assert detail_calls(stub) == {new['id']}
+    assert [c for c in stub.calls if '/streams' in c] == [f"/api/v3/activities/{new['id']}/streams?keys=time%2Cheartrate%2Cwatts%2Cvelocity_smooth&key_by_type=true"]
+    assert len(csv()) == len(stub.activities)
+
+def test_incremental_sync_merges_by_id(stub):
+    ua.process_data()
+    # De nieuwste rit valt in de marge van 1 s en komt opnieuw mee: de nieuwe versie wint, zonder dubbele rij
+    newest = max(stub.activities)
+    stub.activities[newest]['name'] = 'Nieuwe naam'
+    ua.process_data()
+    df = csv()
+    assert df[ua.ID_COL].is_unique and len(df) == len(stub.activities)
+    assert df.loc[df[ua.ID_COL] == newest, 'Naam activiteit'].item() == 'Nieuwe naam'
+
+def test_backfill_resumes_with_the_missing_windows(stub, monkeypatch):
+    monkeypatch.setattr(ua, 'DETAIL_WORKERS', 1)
+    stub.limit15 = 8  # 5 in reserve: de eerste call en twee jaren, dan stopt de fetcher
+    ua.process_data()
+    assert not os.path.exists(ua.ACTIVITIES_CSV)
+    first = [c for c in list_calls(stub) if 'before=' in c]
+    assert 0 < len(first) < pd.Timestamp.now().year + 2 - 2022
+
+    stub.limit15, stub.usage15 = 10_000, 0
+    stub.calls.clear()
+    ua.process_data()
+    second = [c for c in list_calls(stub) if 'before=' in c]
+    # Geen nieuwe 'eerste jaar' call en geen venster twee keer
+    assert len(list_calls(stub)) == len(second) and not set(first) & set(second)
+    assert sorted(csv()[ua.ID_COL]) == sorted(stub.activities)
+
+# --- DETAIL CACHE ---
+def test_detail_cache_is_seeded_from_the_old_csv(stub):
+    # Oude CSV met calorieën voor de eerste 30 ritten, nog zonder activity_details.csv
+    ids = sorted(stub.activities)
+    pd.DataFrame({ua.ID_COL: ids, 'Datum van activiteit': '', 'Calorieën': [500.0 if i < ids[30] else 0 for i in ids]}).to_csv(ua.ACTIVITIES_CSV, index=False)
+    ua.process_data()
+    assert detail_calls(stub) == set(ids[30:])
+    details = pd.read_csv(ua.DETAIL_CACHE_CSV, index_col='id')
+    assert details.loc[ids[0], 'calories'] == 500 and details.loc[ids[-1], 'calories'] == 600
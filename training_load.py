@@ -0,0 +1,78 @@
+import pandas as pd
+import numpy as np
+import os
+
+# --- TRAININGSBELASTING (CTL / ATL / TSB) ---
+# Belasting per dag = minuten x zonegewicht (Edwards TRIMP); fitheid en vermoeidheid zijn exponentieel gewogen gemiddelden
+TRAINING_LOAD_CSV = 'training_load.csv'
+CTL_DAYS = 42
+ATL_DAYS = 7
+# Zonder hartslag: vermogen als fractie van FTP (intensity factor) naar dezelfde 5 zones
+IF_ZONES = [0.55, 0.75, 0.90, 1.05]
+FTP_FROM_20M = 0.95
+BLOCK_DAYS = 365  # a^-k blijft zo ruim binnen float64
+
+def activity_load(df, hr_zones, zone_sec=None, ftp=None):
+    # Per activiteit: echte tijd per zone uit de streams, anders gem. hartslag, anders gem. vermogen
+    minutes = df['Beweegtijd_sec'].astype('float64').fillna(0) / 60
+    bounds = list(hr_zones.values())[:-1]
+    hr = df['Hartslag'].astype('float64')
+    zone = pd.Series(np.where(hr > 0, np.searchsorted(bounds, hr.fillna(0), side='right') + 1, 0), index=df.index)
+    if ftp and 'Wattage' in df.columns:
+        w = df['Wattage'].astype('float64')
+        w_zone = np.where(w > 0, np.searchsorted(IF_ZONES, (w / ftp).fillna(0), side='right') + 1, 0)
+        zone = zone.where(zone > 0, w_zone)
+    load = minutes * zone
+
+    if zone_sec is not None and not zone_sec.empty:
+        weights = np.arange(1, zone_sec.shape[1] + 1)
+        stream_load = pd.Series(zone_sec.to_numpy() @ weights / 60, index=zone_sec.index)
+        per_id = df['ID'].astype('float64').map(stream_load)
+        load = per_id.where(per_id > 0, load)
+    return load.fillna(0)
+
+def daily_load(df, load, today=None):
+    today = pd.Timestamp.now().normalize() if today is None else pd.Timestamp(today).normalize()
+    per_day = load.groupby(df['Datum'].dt.normalize()).sum()
+    if per_day.empty: return pd.Series(dtype='float64')
+    days = pd.date_range(per_day.index.min(), max(today, per_day.index.max()), freq='D')
+    return per_day.reindex(days, fill_value=0.0).rename('load')
+
+def ewma(u, x0, days, block=BLOCK_DAYS):
+    # x_t = a*x_{t-1} + b*u_t opgelost als x_t = a^t * (x0 + b * sum(u_k / a^k)), per blok van een jaar
+    a, b = 1 - 1 / days, 1 / days
+    u = np.asarray(u, dtype=np.float64)
+    out = np.empty(len(u))
+    for s in range(0, len(u), block):
+        seg = u[s:s + block]
+        p = a ** np.arange(1, len(seg) + 1)
+        out[s:s + len(seg)] = p * (x0 + b * np.cumsum(seg / p))
+        x0 = out[s + len(seg) - 1]
+    return out
+
+def load_state():
+    if not os.path.exists(TRAINING_LOAD_CSV): return None
+    try:
+        return pd.read_csv(TRAINING_LOAD_CSV, index_col='datum', parse_dates=['datum'])
+    except Exception as e:
+        print(f"⚠️ {TRAINING_LOAD_CSV} onleesbaar ({e}), we rekenen opnieuw.")
+        return None
+
+def update_training_load(daily):
+    # Alleen vanaf de eerste dag waarvan de belasting veranderd is (of die nieuw is) opnieuw rekenen
+    prev = load_state()
+    start, ctl0, atl0 = 0, 0.0, 0.0
+    if prev is not None and len(prev) and len(daily) and prev.index[0] == daily.index[0]:
+        common = daily.index[:len(prev)].intersection(prev.index)
+        same = np.isclose(prev['load'].reindex(common).to_numpy(), daily.reindex(common).round(1).to_numpy())
+        start = int(np.argmin(same)) if not same.all() else len(common)
+        if start > 0: ctl0, atl0 = prev['ctl'].iloc[start - 1], prev['atl'].iloc[start - 1]
+    new = daily.iloc[start:]
+    part = pd.DataFrame({'load': new.round(1), 'ctl': ewma(new.to_numpy(), ctl0, CTL_DAYS), 'atl': ewma(new.to_numpy(), atl0, ATL_DAYS)}, index=new.index)
+    out = pd.concat([prev.iloc[:start], part]) if start > 0 else part
+    out['tsb'] = out['ctl'] - out['atl']
+    out = out.rename_axis('datum')
+    # Genoeg decimalen dat een volgende run vanaf de opgeslagen toestand op hetzelfde uitkomt als alles herrekenen
+    out.to_csv(TRAINING_LOAD_CSV, float_format='%.6f')
+    print(f"📈 Trainingsbelasting: {len(part)} van {len(out)} dagen (her)berekend.")
+    return out
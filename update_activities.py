@@ -1,26 +1,63 @@
 import requests
 import pandas as pd
 import os
-import time
+import json
+import argparse
+from datetime import datetime
+from strava_fetcher import StravaFetcher, RateLimitStop
+from activity_store import write_store, parse_dates, ACTIVITIES_CSV
+from streams_store import load_index as load_streams_index, append_streams, STREAM_KEYS
+from best_efforts import update_best_efforts
+from routes import load_route_index, append_routes, ROUTES_INDEX
+from gear import resolve_gear
+import raw_archive
+from raw_archive import SUMMARY, DETAIL, DELETED
 
 # --- CONFIGURATIE ---
 CLIENT_ID = os.environ.get('STRAVA_CLIENT_ID')
 CLIENT_SECRET = os.environ.get('STRAVA_CLIENT_SECRET')
 REFRESH_TOKEN = os.environ.get('STRAVA_REFRESH_TOKEN')
 
-AUTH_URL = "https://www.strava.com/oauth/token"
-ACTIVITIES_URL = "https://www.strava.com/api/v3/athlete/activities"
-ACTIVITY_DETAIL_URL = "https://www.strava.com/api/v3/activities"
+# Los in te stellen zodat we tegen een lokale stub-server kunnen testen
+API_URL = os.environ.get('STRAVA_API_URL', 'https://www.strava.com').rstrip('/')
+AUTH_URL = f"{API_URL}/oauth/token"
+ACTIVITIES_URL = f"{API_URL}/api/v3/athlete/activities"
+ACTIVITY_DETAIL_URL = f"{API_URL}/api/v3/activities"
+
+# Draait serve_dashboard.py, dan meteen laten herbouwen in plaats van op de volgende poll te wachten
+DASHBOARD_URL = os.environ.get('DASHBOARD_URL', '').rstrip('/')
+
+SYNC_STATE_FILE = 'sync_state.json'
+DETAIL_CACHE_CSV = 'activity_details.csv'
+ID_COL = 'Activiteits-ID'
+CSV_COLUMNS = [ID_COL, 'Datum van activiteit', 'Naam activiteit', 'Activiteitstype', 'Afstand', 'Hoogtemeters', 'Beweegtijd', 'Gemiddelde snelheid', 'Gemiddelde hartslag', 'Gemiddeld wattage', 'Uitrusting voor activiteit', 'Calorieën']
+ROUTE_COL = 'polyline'  # alleen tijdens de sync; gaat naar routes/, niet naar de CSV
+
+# Velden die alleen /activities/{id} geeft; per activiteit één keer ophalen
+DETAIL_FIELDS = ['calories', 'device_name', 'description']
+DETAIL_WORKERS = 4
+PER_PAGE = 200  # maximum van /athlete/activities
+# Langer wachten op een nieuw rate-limit kwartier heeft in een cron run geen zin; de volgende run gaat verder
+MAX_RATE_WAIT = int(os.environ.get('STRAVA_MAX_RATE_WAIT', 120))
 
 # --- ZELF GEDEFINIEERDE UITRUSTING (SCHOENEN) ---
 MANUAL_GEAR_MAP = {}
 
-def get_access_token():
+# Materiaal dat Strava niet kent, per sport en periode ('vanaf' inclusief, 'tot' exclusief, ISO datums); de eerste regel die past wint
+SYNC_GEAR_RULES = [
+    {'type': ['Fietsrit', 'Virtuele fietsrit'], 'tot': '2025-05-09', 'set': 'Proracer'},
+    {'type': ['Fietsrit', 'Virtuele fietsrit'], 'vanaf': '2025-05-09', 'set': 'Merida Scultura 5000'},
+]
+
+def request_token():
     payload = {'client_id': CLIENT_ID, 'client_secret': CLIENT_SECRET, 'refresh_token': REFRESH_TOKEN, 'grant_type': 'refresh_token', 'f': 'json'}
+    res = requests.post(AUTH_URL, data=payload, verify=False)
+    res.raise_for_status()
+    return res.json()['access_token']
+
+def get_access_token():
     try:
-        res = requests.post(AUTH_URL, data=payload, verify=False)
-        res.raise_for_status()
-        return res.json()['access_token']
+        return request_token()
     except Exception as e:
         print(f"❌ Fout bij token: {e}")
         exit(1)
@@ -29,107 +66,431 @@ def translate_type(strava_type):
     mapping = {'Run': 'Hardlopen', 'Ride': 'Fietsrit', 'VirtualRide': 'Virtuele fietsrit', 'Walk': 'Wandelen', 'Swim': 'Zwemmen', 'WeightTraining': 'Krachttraining', 'Workout': 'Training', 'Hike': 'Wandelen', 'GravelRide': 'Fietsrit', 'MountainBikeRide': 'Fietsrit', 'E-BikeRide': 'Fietsrit', 'Velomobile': 'Fietsrit'}
     return mapping.get(strava_type, strava_type)
 
-def process_data():
-    token = get_access_token()
-    headers = {'Authorization': f"Bearer {token}"}
-    
-    existing_cals = {}
-    if os.path.exists('activities.csv'):
-        try:
-            df_old = pd.read_csv('activities.csv')
-            if 'Calorieën' in df_old.columns and 'Datum van activiteit' in df_old.columns:
-                for _, row in df_old.iterrows():
-                    if pd.notna(row['Calorieën']) and float(row['Calorieën']) > 0:
-                        existing_cals[str(row['Datum van activiteit'])] = float(row['Calorieën'])
-        except:
-            print("Geen oude cache kunnen laden.")
+# --- SYNC STATUS (cursor voor incrementele sync) ---
+def load_sync_state():
+    if not os.path.exists(SYNC_STATE_FILE): return {}
+    try:
+        with open(SYNC_STATE_FILE, encoding='utf-8') as f: return json.load(f)
+    except Exception:
+        print("⚠️ Sync status onleesbaar, we doen een volledige sync.")
+        return {}
 
+def newest_activity(activities):
+    if not activities: return None
+    a = max(activities, key=lambda a: a['start_date'])
+    return (a['start_date'], a['id'])
+
+def write_sync_state(state):
+    with open(SYNC_STATE_FILE, 'w', encoding='utf-8') as f: json.dump(state, f, indent=2)
+
+def save_sync_state(newest, state):
+    if newest and newest[0] >= state.get('last_start_date', ''):
+        state['last_start_date'], state['last_id'] = newest
+    state['last_sync'] = datetime.now().isoformat(timespec='seconds')
+    write_sync_state(state)
+
+# --- INGETROKKEN TOEGANG (strava_webhook.py zet 'deauthorized') ---
+# Zolang de vlag staat: geen sync en geen publieke site (publish.py). Intrekken maakt de oude refresh token ongeldig;
+# werkt de token toch, dan is de atleet opnieuw gekoppeld (nieuwe STRAVA_REFRESH_TOKEN) en gaat de vlag weg.
+def is_deauthorized():
+    return bool(load_sync_state().get('deauthorized'))
+
+def still_deauthorized():
+    state = load_sync_state()
+    if not state.get('deauthorized'): return False
+    try:
+        request_token()
+    except Exception:
+        print(f"🚫 Toegang tot Strava ingetrokken sinds {state['deauthorized']}: geen sync. Opnieuw koppelen geeft een nieuwe refresh token.")
+        return True
+    del state['deauthorized']
+    write_sync_state(state)
+    print("🔗 Opnieuw gekoppeld met Strava, de sync gaat weer verder.")
+    return False
+
+def fetch_activities(fetcher, after):
     all_activities = []
     page = 1
-    print("📥 Bezig met ophalen historie...")
-    
+    print("📥 Bezig met ophalen nieuwe activiteiten...")
+
     while True:
-        r = requests.get(f"{ACTIVITIES_URL}?per_page=200&page={page}", headers=headers)
-        
+        params = {'per_page': PER_PAGE, 'page': page}
+        if after: params['after'] = after
+        try:
+            r = fetcher.get(ACTIVITIES_URL, params=params)
+        except RateLimitStop:
+            r = None
+
         # 🔥 Echte waarschuwing: Stuur een exit error (rood kruisje) als we direct geblokkeerd worden
-        if r.status_code != 200:
-            print(f"❌ Strava weigert dienst (Code {r.status_code}). Waarschijnlijk de API limiet bereikt!")
+        if r is None or r.status_code != 200:
+            print(f"❌ Strava weigert dienst (Code {r.status_code if r is not None else 429}). Waarschijnlijk de API limiet bereikt!")
             exit(1)
-            
+
         data = r.json()
         if isinstance(data, dict) and 'message' in data:
             print(f"❌ Foutmelding van Strava: {data['message']}")
             exit(1)
-            
-        if not data: 
-            break
-            
+
         all_activities.extend(data)
-        if len(all_activities) >= 1500: 
+        # Een onvolle pagina is de laatste: een gewone incrementele run kost zo één call
+        if len(data) < PER_PAGE:
             break
         page += 1
+    return all_activities
+
+def load_existing():
+    if not os.path.exists(ACTIVITIES_CSV): return None
+    try:
+        return pd.read_csv(ACTIVITIES_CSV)
+    except Exception:
+        print("Geen oude cache kunnen laden.")
+        return None
+
+# --- DETAIL CACHE (gekoppeld op activiteit-id) ---
+def load_detail_cache():
+    if os.path.exists(DETAIL_CACHE_CSV):
+        try:
+            return pd.read_csv(DETAIL_CACHE_CSV, index_col='id')
+        except Exception:
+            print("⚠️ Detail cache onleesbaar, we beginnen opnieuw.")
+    return pd.DataFrame(columns=DETAIL_FIELDS, index=pd.Index([], dtype='int64', name='id'))
+
+def seed_detail_cache(df, df_prev):
+    # Eenmalige migratie: calorieën uit de oude CSV overnemen (op id, of op datum voor CSV's zonder id)
+    if df_prev is None or 'Calorieën' not in df_prev.columns: return load_detail_cache()
+    old = df_prev[pd.to_numeric(df_prev['Calorieën'], errors='coerce').fillna(0) > 0]
+    if ID_COL in old.columns:
+        seed = old[[ID_COL, 'Calorieën']]
+    else:
+        # Dubbele starttijden zijn niet eenduidig te koppelen, die halen we gewoon opnieuw op
+        old = old.drop_duplicates(subset='Datum van activiteit', keep=False)
+        seed = df[[ID_COL, 'Datum van activiteit']].astype({'Datum van activiteit': str}).merge(old[['Datum van activiteit', 'Calorieën']].astype({'Datum van activiteit': str}), on='Datum van activiteit')
+    seed = seed.rename(columns={ID_COL: 'id', 'Calorieën': 'calories'}).drop_duplicates(subset='id').set_index('id')
+    return seed.reindex(columns=DETAIL_FIELDS)
+
+def save_detail_cache(details):
+    details.sort_index().to_csv(DETAIL_CACHE_CSV)
+
+def merge_details(details, acts):
+    # Nieuwe detail-responses winnen van wat er al in de cache staat
+    if not acts: return details
+    upd = pd.DataFrame([{'id': a['id'], **{k: a.get(k) for k in DETAIL_FIELDS}} for a in acts]).set_index('id')
+    return pd.concat([details.drop(index=upd.index, errors='ignore'), upd]) if len(details) else upd
+
+def fetch_detail(fetcher, act_id):
+    res = fetcher.get(f"{ACTIVITY_DETAIL_URL}/{act_id}")
+    if res.status_code == 200:
+        detail = res.json()
+        return {'id': act_id, **{k: detail.get(k) for k in DETAIL_FIELDS}, 'raw': detail}
+    if res.status_code == 404:
+        # Verwijderd of privé: niet elke run opnieuw proberen
+        return {'id': act_id}
+    return None
+
+# --- STREAMS (tijd, hartslag, vermogen, snelheid per sample) ---
+def fetch_streams(fetcher, item):
+    act_id, jaar = item
+    res = fetcher.get(f"{ACTIVITY_DETAIL_URL}/{act_id}/streams", params={'keys': ','.join(STREAM_KEYS), 'key_by_type': 'true'})
+    if res.status_code == 200:
+        streams = res.json()
+        return (act_id, jaar, streams if isinstance(streams, dict) else {})
+    if res.status_code == 404:
+        # Handmatige activiteit zonder streams: leeg opslaan zodat we het niet blijven vragen
+        return (act_id, jaar, {})
+    return None
+
+def sync_streams(fetcher, df):
+    index = load_streams_index()
+    jaren = parse_dates(df['Datum van activiteit'])[0].dt.year
+    todo = df.assign(jaar=jaren).dropna(subset=[ID_COL, 'jaar'])
+    todo = todo[~todo[ID_COL].isin(index.index)]
+    if todo.empty: return
+
+    def checkpoint(batch):
+        nonlocal index
+        index = append_streams(index, batch)
+
+    items = list(zip(todo[ID_COL].astype('int64'), todo['jaar'].astype(int)))
+    fetched = fetcher.fetch_many(items, fetch_streams, on_checkpoint=checkpoint)
+    print(f"📈 Streams opgehaald voor {len(fetched)} van {len(items)} activiteiten.")
+
+# --- ROUTES ---
+# summary_polyline zit al in de lijst van /athlete/activities: geen extra calls, alleen nieuwe id's rasteren.
+# De CSV bewaart geen polyline: ontbreekt routes/ helemaal, dan doet process_data zelf een backfill.
+def sync_routes(df, refresh=()):
+    if ROUTE_COL not in df.columns: return
+    index = load_route_index()
+    todo = df[df[ROUTE_COL].notna() & (~df[ID_COL].isin(index.index) | df[ID_COL].isin(list(refresh)))]
+    todo = todo.assign(jaar=parse_dates(todo['Datum van activiteit'])[0].dt.year).dropna(subset=[ID_COL, 'jaar'])
+    if todo.empty: return
+    append_routes(index, list(zip(todo[ID_COL].astype('int64'), todo['jaar'].astype(int), todo[ROUTE_COL])))
+    print(f"🗺️ Routes gerasterd voor {(todo[ROUTE_COL] != '').sum()} van {len(todo)} nieuwe activiteiten.")
+    missing = (~df[ID_COL].isin(index.index) & df[ROUTE_COL].isna()).sum()
+    if missing: print(f"💡 {missing} oudere activiteiten hebben nog geen route; 'python update_activities.py --backfill' haalt ze eenmalig op.")
 
-    if not all_activities:
+# --- BACKFILL (volledige historie, per jaar parallel) ---
+# Elk jaar is een venster met after/before; afgeronde vensters staan als CSV in backfill/ zodat een afgebroken run verder gaat
+BACKFILL_DIR = 'backfill'
+BACKFILL_WINDOWS = os.path.join(BACKFILL_DIR, 'windows.json')
+
+def history_windows(fetcher):
+    # Met 'after' geeft Strava oplopend terug: de eerste van after=0 is de oudste activiteit
+    r = fetcher.get(ACTIVITIES_URL, params={'after': 0, 'per_page': 1})
+    if r.status_code != 200: return None
+    data = r.json()
+    if not data: return []
+    first = pd.Timestamp(data[0]['start_date']).year
+    last = datetime.now().year + 1
+    return [(int(pd.Timestamp(f"{y}-01-01", tz='UTC').timestamp()), int(pd.Timestamp(f"{y + 1}-01-01", tz='UTC').timestamp())) for y in range(last, first - 1, -1)]
+
+def window_path(window):
+    return os.path.join(BACKFILL_DIR, f"{window[0]}-{window[1]}.csv")
+
+def fetch_window(fetcher, window):
+    # Pagina voor pagina meteen naar CSV-rijen; de ruwe JSON gaat per pagina het archief in en blijft niet in het geheugen hangen
+    start, end = window
+    pages, page = [], 1
+    while True:
+        r = fetcher.get(ACTIVITIES_URL, params={'after': start - 1, 'before': end, 'per_page': PER_PAGE, 'page': page})
+        if r.status_code != 200: return None
+        data = r.json()
+        if data:
+            raw_archive.append([(SUMMARY, a['id'], a) for a in data])
+            pages.append(activity_frame(data, extra=['start_date']))
+        if len(data) < PER_PAGE: break
+        page += 1
+    part = pd.concat(pages, ignore_index=True) if pages else activity_frame([], extra=['start_date'])
+    part.to_csv(window_path(window) + '.tmp', index=False)
+    os.replace(window_path(window) + '.tmp', window_path(window))
+    return window, len(part)
+
+def fetch_history(fetcher):
+    # Geeft (df, nieuwste) als alle vensters binnen zijn, anders None: de volgende run haalt de rest
+    os.makedirs(BACKFILL_DIR, exist_ok=True)
+    if os.path.exists(BACKFILL_WINDOWS):
+        with open(BACKFILL_WINDOWS, encoding='utf-8') as f: windows = [tuple(w) for w in json.load(f)]
+    else:
+        try:
+            windows = history_windows(fetcher)
+        except RateLimitStop:
+            windows = None
+        if windows is None:
+            print("❌ Strava weigert dienst bij het begin van de backfill. Waarschijnlijk de API limiet bereikt!")
+            exit(1)
+        with open(BACKFILL_WINDOWS, 'w', encoding='utf-8') as f: json.dump(windows, f)
+
+    todo = [w for w in windows if not os.path.exists(window_path(w))]
+    if todo:
+        print(f"📥 Historie ophalen: {len(todo)} van {len(windows)} jaren, {fetcher.workers} tegelijk...")
+        done = fetcher.fetch_many(todo, fetch_window)
+        print(f"📥 {len(done)} jaren binnen ({sum(n for _, n in done)} activiteiten).")
+    missing = [w for w in windows if not os.path.exists(window_path(w))]
+    if missing:
+        print(f"⏸️ Backfill nog niet klaar: {len(missing)} van {len(windows)} jaren volgen bij de volgende run.")
+        return None
+
+    parts = [pd.read_csv(window_path(w)) for w in windows]
+    parts = [p for p in parts if len(p)]
+    if not parts: return pd.DataFrame(columns=CSV_COLUMNS + [ROUTE_COL]), None
+    hist = pd.concat(parts, ignore_index=True).drop_duplicates(subset=ID_COL)
+    hist[ROUTE_COL] = hist[ROUTE_COL].fillna('') if ROUTE_COL in hist.columns else ''  # delen van voor de routes
+    newest = hist.loc[hist['start_date'].idxmax()]
+    return hist[CSV_COLUMNS + [ROUTE_COL]], (newest['start_date'], int(newest[ID_COL]))
+
+def clear_backfill():
+    for f in os.listdir(BACKFILL_DIR): os.remove(os.path.join(BACKFILL_DIR, f))
+    os.rmdir(BACKFILL_DIR)
+
+def activity_row(a):
+    dt = a['start_date_local'].replace('T', ' ').replace('Z', '')
+    sport_type = translate_type(a['type'])
+
+    gear_id = a.get('gear_id')
+    gear_name = MANUAL_GEAR_MAP.get(gear_id, gear_id) if gear_id else ""
+
+    return {
+        ID_COL: a['id'],
+        'Datum van activiteit': dt,
+        'Naam activiteit': a['name'],
+        'Activiteitstype': sport_type,
+        'Afstand': a['distance'] / 1000,
+        'Hoogtemeters': a.get('total_elevation_gain', 0),
+        'Beweegtijd': a['moving_time'],
+        'Gemiddelde snelheid': a['average_speed'] * 3.6,
+        'Gemiddelde hartslag': a.get('average_heartrate', ''),
+        'Gemiddeld wattage': a.get('average_watts', ''),
+        'Uitrusting voor activiteit': gear_name,
+        'Calorieën': 0,
+        ROUTE_COL: (a.get('map') or {}).get('summary_polyline') or ''
+    }
+
+def activity_frame(acts, extra=()):
+    # Rijen voor de CSV; de materiaalregels in één keer over de hele batch
+    df = pd.DataFrame([activity_row(a) for a in acts], columns=CSV_COLUMNS + [ROUTE_COL])
+    for col in extra: df[col] = [a[col] for a in acts]
+    if len(df):
+        gear = resolve_gear(df[['Uitrusting voor activiteit', 'Datum van activiteit', 'Activiteitstype']].set_axis(['Gear', 'Datum', 'Activiteitstype'], axis=1), SYNC_GEAR_RULES, first_match=True)
+        df['Uitrusting voor activiteit'] = gear
+    return df
+
+def process_data(full=False, backfill=False):
+    if still_deauthorized(): return
+    fetcher = StravaFetcher(get_access_token(), workers=DETAIL_WORKERS, max_wait=MAX_RATE_WAIT)
+
+    df_prev = load_existing()
+    df_old = df_prev if not full and df_prev is not None and ID_COL in df_prev.columns else None
+    state = {} if full else load_sync_state()
+    # Een onderbroken backfill gaat eerst verder, wat er ook gevraagd is
+    backfill = backfill or os.path.exists(BACKFILL_DIR)
+    if df_old is not None and not backfill and not os.path.exists(ROUTES_INDEX):
+        # routes/ is weg (nieuwe checkout, cache verlopen): de CSV heeft geen polylines, alleen de lijst van Strava.
+        # Per jaar een paar pagina's, geen call per activiteit
+        print("🗺️ Geen routes/ gevonden, de historie wordt opnieuw opgehaald om de routes te herstellen.")
+        backfill = True
+    after = None
+    if df_old is not None and state.get('last_start_date') and not backfill:
+        # Strava 'after' is exclusief; 1 seconde marge, dubbele id's vallen weg bij het mergen
+        after = int(pd.Timestamp(state['last_start_date']).timestamp()) - 1
+    elif not backfill:
+        df_old = None
+        print("🔄 Volledige sync (geen sync status of oude CSV zonder activiteit-id's).")
+
+    if after is None:
+        history = fetch_history(fetcher)
+        if history is None: return
+        df, newest = history
+    else:
+        all_activities = fetch_activities(fetcher, after)
+        raw_archive.append([(SUMMARY, a['id'], a) for a in all_activities])
+        df, newest = activity_frame(all_activities), newest_activity(all_activities)
+    fetched = len(df)
+
+    if df.empty and df_old is None:
         print("❌ Geen activiteiten gevonden.")
         exit(1)
 
-    clean_data = []
-    api_calls = 0
-    
-    for a in all_activities:
-        dt = a['start_date_local'].replace('T', ' ').replace('Z', '')
-        sport_type = translate_type(a['type'])
-        
-        gear_id = a.get('gear_id')
-        gear_name = MANUAL_GEAR_MAP.get(gear_id, gear_id) if gear_id else ""
-        
-        if sport_type in ['Fietsrit', 'Virtuele fietsrit']:
-            if dt < "2025-05-09":
-                gear_name = "Proracer"
-            else:
-                gear_name = "Merida Scultura 5000"
-                
-        cal = existing_cals.get(dt, 0)
-        
-        # We vragen calorieën pas op zolang Strava ons niet blokkeert (api_calls < 999)
-        if cal == 0 and api_calls < 80: 
-            act_id = a['id']
-            try:
-                res = requests.get(f"{ACTIVITY_DETAIL_URL}/{act_id}", headers=headers)
-                if res.status_code == 200:
-                    detail = res.json()
-                    cal = detail.get('calories', 0)
-                    api_calls += 1
-                    time.sleep(0.5)
-                elif res.status_code == 429:
-                    # 🔥 Slimme fix: Limiet bereikt TUSSENDOOR? Stop met calorieën zoeken, 
-                    # maar ga wel door met het opslaan van je nieuwe ritten!
-                    print("⚠️ API limiet bereikt tijdens het zoeken naar calorieën. We slaan op wat we hebben!")
-                    api_calls = 999
-            except:
-                pass
-
-        clean_data.append({
-            'Datum van activiteit': dt,
-            'Naam activiteit': a['name'],
-            'Activiteitstype': sport_type,
-            'Afstand': a['distance'] / 1000,
-            'Hoogtemeters': a.get('total_elevation_gain', 0),
-            'Beweegtijd': a['moving_time'],
-            'Gemiddelde snelheid': a['average_speed'] * 3.6,
-            'Gemiddelde hartslag': a.get('average_heartrate', ''),
-            'Gemiddeld wattage': a.get('average_watts', ''),
-            'Uitrusting voor activiteit': gear_name,
-            'Calorieën': cal
-        })
-
-    df = pd.DataFrame(clean_data)
-    df.to_csv('activities.csv', index=False)
-    print(f"💾 Klaar! {len(df)} activiteiten opgeslagen. Nieuwe data is toegevoegd.")
+    if df_old is not None:
+        # Nieuwe versie van een activiteit wint van de oude rij met hetzelfde id
+        df = pd.concat([df, df_old.reindex(columns=CSV_COLUMNS + [ROUTE_COL])], ignore_index=True) if len(df) else df_old.reindex(columns=CSV_COLUMNS + [ROUTE_COL])
+    df = df.drop_duplicates(subset=ID_COL, keep='first').sort_values('Datum van activiteit', ascending=False).reset_index(drop=True)
+
+    details = load_detail_cache() if os.path.exists(DETAIL_CACHE_CSV) else seed_detail_cache(df, df_prev)
+    store_activities(fetcher, df, details)
+    save_sync_state(newest, state)
+    if after is None: clear_backfill()
+    raw_archive.maybe_compact()
+    print(f"💾 Klaar! {len(df)} activiteiten opgeslagen ({fetched} opgehaald).")
+    notify_dashboard()
+
+def store_activities(fetcher, df, details, refresh_routes=()):
+    # Details alleen ophalen voor id's die nog nooit opgehaald zijn, nieuwste eerst
+    missing = df.loc[~df[ID_COL].isin(details.index), ID_COL].tolist()
+
+    def checkpoint(rows):
+        # Tussentijds wegschrijven: een afgebroken run gaat de volgende keer verder bij de ontbrekende id's
+        nonlocal details
+        raw_archive.append([(DETAIL, r['id'], r['raw']) for r in rows if 'raw' in r])
+        fetched = pd.DataFrame(rows, columns=['id'] + DETAIL_FIELDS).set_index('id')
+        details = fetched if details.empty else pd.concat([details, fetched])
+        save_detail_cache(details)
+
+    if missing:
+        fetched = fetcher.fetch_many(missing, fetch_detail, on_checkpoint=checkpoint)
+        print(f"🔍 Details opgehaald voor {len(fetched)} van {len(missing)} nieuwe activiteiten.")
+    save_detail_cache(details)
+    df['Calorieën'] = df[ID_COL].map(details['calories']).fillna(0)
+    sync_streams(fetcher, df)
+    sync_routes(df, refresh_routes)
+    update_best_efforts()
+    write_activities(df)
+
+def write_activities(df):
+    # CSV blijft de export; de getypeerde Parquet store is wat het dashboard leest. De polyline staat alleen in routes/.
+    df = df[CSV_COLUMNS]
+    df.to_csv(ACTIVITIES_CSV, index=False)
+    write_store(df)
+
+# --- PUSH SYNC (strava_webhook.py) ---
+def fetch_activity(fetcher, act_id):
+    # /activities/{id} geeft de samenvatting én de details: één call per gewijzigde activiteit
+    res = fetcher.get(f"{ACTIVITY_DETAIL_URL}/{act_id}")
+    if res.status_code == 200: return (act_id, res.json())
+    if res.status_code == 404: return (act_id, None)  # intussen verwijderd of privé gemaakt
+    return None
+
+def apply_changes(upsert_ids, delete_ids):
+    # Alleen de id's uit de events ophalen of schrappen; geeft de id's terug die nog niet gelukt zijn
+    if still_deauthorized(): return []
+    df = load_existing()
+    if df is None or ID_COL not in df.columns:
+        print("🔄 Nog geen CSV met activiteit-id's, eerst een volledige sync.")
+        process_data(full=True)
+        return []
+    fetcher = StravaFetcher(get_access_token(), workers=DETAIL_WORKERS, max_wait=MAX_RATE_WAIT)
+    fetched = dict(fetcher.fetch_many(sorted(upsert_ids), fetch_activity)) if upsert_ids else {}
+    gone = set(delete_ids) | {i for i, a in fetched.items() if a is None}
+    acts = [a for a in fetched.values() if a is not None]
+    raw_archive.append([(DETAIL, a['id'], a) for a in acts] + [(DELETED, i, None) for i in sorted(gone)])
+
+    new = activity_frame(acts)
+    df = pd.concat([new, df.reindex(columns=CSV_COLUMNS + [ROUTE_COL])], ignore_index=True) if len(new) else df.reindex(columns=CSV_COLUMNS + [ROUTE_COL])
+    df = df.drop_duplicates(subset=ID_COL, keep='first')
+    df = df[~df[ID_COL].isin(gone)].sort_values('Datum van activiteit', ascending=False).reset_index(drop=True)
+
+    # Een update kan ook de calorieën of beschrijving veranderen: de nieuwe waarden winnen
+    details = merge_details(load_detail_cache(), acts)
+    # Een bijgewerkte activiteit kan een ingekorte route hebben (privacy, crop): opnieuw rasteren
+    store_activities(fetcher, df, details, refresh_routes={a['id'] for a in acts})
+    raw_archive.maybe_compact()
+    print(f"💾 Push sync: {len(acts)} bijgewerkt, {len(gone)} verwijderd, {len(df)} activiteiten.")
+    return [i for i in upsert_ids if i not in fetched]
+
+# --- REPLAY (raw_archive.py, zonder netwerk) ---
+# De CSV is de gematerialiseerde tabel van het archief. Een nieuwe kolom in activity_row, andere materiaalregels of een
+# gewijzigd schema: --replay bouwt de rijen opnieuw op uit de ruwe responses. Rijen die niet in het archief staan
+# (oude export, van voor het archief) blijven zoals ze zijn; verwijderde activiteiten gaan eruit.
+def replay_archive():
+    summary, detail, deleted = raw_archive.replay()
+    if not summary and not deleted:
+        print("📭 Archief is leeg, niets te herbouwen.")
+        return
+    df_old = load_existing()
+    df = activity_frame([r['data'] for r in summary.values()])
+    if df_old is not None and ID_COL in df_old.columns:
+        df = pd.concat([df, df_old.reindex(columns=CSV_COLUMNS + [ROUTE_COL])], ignore_index=True)
+    df = df.drop_duplicates(subset=ID_COL, keep='first')
+    df = df[~df[ID_COL].isin(list(deleted))].sort_values('Datum van activiteit', ascending=False).reset_index(drop=True)
+
+    details = merge_details(load_detail_cache(), [r['data'] for r in detail.values()])
+    save_detail_cache(details)
+    df['Calorieën'] = df[ID_COL].map(details['calories']).fillna(0)
+    sync_routes(df)
+    update_best_efforts()
+    write_activities(df)
+    print(f"♻️ Replay: {len(summary)} activiteiten ({len(detail)} met details) uit het archief, {len(df)} in de CSV.")
+    notify_dashboard()
+
+def notify_dashboard():
+    if not DASHBOARD_URL: return
+    try:
+        requests.post(f"{DASHBOARD_URL}/rebuild", timeout=5)
+        print(f"🔔 Dashboard op {DASHBOARD_URL} bijgewerkt.")
+    except requests.RequestException as e:
+        print(f"⚠️ Dashboard op {DASHBOARD_URL} niet bereikt ({e}).")
 
 if __name__ == "__main__":
-    if not CLIENT_ID: 
+    parser = argparse.ArgumentParser(description="Strava activiteiten synchroniseren naar activities.csv")
+    parser.add_argument('--full', action='store_true', help="Volledige resync in plaats van alleen nieuwe activiteiten")
+    parser.add_argument('--backfill', action='store_true', help="Hele historie ophalen (per jaar, parallel, hervatbaar) en samenvoegen met de bestaande CSV")
+    parser.add_argument('--replay', action='store_true', help="activities.csv opnieuw opbouwen uit archive/, zonder API calls")
+    parser.add_argument('--compact', action='store_true', help="Alle segmenten in archive/ samenvoegen tot één")
+    args = parser.parse_args()
+    if args.compact or args.replay:
+        # Alleen lokaal: geen token nodig
+        if args.compact: raw_archive.compact()
+        if args.replay: replay_archive()
+    elif not CLIENT_ID:
         print("❌ Geen API keys gevonden.")
         exit(1)
-    else: 
-        process_data()
+    else:
+        process_data(full=args.full, backfill=args.backfill)